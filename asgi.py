@@ -0,0 +1,127 @@
+"""
+ASGI entry point, for running the explorer under an ASGI server:
+
+    uvicorn asgi:application --port 5100
+
+Each request runs the Flask app on a worker thread while the event loop keeps
+accepting connections, so a slow upload only holds its own thread. The request
+body is handed to the app as it arrives rather than buffered first, so uploads
+still stream straight into the parser.
+"""
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from server import app
+
+
+# Requests served at once; further requests wait for a free thread
+REQUEST_THREADS = int(os.environ.get('GTO_REQUEST_THREADS', 32))
+
+executor = ThreadPoolExecutor(max_workers=REQUEST_THREADS, thread_name_prefix='request')
+
+
+class _BodyStream(io.RawIOBase):
+    """wsgi.input reading the request body from the ASGI receive channel as the app consumes it"""
+
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.buffer = b''
+        self.more_body = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer and self.more_body:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            if message['type'] == 'http.disconnect':
+                raise OSError('Client disconnected')
+            self.buffer = message.get('body', b'')
+            self.more_body = message.get('more_body', False)
+
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def _environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f'HTTP_{key}'
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _run_wsgi(scope, receive, send, loop):
+    """Serve one request with the Flask app, forwarding its response to the ASGI server"""
+    def call(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and started.get('sent'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    def send_start():
+        if not started.get('sent'):
+            started['sent'] = True
+            call({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+
+    result = app.wsgi_app(_environ(scope, io.BufferedReader(_BodyStream(receive, loop))), start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                send_start()
+                call({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        send_start()
+        call({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+
+async def application(scope, receive, send):
+    """ASGI application wrapping the Flask app"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, _run_wsgi, scope, receive, send, loop)
@@ -0,0 +1,134 @@
+"""
+Generate synthetic solver trees for benchmarking.
+
+The output follows the solver JSON schema the explorer reads: action nodes with
+actions/player/pot/board and a strategy block keyed by hand, chance nodes with
+deal_number and dealcards, and children under childrens/dealcards.
+
+    python benchmarks/generate_tree.py out.json --raises 2 --bet-sizes 0.5,1 --dealcards 8 --combos 400
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from combos import COMBO_CARDS, card_id, card_name  # noqa: E402
+
+
+class TreeGenerator:
+    """Writes a synthetic tree straight to a file, one node at a time"""
+
+    def __init__(self, bet_sizes=(0.5, 1.0), raises=1, dealcards=4, combos=1326, streets=2,
+                 board="AhKd7c", pot=10.0, seed=1):
+        """bet_sizes are pot fractions, raises caps the bets per street, streets counts the cards dealt after the board"""
+        self.bet_sizes = bet_sizes
+        self.raises = raises
+        self.dealcards = dealcards
+        self.combos = combos
+        self.streets = streets
+        self.board = board
+        self.pot = pot
+        self.random = random.Random(seed)
+        self.node_count = 0
+        self._live = {}
+
+    def write(self, file_path):
+        """Write the tree to file_path and return the number of nodes written"""
+        with open(file_path, "w") as f:
+            self._action_node(f, self.board, self.pot, player=1, street=0, facing=0, bets=0, checked=False)
+        return self.node_count
+
+    def _hands(self, board):
+        """Pick the hand keys reported at a node, skipping combos that use a board card"""
+        live = self._live.get(board)
+        if live is None:
+            dead = {card_id(board[i:i + 2]) for i in range(0, len(board), 2)}
+            live = self._live[board] = [(int(high), int(low)) for high, low in COMBO_CARDS
+                                        if high not in dead and low not in dead]
+        chosen = live if self.combos >= len(live) else self.random.sample(live, self.combos)
+        # Solvers write either card first; cover both spellings
+        return [card_name(a) + card_name(b) if self.random.random() < 0.5 else card_name(b) + card_name(a)
+                for a, b in chosen]
+
+    def _strategy(self, actions, board):
+        hands = {}
+        for hand in self._hands(board):
+            weights = [self.random.random() for _ in actions]
+            total = sum(weights)
+            hands[hand] = [round(w / total, 6) for w in weights]
+        return {"actions": actions, "strategy": hands}
+
+    def _actions(self, pot, facing, bets):
+        """List the actions available, each with the amount it puts in"""
+        if facing:
+            actions = [("FOLD", None), ("CALL", facing)]
+            if bets < self.raises:
+                actions += [(f"RAISE {facing + size * (pot + facing):.6f}", facing + size * (pot + facing))
+                            for size in self.bet_sizes]
+            return actions
+        actions = [("CHECK", 0.0)]
+        if bets < self.raises:
+            actions += [(f"BET {size * pot:.6f}", size * pot) for size in self.bet_sizes]
+        return actions
+
+    def _action_node(self, f, board, pot, player, street, facing, bets, checked):
+        self.node_count += 1
+        actions = self._actions(pot, facing, bets)
+        labels = [label for label, _ in actions]
+        header = {"actions": labels, "node_type": "action_node", "player": player, "pot": round(pot, 6), "board": board}
+        f.write(json.dumps(header)[:-1] + ', "childrens": {')
+
+        first = True
+        for label, amount in actions:
+            if amount is None:
+                continue  # Folds end the hand
+            if label == "CALL" or (label == "CHECK" and checked):
+                # The street is over: deal the next card, or stop on the last street
+                if street >= self.streets:
+                    continue
+                f.write(("" if first else ", ") + json.dumps(label) + ": ")
+                self._chance_node(f, board, pot + amount, street)
+            else:
+                f.write(("" if first else ", ") + json.dumps(label) + ": ")
+                self._action_node(f, board, pot + amount, 1 - player, street,
+                                  facing=amount - facing if amount > facing else 0.0,
+                                  bets=bets + (amount > 0), checked=label == "CHECK")
+            first = False
+
+        f.write('}, "strategy": ' + json.dumps(self._strategy(labels, board)) + "}")
+
+    def _chance_node(self, f, board, pot, street):
+        self.node_count += 1
+        dead = {board[i:i + 2] for i in range(0, len(board), 2)}
+        cards = [card_name(c) for c in range(51, -1, -1) if card_name(c) not in dead][:self.dealcards]
+        f.write(json.dumps({"node_type": "chance_node", "deal_number": len(cards)})[:-1] + ', "dealcards": {')
+        for i, card in enumerate(cards):
+            f.write(("" if i == 0 else ", ") + json.dumps(card) + ": ")
+            self._action_node(f, board + card, pot, player=1, street=street + 1, facing=0.0, bets=0, checked=False)
+        f.write("}}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic solver tree JSON file")
+    parser.add_argument("output", help="file to write")
+    parser.add_argument("--bet-sizes", default="0.5,1", help="comma separated bet sizes as fractions of the pot")
+    parser.add_argument("--raises", type=int, default=1, help="most bets and raises per street")
+    parser.add_argument("--dealcards", type=int, default=4, help="cards dealt at each chance node")
+    parser.add_argument("--combos", type=int, default=1326, help="hands reported per strategy")
+    parser.add_argument("--streets", type=int, default=2, help="streets dealt after the starting board")
+    parser.add_argument("--board", default="AhKd7c", help="starting board")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    generator = TreeGenerator(bet_sizes=[float(s) for s in args.bet_sizes.split(",") if s],
+                              raises=args.raises, dealcards=args.dealcards, combos=args.combos,
+                              streets=args.streets, board=args.board, seed=args.seed)
+    count = generator.write(args.output)
+    print(f"Wrote {count} nodes ({os.path.getsize(args.output)} bytes) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Time GameTreeProcessor operations and the Flask API on a synthetic tree.
+
+Each benchmark records its median wall time over several runs and its peak
+traced memory over one extra run, then is compared with a stored baseline:
+
+    python benchmarks/run_benchmarks.py                   # compare with benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline   # record a new baseline
+
+Exits with status 1 when a benchmark is slower than the baseline by more than --tolerance.
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate_tree import TreeGenerator  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Tree used unless overridden on the command line
+DEFAULT_TREE = {"bet_sizes": [0.5, 1.0], "raises": 1, "dealcards": 4, "combos": 300, "streets": 2, "seed": 1}
+
+# Slowdowns smaller than this are treated as timing noise
+NOISE_SECONDS = 0.002
+
+# Hands looked up by the hand details benchmarks
+SAMPLE_HANDS = ("AKs", "QQ", "T9o", "72o")
+
+
+def measure(function, repeat):
+    """Return (median seconds, peak traced bytes) of calling function"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def sample_paths(processor, count=50):
+    """Pick node paths spread across the tree"""
+    step = max(processor.store.node_count // count, 1)
+    return [processor.node_path(node_id) for node_id in range(0, processor.store.node_count, step)][:count]
+
+
+def processor_benchmarks(tree_path):
+    """Yield (name, function) pairs exercising GameTreeProcessor directly"""
+    from tree_processor import GameTreeProcessor
+
+    processor = GameTreeProcessor(tree_path)
+    paths = sample_paths(processor)
+    strategy_paths = [p for p in paths if processor.get_node_info(p)["has_strategy"]]
+
+    def find_paths():
+        processor.node_cache.clear()
+        for path in paths:
+            processor.find_node_by_path(path)
+
+    def hand_details():
+        for path in strategy_paths:
+            for hand in SAMPLE_HANDS:
+                processor.get_hand_details(path, hand)
+
+    yield "load", lambda: GameTreeProcessor(tree_path)
+    yield "count_decision_points", processor.count_decision_points
+    yield "get_subtree", lambda: processor.get_subtree("", depth=4)
+    yield "find_node_by_path", find_paths
+    yield "get_hand_matrix_data", lambda: [processor.get_hand_matrix_data(p) for p in strategy_paths]
+    yield "get_hand_details", hand_details
+
+
+def endpoint_benchmarks(tree_path):
+    """Yield (name, function) pairs requesting each API endpoint through the Flask test client"""
+    import server
+
+    client = server.app.test_client()
+    upload = client.post('/api/upload', data={'file': (open(tree_path, 'rb'), 'tree.json')},
+                         content_type='multipart/form-data').get_json()
+    session_id = upload['session_id']
+    if 'job_id' in upload:
+        # Wait for the background ingest to finish
+        while client.get(f"/api/jobs/{upload['job_id']}").get_json()['stage'] not in ('done', 'failed'):
+            time.sleep(0.1)
+
+    processor = server.get_processor(session_id)
+    paths = [p for p in sample_paths(processor, 20) if processor.get_node_info(p)["has_strategy"]]
+    chance = next((processor.node_path(i) for i in range(processor.store.node_count)
+                   if processor.get_node_info(processor.node_path(i)).get("dealcards_count")), "")
+
+    def get_all(url):
+        def run():
+            # Drop cached responses so every request is computed again
+            server.results.clear()
+            for path in paths:
+                response = client.get(url.format(session=session_id, path=path))
+                body = response.get_data()  # Also drains streamed responses
+                response.close()
+                assert response.status_code == 200, body[:200]
+        return run
+
+    with open(tree_path, 'rb') as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+    yield "api_upload_existing", lambda: client.post(
+        '/api/upload', data={'file': (open(tree_path, 'rb'), 'tree.json')}, content_type='multipart/form-data',
+        headers={'X-Content-SHA256': content_hash})
+    yield "api_subtree", get_all("/api/subtree/{session}?path={path}&depth=2")
+    yield "api_node", get_all("/api/node/{session}?path={path}")
+    yield "api_strategy", get_all("/api/strategy/{session}?path={path}")
+    yield "api_hand_matrix", get_all("/api/hand_matrix/{session}?path={path}")
+    yield "api_hand_matrix_binary", get_all("/api/hand_matrix/{session}?path={path}&format=binary")
+    yield "api_bundle", get_all("/api/bundle/{session}?path={path}&views=node,strategy,hand_matrix_packed,ev_analysis")
+    yield "api_ev_analysis", get_all("/api/ev_analysis/{session}?path={path}")
+    yield "api_hand_details", get_all("/api/hand_details/{session}?path={path}&hand=AKs")
+    yield "api_summary", get_all("/api/summary/{session}?path={path}")
+    yield "api_runout", get_all("/api/runout/{session}?path=" + chance + "&heatmap=1")
+    yield "api_query", get_all("/api/query/{session}?frequency_action=BET&min_frequency=50&limit=100")
+
+
+def compare(results, baseline, tolerance):
+    """Print each result next to its baseline; return the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':28} {'time (ms)':>12} {'baseline':>12} {'ratio':>7} {'peak (KiB)':>12}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        milliseconds = result["seconds"] * 1000
+        if reference:
+            ratio = result["seconds"] / reference["seconds"] if reference["seconds"] else float("inf")
+            slower = ratio > tolerance and result["seconds"] - reference["seconds"] > NOISE_SECONDS
+            flag = "  SLOWER" if slower else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:28} {milliseconds:12.2f} {reference['seconds'] * 1000:12.2f} {ratio:7.2f} "
+                  f"{result['peak_bytes'] / 1024:12.0f}{flag}")
+        else:
+            print(f"{name:28} {milliseconds:12.2f} {'-':>12} {'-':>7} {result['peak_bytes'] / 1024:12.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game tree processor and API")
+    parser.add_argument("--tree", help="solver JSON file to use instead of a generated one")
+    parser.add_argument("--combos", type=int, default=DEFAULT_TREE["combos"], help="hands per strategy in the generated tree")
+    parser.add_argument("--dealcards", type=int, default=DEFAULT_TREE["dealcards"], help="cards per chance node in the generated tree")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--skip-api", action="store_true", help="skip the Flask endpoint benchmarks")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    work_folder = tempfile.mkdtemp(prefix="gto_bench_")
+    atexit.register(shutil.rmtree, work_folder, True)
+    os.environ.setdefault("GTO_SESSION_FOLDER", os.path.join(work_folder, "sessions"))
+
+    tree_path = args.tree
+    if tree_path is None:
+        tree_path = os.path.join(work_folder, "tree.json")
+        options = dict(DEFAULT_TREE, combos=args.combos, dealcards=args.dealcards)
+        nodes = TreeGenerator(**options).write(tree_path)
+        print(f"Generated {nodes} nodes ({os.path.getsize(tree_path) / 1e6:.1f} MB)")
+
+    benchmarks = list(processor_benchmarks(tree_path))
+    if not args.skip_api:
+        benchmarks += list(endpoint_benchmarks(tree_path))
+
+    results = {}
+    for name, function in benchmarks:
+        if args.only and args.only not in name:
+            continue
+        seconds, peak = measure(function, 1 if name == "load" else args.repeat)
+        results[name] = {"seconds": seconds, "peak_bytes": peak}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "tree": args.tree or dict(DEFAULT_TREE, combos=args.combos, dealcards=args.dealcards),
+                       "results": results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+
+from ingest import read_job, write_job
+
+
+# Seconds an unfinished or finalized upload is kept after its last change
+UPLOAD_TTL = 24 * 60 * 60
+
+# Seconds a streamed upload may hold its ingest worker without new data; it is then parsed from the part file once finalized
+STREAM_IDLE_TIMEOUT = 60
+
+# Smallest chunk size a client may ask for
+MIN_CHUNK_SIZE = 256 * 1024
+
+_HEX = re.compile(r"[0-9a-f]+")
+
+# Chunk checksum name -> function returning the hex digest of a chunk
+CHECKSUMS = {
+    "sha256": lambda data: hashlib.sha256(data).hexdigest(),
+    "crc32": lambda data: f"{zlib.crc32(data):08x}",
+}
+
+
+class UploadError(ValueError):
+    """A chunked upload request that cannot be served, with the HTTP status to answer it with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ChunkedUpload:
+    """
+    One upload received as numbered chunks, in any order and from parallel requests.
+    Chunks are written into a preallocated part file. One thread hashes the
+    contiguous prefix received so far and another streams it into an ingest
+    worker, so parsing runs while later chunks are still arriving. The state
+    file records each chunk's checksum, so an upload survives a server restart
+    and clients resume by sending only the chunks it is missing.
+    """
+
+    def __init__(self, folder, state, ingest, idle_timeout=STREAM_IDLE_TIMEOUT):
+        self.state = state
+        self.ingest = ingest
+        self.idle_timeout = idle_timeout
+        self.state_path = os.path.join(folder, f"{state['upload_id']}.json")
+        self.part_path = os.path.join(folder, f"{state['upload_id']}.part")
+
+        # Chunk index -> checksum of the chunks written to the part file
+        self.chunks = {int(index): checksum for index, checksum in state["chunks"].items()}
+        self.in_flight = set()
+        self.hashed_bytes = 0
+        self.ingested_bytes = 0
+        self.content_hash = None
+        self.error = None
+        self.feed_error = None
+        self.decision = None
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+        self.stream = None
+        self.threads = []
+
+    @property
+    def upload_id(self):
+        return self.state["upload_id"]
+
+    @property
+    def filename(self):
+        return self.state["filename"]
+
+    def chunk_length(self, index):
+        return min(self.state["chunk_size"], self.state["size"] - index * self.state["chunk_size"])
+
+    def start(self, stream):
+        """Start following the received prefix, feeding it to stream unless it is None"""
+        if self.state["result"] is not None:
+            return
+        self.stream = stream
+        self.threads.append(threading.Thread(target=self._hash, name=f"upload-hash-{self.upload_id[:8]}", daemon=True))
+        if stream is not None:
+            self.threads.append(threading.Thread(target=self._feed, name=f"upload-feed-{self.upload_id[:8]}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def put_chunk(self, index, data, algorithm, checksum):
+        """Store one chunk after checking its length and checksum; sending a stored chunk again is a no-op"""
+        if self.state["result"] is not None:
+            raise UploadError("Upload is already finalized", 409)
+        if not 0 <= index < self.state["chunk_count"]:
+            raise UploadError(f"Chunk index must be between 0 and {self.state['chunk_count'] - 1}")
+        if len(data) != self.chunk_length(index):
+            raise UploadError(f"Chunk {index} must be {self.chunk_length(index)} bytes, got {len(data)}")
+        if CHECKSUMS[algorithm](data) != checksum:
+            raise UploadError(f"Chunk {index} does not match its {algorithm} checksum")
+
+        checksum = f"{algorithm}:{checksum}"
+        with self.condition:
+            if index in self.chunks:
+                if self.chunks[index] != checksum and not self._same_chunk(index, data):
+                    raise UploadError(f"Chunk {index} was already received with different content", 409)
+                return
+            if index in self.in_flight or self.cancelled:
+                raise UploadError(f"Chunk {index} is already being received", 409)
+            self.in_flight.add(index)
+
+        try:
+            with open(self.part_path, "r+b") as f:
+                f.seek(index * self.state["chunk_size"])
+                f.write(data)
+        finally:
+            with self.condition:
+                self.in_flight.discard(index)
+
+        with self.condition:
+            self.chunks[index] = checksum
+            self._save()
+            self.condition.notify_all()
+
+    def _same_chunk(self, index, data):
+        algorithm = self.chunks[index].split(":", 1)[0]
+        return self.chunks[index] == f"{algorithm}:{CHECKSUMS[algorithm](data)}"
+
+    def status(self):
+        with self.condition:
+            received = len(self.chunks)
+            offset = 0
+            while offset < self.state["size"] and offset // self.state["chunk_size"] in self.chunks:
+                offset += self.chunk_length(offset // self.state["chunk_size"])
+            return {
+                "upload_id": self.upload_id,
+                "filename": self.filename,
+                "size": self.state["size"],
+                "chunk_size": self.state["chunk_size"],
+                "chunk_count": self.state["chunk_count"],
+                "chunks_received": received,
+                "missing": [i for i in range(self.state["chunk_count"]) if i not in self.chunks],
+                "offset": offset,
+                "hashed_bytes": self.hashed_bytes,
+                "ingested_bytes": self.ingested_bytes if self.stream is not None else None,
+                "job_id": self.stream.job_id if self.stream is not None else None,
+                "error": self.error or self.feed_error,
+                "result": self.state["result"],
+            }
+
+    def wait_hashed(self):
+        """Return the sha256 of the whole upload once every chunk is in and hashed"""
+        with self.condition:
+            missing = self.state["chunk_count"] - len(self.chunks)
+            if missing:
+                raise UploadError(f"Upload is incomplete: {missing} chunk(s) missing", 409)
+            while self.content_hash is None and self.error is None and not self.cancelled:
+                self.condition.wait()
+            if self.error is not None:
+                raise UploadError(self.error, 500)
+            if self.cancelled:
+                raise UploadError("Upload was cancelled", 410)
+            return self.content_hash
+
+    def commit(self, content_hash, tree_path):
+        """Have the upload saved as the tree for content_hash, returning the ingest job id"""
+        with self.condition:
+            if self.stream is not None and self.feed_error is None:
+                self.stream.claim(content_hash)
+                self.decision = ("commit", content_hash, tree_path)
+                self.condition.notify_all()
+                return self.stream.job_id
+        # Nothing was streamed, or the worker gave up; parse the assembled part file, which the worker deletes
+        return self.ingest.submit(content_hash, self.part_path, tree_path, self.filename)
+
+    def discard(self):
+        """Drop the upload because its content is already known"""
+        with self.condition:
+            if self.stream is not None and self.feed_error is None:
+                self.decision = ("discard",)
+                self.condition.notify_all()
+                return
+        self._remove(self.part_path)
+
+    def finish(self, result):
+        """Record the finalize response, so a repeated finalize returns it again"""
+        with self.condition:
+            self.state["result"] = result
+            self._save()
+
+    def cancel(self):
+        """Stop following the upload and delete its files"""
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+            finalized = self.state["result"] is not None
+        if not finalized:
+            # A finalized upload's part file belongs to its ingest job
+            self._remove(self.part_path)
+        self._remove(self.state_path)
+
+    def _save(self):
+        self.state["chunks"] = {str(index): checksum for index, checksum in self.chunks.items()}
+        self.state["updated_at"] = time.time()
+        write_job(self.state_path, self.state)
+
+    def _contiguous_chunks(self, idle_timeout=None):
+        """
+        Yield the chunks in order, each once it has been received; stop if the
+        upload is cancelled. Raises ValueError after waiting idle_timeout seconds for a chunk.
+        """
+        with open(self.part_path, "rb") as f:
+            for index in range(self.state["chunk_count"]):
+                with self.condition:
+                    self._wait(lambda: index in self.chunks, idle_timeout)
+                    if self.cancelled:
+                        return
+                f.seek(index * self.state["chunk_size"])
+                yield f.read(self.chunk_length(index))
+
+    def _wait(self, ready, timeout=None):
+        """With the condition held, wait until ready() or cancellation, raising ValueError after timeout seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ready() and not self.cancelled:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                # Set before the lock is released, so a finalize from now on parses the part file
+                self.feed_error = f"No data for {timeout:g} seconds; the upload is parsed once finalized"
+                raise ValueError(self.feed_error)
+            self.condition.wait(remaining)
+
+    def _hash(self):
+        digest = hashlib.sha256()
+        try:
+            for data in self._contiguous_chunks():
+                digest.update(data)
+                with self.condition:
+                    self.hashed_bytes += len(data)
+        except OSError as e:
+            with self.condition:
+                self.error = str(e)
+                self.condition.notify_all()
+            return
+        with self.condition:
+            if self.hashed_bytes == self.state["size"]:
+                self.content_hash = digest.hexdigest()
+            self.condition.notify_all()
+
+    def _feed(self):
+        decided = False
+        try:
+            # The stream holds a worker, so it is given up when the client goes quiet
+            for data in self._contiguous_chunks(self.idle_timeout):
+                self.stream.write(data)
+                with self.condition:
+                    self.ingested_bytes += len(data)
+
+            with self.condition:
+                self._wait(lambda: self.decision is not None, self.idle_timeout)
+                decision = self.decision
+            if decision is not None:
+                decided = True
+                if decision[0] == "commit":
+                    self.stream.commit(decision[1], decision[2])
+                else:
+                    self.stream.discard()
+        except (OSError, ValueError) as e:
+            # The part file stays, so finalize can still hand the whole upload to a new job
+            with self.condition:
+                self.feed_error = str(e)
+        finally:
+            if not decided:
+                self.stream.abort()
+            if self.decision is not None:
+                # Finalized: the worker holds every byte, or its job has failed for good
+                self._remove(self.part_path)
+
+    @staticmethod
+    def _remove(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+class ChunkedUploads:
+    """
+    Chunked, resumable uploads for trees larger than one request may carry.
+    A client creates an upload with its size, PUTs the numbered chunks (in
+    parallel and in any order, each with a checksum), asks for the status to
+    learn which chunks are still missing after an interruption, and finalizes
+    it once all are in. Upload state lives in upload_folder, next to the part
+    files, and is dropped ttl seconds after its last change. A streamed upload
+    that gets no data for idle_timeout seconds releases its ingest worker and
+    is parsed from the part file once finalized.
+    """
+
+    def __init__(self, upload_folder, ingest, sessions, max_size, max_chunk_size, ttl=UPLOAD_TTL,
+                 idle_timeout=STREAM_IDLE_TIMEOUT):
+        self.upload_folder = upload_folder
+        self.ingest = ingest
+        self.sessions = sessions
+        self.max_size = max_size
+        self.max_chunk_size = max_chunk_size
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+
+        # Upload id -> upload followed by this process
+        self.uploads = {}
+        self.lock = threading.Lock()
+
+    def state_file_path(self, upload_id):
+        """Return the file holding an upload's state, or None if the id is malformed"""
+        try:
+            upload_id = str(uuid.UUID(upload_id))
+        except ValueError:
+            return None
+        return os.path.join(self.upload_folder, f"{upload_id}.json")
+
+    def create(self, filename, size, chunk_size, content_hash=None, stream=True):
+        """
+        Start an upload of size bytes sent in chunks of chunk_size. Unless stream
+        is False, its chunks are parsed as soon as they form a contiguous prefix.
+        """
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("Upload size must be a positive number of bytes")
+        if size > self.max_size:
+            raise UploadError("File too large", 413)
+        if not isinstance(chunk_size, int) or not MIN_CHUNK_SIZE <= chunk_size <= self.max_chunk_size:
+            raise UploadError(f"Chunk size must be between {MIN_CHUNK_SIZE} and {self.max_chunk_size} bytes")
+        if content_hash is not None and (len(content_hash) != 64 or not _HEX.fullmatch(content_hash)):
+            raise UploadError("sha256 must be 64 hex digits")
+
+        self.sweep()
+        os.makedirs(self.upload_folder, exist_ok=True)
+        now = time.time()
+        state = {
+            "upload_id": str(uuid.uuid4()),
+            "filename": filename,
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunk_count": -(-size // chunk_size),
+            "sha256": content_hash,
+            "chunks": {},
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        upload = ChunkedUpload(self.upload_folder, state, self.ingest, self.idle_timeout)
+        with open(upload.part_path, "wb") as f:
+            f.truncate(size)
+        upload._save()
+        return self._follow(upload, stream)
+
+    def get(self, upload_id, stream=True):
+        """Return an upload, restoring it from its state file after a restart; None if it does not exist"""
+        with self.lock:
+            upload = self.uploads.get(upload_id)
+        if upload is not None:
+            return upload
+
+        state_path = self.state_file_path(upload_id)
+        state = read_job(state_path) if state_path else None
+        if state is None:
+            return None
+        upload = ChunkedUpload(self.upload_folder, state, self.ingest, self.idle_timeout)
+        if state["result"] is None and not os.path.exists(upload.part_path):
+            return None
+        return self._follow(upload, stream)
+
+    def delete(self, upload_id):
+        """Cancel an upload and delete its files; return False if it does not exist"""
+        upload = self.get(upload_id, stream=False)
+        if upload is None:
+            return False
+        with self.lock:
+            self.uploads.pop(upload.upload_id, None)
+        upload.cancel()
+        return True
+
+    def sweep(self):
+        """Delete uploads left untouched for longer than the TTL"""
+        try:
+            names = os.listdir(self.upload_folder)
+        except OSError:
+            return
+        cutoff = time.time() - self.ttl
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            state = read_job(os.path.join(self.upload_folder, name))
+            if state is not None and state["updated_at"] < cutoff:
+                self.delete(state["upload_id"])
+
+    def _follow(self, upload, stream):
+        with self.lock:
+            existing = self.uploads.get(upload.upload_id)
+            if existing is not None:
+                return existing
+            self.uploads[upload.upload_id] = upload
+
+        # Content announced as already known, or already being parsed, is only hashed
+        content_hash = upload.state["sha256"]
+        if stream and content_hash is not None:
+            stream = not self.sessions.has_tree(content_hash) and self.ingest.pending_job(content_hash) is None
+        upload.start(self.ingest.open_stream(upload.filename, upload.state["size"]) if stream else None)
+        return upload
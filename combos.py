@@ -0,0 +1,151 @@
+import numpy as np
+
+
+# Card ids are rank * 4 + suit, so a higher id is a higher card
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+CARD_COUNT = 52
+COMBO_COUNT = 1326
+
+COMBO_PAIR = 0
+COMBO_SUITED = 1
+COMBO_OFFSUIT = 2
+
+
+def card_id(card):
+    """Return the id of a two-character card like 'Ah', or -1 if it is not a card"""
+    if len(card) != 2:
+        return -1
+    rank = RANKS.find(card[0])
+    suit = SUITS.find(card[1])
+    if rank < 0 or suit < 0:
+        return -1
+    return rank * 4 + suit
+
+
+def card_name(card):
+    """Return the two-character name of a card id"""
+    return RANKS[card // 4] + SUITS[card % 4]
+
+
+def combo_index(card_a, card_b):
+    """Return the canonical index of an unordered pair of distinct card ids"""
+    low, high = min(card_a, card_b), max(card_a, card_b)
+    return high * (high - 1) // 2 + low
+
+
+def _build_tables():
+    cards = np.zeros((COMBO_COUNT, 2), dtype=np.int8)
+    for high in range(1, CARD_COUNT):
+        for low in range(high):
+            cards[combo_index(high, low)] = (high, low)
+
+    ranks = cards // 4
+    suits = cards % 4
+    types = np.where(ranks[:, 0] == ranks[:, 1], COMBO_PAIR,
+                     np.where(suits[:, 0] == suits[:, 1], COMBO_SUITED, COMBO_OFFSUIT)).astype(np.uint8)
+    return cards, types
+
+
+# COMBO_CARDS[i] holds the (higher, lower) card ids of combo i
+COMBO_CARDS, COMBO_TYPES = _build_tables()
+COMBO_NAMES = tuple(card_name(int(high)) + card_name(int(low)) for high, low in COMBO_CARDS)
+
+_hand_index_cache = {}
+
+
+def hand_index(hand_key):
+    """Return the combo index of a solver hand key like 'AcKd' (either card order), or -1"""
+    index = _hand_index_cache.get(hand_key)
+    if index is None:
+        index = -1
+        if len(hand_key) == 4:
+            card_a, card_b = card_id(hand_key[:2]), card_id(hand_key[2:])
+            if card_a >= 0 and card_b >= 0 and card_a != card_b:
+                index = combo_index(card_a, card_b)
+        _hand_index_cache[hand_key] = index
+    return index
+
+
+# Hand matrix layout: ranks from Ace down, pairs on the diagonal,
+# suited hands above it and offsuit hands below it
+MATRIX_RANKS = RANKS[::-1]
+CELL_COUNT = 169
+
+
+def _build_cell_tables():
+    positions = 12 - COMBO_CARDS // 4
+    high, low = positions[:, 0].astype(np.int16), positions[:, 1].astype(np.int16)
+    rows = np.where(COMBO_TYPES == COMBO_OFFSUIT, low, high)
+    cols = np.where(COMBO_TYPES == COMBO_OFFSUIT, high, low)
+    combo_cells = rows * 13 + cols
+
+    hands, types = [], []
+    for i, rank1 in enumerate(MATRIX_RANKS):
+        for j, rank2 in enumerate(MATRIX_RANKS):
+            if i == j:
+                hands.append(f"{rank1}{rank1}")
+                types.append("pair")
+            elif i < j:
+                hands.append(f"{rank1}{rank2}s")
+                types.append("suited")
+            else:
+                hands.append(f"{rank1}{rank2}o")
+                types.append("offsuit")
+
+    order = np.argsort(combo_cells, kind="stable")
+    starts = np.searchsorted(combo_cells[order], np.arange(CELL_COUNT))
+    return combo_cells, tuple(hands), tuple(types), order, starts
+
+
+# COMBO_CELLS[i] is the matrix cell (row * 13 + col) of combo i; CELL_ORDER lists
+# combos grouped by cell, with each cell's group starting at CELL_STARTS[cell]
+COMBO_CELLS, CELL_HANDS, CELL_TYPES, CELL_ORDER, CELL_STARTS = _build_cell_tables()
+
+
+def hand_cell(hand_text):
+    """Return the matrix cell of a hand like 'AKs', 'KAo' or 'TT', or -1 if it is not valid"""
+    if len(hand_text) == 2 and hand_text[0] == hand_text[1]:
+        suffix = ""
+    elif len(hand_text) == 3 and hand_text[2] in "so" and hand_text[0] != hand_text[1]:
+        suffix = hand_text[2]
+    else:
+        return -1
+
+    row, col = MATRIX_RANKS.find(hand_text[0]), MATRIX_RANKS.find(hand_text[1])
+    if row < 0 or col < 0:
+        return -1
+
+    # Suited hands sit above the diagonal and offsuit hands below it
+    if (suffix == "s" and row > col) or (suffix == "o" and row < col):
+        row, col = col, row
+    return row * 13 + col
+
+
+def cell_combos(cell):
+    """Return the combo indices belonging to a matrix cell"""
+    end = CELL_STARTS[cell + 1] if cell + 1 < CELL_COUNT else COMBO_COUNT
+    return CELL_ORDER[CELL_STARTS[cell]:end]
+
+
+def cell_averages(probabilities, mask):
+    """Average reported combo probabilities per matrix cell in one gather and segment sum"""
+    weights = mask[CELL_ORDER]
+    gathered = probabilities[CELL_ORDER] * weights[:, None]
+    sums = np.add.reduceat(gathered, CELL_STARTS, axis=0, dtype=np.float64)
+    counts = np.add.reduceat(weights.astype(np.int32), CELL_STARTS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts[:, None], counts
+
+
+def cell_weighted_averages(probabilities, weights):
+    """
+    Weighted per-cell averages over a batch: probabilities is (..., 1326, k) and
+    weights (..., 1326). Returns (..., 169, k) averages and (..., 169) weight sums.
+    """
+    weights = weights[..., CELL_ORDER]
+    gathered = probabilities[..., CELL_ORDER, :] * weights[..., None]
+    sums = np.add.reduceat(gathered, CELL_STARTS, axis=-2, dtype=np.float64)
+    totals = np.add.reduceat(weights, CELL_STARTS, axis=-1, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / totals[..., None], totals
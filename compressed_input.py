@@ -0,0 +1,84 @@
+import gzip
+import lzma
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Leading bytes of each supported compressed format
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+_MAGIC_LENGTH = max(len(GZIP_MAGIC), len(XZ_MAGIC), len(ZSTD_MAGIC))
+
+
+class CountingReader:
+    """
+    Binary file object replaying a few already read bytes, then reading the
+    rest from fp. Counts the bytes it returns, so progress can be reported
+    against the compressed size while the parser sees decompressed text.
+    """
+
+    def __init__(self, fp, head=b""):
+        self.fp = fp
+        self.head = head
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if not self.head:
+            data = self.fp.read(size)
+        elif size is None or size < 0:
+            data, self.head = self.head + self.fp.read(), b""
+        elif size > len(self.head):
+            data, self.head = self.head + self.fp.read(size - len(self.head)), b""
+        else:
+            data, self.head = self.head[:size], self.head[size:]
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, target):
+        data = self.read(len(target))
+        target[:len(data)] = data
+        return len(data)
+
+
+def detect_compression(head):
+    """Name the compression of a file from its first bytes: "gzip", "xz", "zstd", or None for plain input"""
+    for name, magic in (("gzip", GZIP_MAGIC), ("xz", XZ_MAGIC), ("zstd", ZSTD_MAGIC)):
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_input(fp):
+    """
+    Return (reader, counter) for a binary file object that may be gzip, xz or
+    zstd compressed. reader yields the decompressed bytes as they are read,
+    never inflating the whole input; counter.bytes_read is the number of raw
+    bytes consumed from fp so far.
+    """
+    # Non-seekable inputs (uploads still arriving) may return short reads
+    head = b""
+    while len(head) < _MAGIC_LENGTH:
+        data = fp.read(_MAGIC_LENGTH - len(head))
+        if not data:
+            break
+        head += data
+
+    counter = CountingReader(fp, head)
+    compression = detect_compression(head)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=counter, mode="rb"), counter
+    if compression == "xz":
+        return lzma.LZMAFile(counter), counter
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Reading zstd compressed trees requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(counter, read_across_frames=True), counter
+    return counter, counter
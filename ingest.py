@@ -0,0 +1,449 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from tree_processor import GameTreeProcessor
+
+
+# Minimum seconds between progress writes from a worker
+PROGRESS_INTERVAL = 0.5
+
+# How long to wait for a failed streaming worker to record its error
+FAILURE_WAIT = 2.0
+
+# Seconds between checks that a streaming job's worker is still starting up
+READY_POLL_INTERVAL = 0.1
+
+# Seconds a streaming upload waits for a free worker before its body is spooled to disk instead
+READY_TIMEOUT = 10.0
+
+STAGE_QUEUED = "queued"
+STAGE_PARSING = "parsing"
+STAGE_CONVERTING = "converting"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+# Sent by a streaming worker once it holds its end of the connection
+READY = "ready"
+
+
+def read_job(job_path):
+    """Return the state stored in a job file, or None if it does not exist"""
+    try:
+        with open(job_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_job(job_path, job):
+    """Replace a job file atomically so readers never see a partial write"""
+    temp_path = f"{job_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(job, f)
+    os.replace(temp_path, job_path)
+
+
+def run_ingest_job(job_path, file_path, tree_path):
+    """Worker entry point: parse an uploaded file and convert it to a session file"""
+    job = read_job(job_path)
+    job["stage"] = STAGE_PARSING
+    job["started_at"] = time.time()
+    write_job(job_path, job)
+
+    last_write = [0.0]
+
+    def report(bytes_read, total_size):
+        now = time.monotonic()
+        if now - last_write[0] >= PROGRESS_INTERVAL:
+            last_write[0] = now
+            job["bytes_processed"] = bytes_read
+            write_job(job_path, job)
+
+    try:
+        processor = GameTreeProcessor(file_path, progress_callback=report)
+
+        job["stage"] = STAGE_CONVERTING
+        job["parsed_at"] = time.time()
+        job["bytes_processed"] = job["total_bytes"]
+        write_job(job_path, job)
+        processor.save_session(tree_path)
+
+        job["stage"] = STAGE_DONE
+        job["game_info"] = processor.get_game_info()
+    except Exception as e:
+        job["stage"] = STAGE_FAILED
+        job["error"] = str(e)
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    job["finished_at"] = time.time()
+    write_job(job_path, job)
+
+
+class ConnectionReader:
+    """Binary file object over chunks sent through a connection; an empty chunk ends the stream"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.buffer = b""
+        self.bytes_read = 0
+        self.eof = False
+
+    def read(self, size=-1):
+        """Return up to size bytes (the next chunk when the buffer is empty), or b"" at the end"""
+        if not self.buffer and not self.eof:
+            self.buffer = self.connection.recv_bytes()
+            self.bytes_read += len(self.buffer)
+            self.eof = not self.buffer
+        if size is None or size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def drain(self):
+        """Skip whatever follows the document, up to the end of the stream"""
+        while self.read():
+            pass
+
+
+def run_stream_ingest_job(job_path, connection):
+    """
+    Worker entry point: parse an upload from the chunks the server forwards as
+    they arrive. Once the body has ended the server sends ("commit", tree path,
+    content hash) to keep the tree, or ("discard",) when the same content is
+    already converted or being parsed.
+    """
+    connection.send(READY)
+    job = read_job(job_path)
+    job["stage"] = STAGE_PARSING
+    job["started_at"] = time.time()
+    write_job(job_path, job)
+
+    last_write = [0.0]
+
+    def report(bytes_read, total_size):
+        now = time.monotonic()
+        if now - last_write[0] >= PROGRESS_INTERVAL:
+            last_write[0] = now
+            job["bytes_processed"] = bytes_read
+            write_job(job_path, job)
+
+    try:
+        reader = ConnectionReader(connection)
+        processor = GameTreeProcessor.from_stream(reader, job["total_bytes"], progress_callback=report)
+        reader.drain()
+
+        decision = connection.recv()
+        if decision[0] != "commit":
+            os.remove(job_path)
+            return
+
+        _, tree_path, content_hash = decision
+        job["content_hash"] = content_hash
+        job["stage"] = STAGE_CONVERTING
+        job["parsed_at"] = time.time()
+        job["bytes_processed"] = job["total_bytes"] = reader.bytes_read
+        write_job(job_path, job)
+        processor.save_session(tree_path)
+
+        job["stage"] = STAGE_DONE
+        job["game_info"] = processor.get_game_info()
+    except EOFError:
+        job["stage"] = STAGE_FAILED
+        job["error"] = "Upload interrupted"
+    except Exception as e:
+        job["stage"] = STAGE_FAILED
+        job["error"] = str(e)
+    finally:
+        connection.close()
+
+    job["finished_at"] = time.time()
+    write_job(job_path, job)
+
+
+class StreamNotReady(ValueError):
+    """No worker picked a streaming job up in time; nothing was sent to it, so the body can go elsewhere"""
+
+
+class StreamingUpload:
+    """
+    Server side of an upload parsed while it is received: write its chunks,
+    then commit or discard it. The first call waits until a worker has picked
+    the job up, so uploads are held back rather than buffered when every worker
+    is busy, but for no longer than the queue's ready_timeout.
+    """
+
+    def __init__(self, queue, job_id, connection, worker_connection, future):
+        self.queue = queue
+        self.job_id = job_id
+        self.connection = connection
+        self.worker_connection = worker_connection
+        self.future = future
+
+    def _wait_ready(self):
+        if self.worker_connection is None:
+            return
+        # The worker's end must stay open here until the worker holds its own copy
+        deadline = time.monotonic() + self.queue.ready_timeout
+        while not self.connection.poll(READY_POLL_INTERVAL):
+            if self.future.done():
+                self.worker_connection.close()
+                self.worker_connection = None
+                raise ValueError(self.queue.failure(self.job_id))
+            if time.monotonic() > deadline:
+                self.abort()
+                raise StreamNotReady("No ingest worker became free in time")
+        self.connection.recv()
+        self.worker_connection.close()
+        self.worker_connection = None
+
+    def write(self, chunk):
+        """
+        Forward a chunk to the worker, raising ValueError if the worker has given
+        up on the upload, or StreamNotReady if none picked it up in time.
+        """
+        try:
+            self._wait_ready()
+            self.connection.send_bytes(chunk)
+        except OSError:
+            raise ValueError(self.queue.failure(self.job_id))
+
+    def claim(self, content_hash):
+        """Make later uploads of this content join this job instead of parsing it again"""
+        with self.queue.lock:
+            self.queue.pending[content_hash] = self.job_id
+
+    def commit(self, content_hash, tree_path):
+        """End the body and have the worker save the tree to tree_path, returning the job id"""
+        self.claim(content_hash)
+        try:
+            self._wait_ready()
+            self.connection.send_bytes(b"")
+            self.connection.send(("commit", tree_path, content_hash))
+        except OSError:
+            raise ValueError(self.queue.failure(self.job_id))
+        finally:
+            self.connection.close()
+        return self.job_id
+
+    def discard(self):
+        """End the body and have the worker drop the tree, because its content is already known"""
+        try:
+            self._wait_ready()
+            self.connection.send_bytes(b"")
+            self.connection.send(("discard",))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.connection.close()
+
+    def abort(self):
+        """Stop forwarding mid-body; the worker marks the job failed"""
+        if self.worker_connection is not None:
+            worker_connection, self.worker_connection = self.worker_connection, None
+            if self.future.cancel():
+                # Never picked up by a worker: drop the job before it starts
+                os.remove(self.queue.job_file_path(self.job_id))
+                worker_connection.close()
+            else:
+                # Already handed to a worker, which may not hold its copy yet
+                self.future.add_done_callback(lambda _: worker_connection.close())
+        self.connection.close()
+
+
+class SpooledUpload:
+    """
+    Stand-in for a StreamingUpload when no worker can take the stream: the
+    body is written to a file in the job folder and queued once committed.
+    """
+
+    def __init__(self, queue, filename):
+        self.queue = queue
+        self.filename = filename
+        self.file_path = os.path.join(queue.job_folder, f"{uuid.uuid4()}.part")
+        self.file = open(self.file_path, "wb")
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def commit(self, content_hash, tree_path):
+        """Queue the spooled body for parsing into tree_path, returning the job id"""
+        self.file.close()
+        return self.queue.submit(content_hash, self.file_path, tree_path, self.filename)
+
+    def discard(self):
+        self.abort()
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.file_path)
+        except OSError:
+            pass
+
+
+class IngestQueue:
+    """
+    Parses uploaded trees in a pool of worker processes.
+    Job state lives in small JSON files, so any server process can report
+    progress, and uploads of content already being parsed join the running job.
+    A streamed upload holds its worker for as long as the client takes to send
+    it, so at most max_streams run at once (by default one less than
+    max_workers), leaving a worker for uploads that were spooled to disk.
+    """
+
+    def __init__(self, job_folder, max_workers, on_finish=None, max_streams=None, ready_timeout=READY_TIMEOUT):
+        """on_finish is called with the final state of every job this process submitted"""
+        self.job_folder = job_folder
+        self.max_workers = max_workers
+        self.max_streams = max_streams if max_streams is not None else max(max_workers - 1, 1)
+        self.ready_timeout = ready_timeout
+        self.on_finish = on_finish
+        self.executor = None
+
+        # Content hash -> id of the job parsing it
+        self.pending = {}
+        self.streams = 0
+        self.lock = threading.Lock()
+
+    def job_file_path(self, job_id):
+        """Return the file holding a job's state, or None if the id is malformed"""
+        try:
+            job_id = str(uuid.UUID(job_id))
+        except ValueError:
+            return None
+        return os.path.join(self.job_folder, f"{job_id}.json")
+
+    def pending_job(self, content_hash):
+        """Return the id of the job currently parsing this content, if any"""
+        with self.lock:
+            return self.pending.get(content_hash)
+
+    def submit(self, content_hash, file_path, tree_path, filename):
+        """Queue an uploaded file for parsing; the worker deletes file_path when done"""
+        job_id = str(uuid.uuid4())
+        job_path = self.job_file_path(job_id)
+        os.makedirs(self.job_folder, exist_ok=True)
+        write_job(job_path, self._new_job(job_id, filename, content_hash, os.path.getsize(file_path)))
+
+        with self.lock:
+            future = self._executor().submit(run_ingest_job, job_path, file_path, tree_path)
+            self.pending[content_hash] = job_id
+
+        future.add_done_callback(lambda _: self._finish(job_id, job_path, file_path))
+        return job_id
+
+    def open_stream(self, filename, total_bytes=None):
+        """
+        Start a job that parses an upload while its body is still arriving, and
+        return the StreamingUpload that feeds it, or None if max_streams are running.
+        """
+        with self.lock:
+            if self.streams >= self.max_streams:
+                return None
+            self.streams += 1
+
+        job_id = str(uuid.uuid4())
+        job_path = self.job_file_path(job_id)
+        try:
+            os.makedirs(self.job_folder, exist_ok=True)
+            write_job(job_path, self._new_job(job_id, filename, None, total_bytes))
+            connection, worker_connection = multiprocessing.Pipe()
+            with self.lock:
+                future = self._executor().submit(run_stream_ingest_job, job_path, worker_connection)
+        except Exception:
+            with self.lock:
+                self.streams -= 1
+            raise
+        future.add_done_callback(lambda _: self._finish(job_id, job_path, stream=True))
+        return StreamingUpload(self, job_id, connection, worker_connection, future)
+
+    def spool(self, filename):
+        """Return a SpooledUpload, for bodies no streaming worker can take"""
+        os.makedirs(self.job_folder, exist_ok=True)
+        return SpooledUpload(self, filename)
+
+    def failure(self, job_id):
+        """Describe why a job stopped, waiting briefly for its worker to record it"""
+        job_path = self.job_file_path(job_id)
+        deadline = time.monotonic() + FAILURE_WAIT
+        while True:
+            job = read_job(job_path)
+            if job is not None and job["stage"] == STAGE_FAILED:
+                return job["error"]
+            if time.monotonic() > deadline:
+                return "Ingestion worker exited unexpectedly"
+            time.sleep(0.05)
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def _new_job(self, job_id, filename, content_hash, total_bytes):
+        return {
+            "job_id": job_id,
+            "filename": filename,
+            "content_hash": content_hash,
+            "stage": STAGE_QUEUED,
+            "bytes_processed": 0,
+            "total_bytes": total_bytes,
+            "queued_at": time.time(),
+            "started_at": None,
+            "parsed_at": None,
+            "finished_at": None,
+            "error": None,
+            "game_info": None
+        }
+
+    def _finish(self, job_id, job_path, file_path=None, stream=False):
+        with self.lock:
+            if stream:
+                self.streams -= 1
+            for content_hash in [h for h, pending_id in self.pending.items() if pending_id == job_id]:
+                del self.pending[content_hash]
+
+        if file_path is not None and os.path.exists(file_path):
+            os.remove(file_path)
+
+        # A worker that died never wrote its final state
+        job = read_job(job_path)
+        if job is not None and job["stage"] not in (STAGE_DONE, STAGE_FAILED):
+            job["stage"] = STAGE_FAILED
+            job["error"] = "Ingestion worker exited unexpectedly"
+            job["finished_at"] = time.time()
+            write_job(job_path, job)
+
+        if job is not None and self.on_finish is not None:
+            self.on_finish(job)
+
+    def status(self, job_id):
+        """Return a job's state with progress and an ETA, or None if it does not exist"""
+        job_path = self.job_file_path(job_id)
+        job = read_job(job_path) if job_path else None
+        if job is None:
+            return None
+
+        total = job["total_bytes"]
+        processed = job["bytes_processed"]
+        if total is None:
+            # A streamed upload without a Content-Length; its size is known once it ends
+            job["progress"] = None
+        else:
+            job["progress"] = round(processed * 100 / total, 1) if total else 100.0
+
+        job["eta_seconds"] = None
+        if job["stage"] == STAGE_PARSING and job["started_at"] and processed and total:
+            elapsed = time.time() - job["started_at"]
+            job["eta_seconds"] = round(elapsed * (total - processed) / processed, 1)
+        elif job["stage"] == STAGE_QUEUED:
+            job["queue_length"] = len(self.pending)
+
+        return job
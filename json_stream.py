@@ -0,0 +1,162 @@
+import codecs
+import json
+import re
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Characters that open or close a container, and a complete string
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+class JsonStreamReader:
+    """
+    Incremental JSON reader that pulls a document from a binary file object.
+    Only a bounded window of the input is ever held in memory: objects can be
+    walked key by key, and individual values are decoded with the C scanner.
+    """
+
+    def __init__(self, fp, chunk_size=1 << 20, total_size=None, progress_callback=None):
+        """Wrap a binary file object; progress_callback(bytes_read, total_size) is called per chunk"""
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.total_size = total_size
+        self.progress_callback = progress_callback
+
+        self.buffer = ""
+        self.pos = 0
+        # Characters dropped from the front of the buffer
+        self.consumed = 0
+        self.bytes_read = 0
+        self.eof = False
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+
+    def _fill(self, size=None):
+        """Read the next chunk into the buffer, dropping already consumed text"""
+        if self.eof:
+            return False
+
+        raw = self.fp.read(size or self.chunk_size)
+        if not raw:
+            self.eof = True
+            text = self._decoder.decode(b"", final=True)
+        else:
+            self.bytes_read += len(raw)
+            text = self._decoder.decode(raw)
+
+        self.consumed += self.pos
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+
+        if self.progress_callback:
+            self.progress_callback(self.bytes_read, self.total_size)
+
+        return True
+
+    @property
+    def offset(self):
+        """Position of the parser in the decoded text, in characters"""
+        return self.consumed + self.pos
+
+    def _skip_whitespace(self):
+        """Advance past whitespace, reading more input as needed"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def peek(self):
+        """Return the next significant character without consuming it ('' at end of input)"""
+        self._skip_whitespace()
+        if self.pos < len(self.buffer):
+            return self.buffer[self.pos]
+        return ""
+
+    def _expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' at offset {self.offset}")
+        self.pos += 1
+
+    def begin_object(self):
+        """Consume the opening brace of an object"""
+        self._expect('{')
+
+    def next_key(self):
+        """Return the next key of the current object, or None once the object is closed"""
+        char = self.peek()
+        if char == ',':
+            self.pos += 1
+            char = self.peek()
+
+        if char == '}':
+            self.pos += 1
+            return None
+        if char != '"':
+            raise ValueError(f"Invalid JSON: expected object key at offset {self.offset}")
+
+        while True:
+            try:
+                key, end = json.decoder.scanstring(self.buffer, self.pos + 1)
+                break
+            except json.JSONDecodeError as e:
+                if not self._fill():
+                    raise ValueError(f"Invalid JSON: {e.msg} at offset {self.consumed + e.pos}") from e
+
+        self.pos = end
+        self._expect(':')
+        return key
+
+    def read_value(self):
+        """Decode and return the next complete value"""
+        self._skip_whitespace()
+
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+                # A number touching the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"Invalid JSON: {e.msg} at offset {self.consumed + e.pos}") from e
+
+            # Value spans past the buffer; grow reads so huge values stay linear
+            self._fill(read_size)
+            read_size *= 2
+
+    def skip_value(self):
+        """
+        Consume the next value without keeping it. Containers are only scanned
+        for their brackets and strings, so nothing inside them is decoded.
+        """
+        if self.peek() not in ('[', '{'):
+            self.read_value()
+            return
+
+        depth = 0
+        while True:
+            match = _STRUCTURE.search(self.buffer, self.pos)
+            if match is None:
+                # Nothing but numbers, literals and separators left in the buffer
+                self.pos = len(self.buffer)
+            elif match.group() == '"':
+                string = _STRING.match(self.buffer, match.start())
+                if string is not None:
+                    self.pos = string.end()
+                    continue
+                # The string continues in the next chunk
+                self.pos = match.start()
+            else:
+                self.pos = match.end()
+                depth += 1 if match.group() in '[{' else -1
+                if depth == 0:
+                    return
+                continue
+
+            if not self._fill():
+                raise ValueError(f"Invalid JSON: unterminated value at offset {self.offset}")
@@ -0,0 +1,283 @@
+import contextvars
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the request and phase latency buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds in seconds of the ingest duration buckets
+INGEST_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+# Phase timings of the request being served in the current thread
+_current = contextvars.ContextVar("phase_timings", default=None)
+
+
+class PhaseTimings:
+    """
+    Seconds spent in each named phase of one request. Phases nest (hand details
+    resolve their node in a "resolve" phase), so each records only its own time.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        # Seconds spent in nested phases, one entry per phase open in this request
+        self._nested = []
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, name):
+        """Record the time spent in the block under name, less the time of phases measured inside it"""
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.add(name, seconds - self._nested.pop())
+            if self._nested:
+                self._nested[-1] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total):
+        """Format the phases and the total as a Server-Timing header value, in milliseconds"""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+def start_request():
+    """Start collecting phase timings for the request served by this thread"""
+    timings = PhaseTimings()
+    _current.set(timings)
+    return timings
+
+
+def finish_request():
+    """Stop collecting and return the timings of the current request, or None"""
+    timings = _current.get()
+    _current.set(None)
+    return timings
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the current request's phase; free outside requests"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(name):
+        yield
+
+
+def timed(name):
+    """Decorate a method so each call is recorded as a phase of the current request"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return function(*args, **kwargs)
+            with timings.measure(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative bucket counts per label set, rendered in the Prometheus text format"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # Label values -> [bucket counts, sum, count]
+        self.series = {}
+
+    def observe(self, label_values, value):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render_family(name, kind, help_text, label_names, samples):
+    """Render a counter or gauge family from (label values, value) samples"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for label_values, value in samples:
+        lines.append(f"{name}{_labels(label_names, label_values)} {value}")
+    return lines
+
+
+class Metrics:
+    """
+    Request latencies, per-phase latencies and ingest durations of this server
+    process. State owned by other components (caches, sessions) is passed to
+    render as gauge and counter families at scrape time.
+    """
+
+    def __init__(self):
+        self.requests = Histogram("gto_request_duration_seconds", "Latency of API requests",
+                                  ("endpoint", "method", "status"), LATENCY_BUCKETS)
+        self.phases = Histogram("gto_request_phase_seconds", "Time spent in each phase of API requests",
+                                ("endpoint", "phase"), LATENCY_BUCKETS)
+        self.ingest = Histogram("gto_ingest_duration_seconds", "Time uploads spend in each ingest stage",
+                                ("stage",), INGEST_BUCKETS)
+        self.ingest_jobs = Counter()
+        self.lock = threading.Lock()
+
+    def observe_request(self, endpoint, method, status, timings, total):
+        with self.lock:
+            self.requests.observe((endpoint, method, str(status)), total)
+            for name, seconds in timings.phases.items():
+                self.phases.observe((endpoint, name), seconds)
+
+    def observe_ingest(self, job):
+        """Record the queue, parse and convert durations of a finished ingest job"""
+        stages = (("queued", "queued_at", "started_at"), ("parsing", "started_at", "parsed_at"),
+                  ("converting", "parsed_at", "finished_at"))
+        with self.lock:
+            self.ingest_jobs[job["stage"]] += 1
+            for stage, start, end in stages:
+                if job.get(start) and job.get(end):
+                    self.ingest.observe((stage,), job[end] - job[start])
+
+    def render(self, families=()):
+        """Return every metric in the Prometheus text exposition format"""
+        with self.lock:
+            lines = self.requests.render() + self.phases.render() + self.ingest.render()
+            lines += render_family("gto_ingest_jobs_total", "counter", "Finished ingest jobs by outcome",
+                                   ("outcome",), sorted(((outcome,), count) for outcome, count in self.ingest_jobs.items()))
+        for family in families:
+            lines += render_family(*family)
+        return "\n".join(lines) + "\n"
+
+
+class SlowRequestProfiler:
+    """
+    Sampling profiler for slow requests. While a request runs, a background
+    thread records the stack of the thread serving it every interval seconds;
+    requests taking longer than threshold seconds have their samples written to
+    profile_folder as collapsed stacks (one "frame;frame;... count" line per
+    stack, as read by flamegraph.pl and speedscope). Only the newest
+    max_profiles files are kept.
+    """
+
+    def __init__(self, profile_folder, threshold, interval=0.005, max_profiles=100):
+        self.profile_folder = profile_folder
+        self.threshold = threshold
+        self.interval = interval
+        self.max_profiles = max_profiles
+
+        # Thread id -> sampled stack counts of the request it is serving
+        self.active = {}
+        self.written = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Begin sampling the calling thread"""
+        with self.lock:
+            self.active[threading.get_ident()] = Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def stop(self, label, seconds):
+        """Stop sampling the calling thread; write its profile if the request was slow, returning the file"""
+        with self.lock:
+            samples = self.active.pop(threading.get_ident(), None)
+        if not samples or seconds < self.threshold:
+            return None
+
+        os.makedirs(self.profile_folder, exist_ok=True)
+        name = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+        file_path = os.path.join(self.profile_folder,
+                                 f"{time.strftime('%Y%m%d-%H%M%S')}-{int(seconds * 1000)}ms-{name}.folded")
+        with open(file_path, "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        logger.info("Profiled slow request %s (%.0f ms) to %s", label, seconds * 1000, file_path)
+
+        self.written += 1
+        self._prune()
+        return file_path
+
+    def _prune(self):
+        profiles = sorted(os.path.join(self.profile_folder, name) for name in os.listdir(self.profile_folder)
+                          if name.endswith(".folded"))
+        for file_path in profiles[:-self.max_profiles]:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while True:
+            self.wakeup.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    self.wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own:
+                        samples[self._stack(frame)] += 1
+
+    @staticmethod
+    def _stack(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return tuple(reversed(stack))
@@ -0,0 +1,444 @@
+import sys
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from combos import COMBO_COUNT, hand_index
+
+
+# Edge kinds: listed actions, extra "childrens" keys not in the action list, dealt cards
+EDGE_ACTION = 0
+EDGE_CHILD = 1
+EDGE_CARD = 2
+
+# Node flags record which containers were present on the original node
+FLAG_ACTIONS = 1
+FLAG_CHILDRENS = 2
+FLAG_DEALCARDS = 4
+
+NO_CHILD = -1
+
+# Strategy flags record which parts of a node's strategy block were present
+STRATEGY_ACTIONS = 1
+STRATEGY_HANDS = 2
+
+# A node's strategy: action labels, a (1326, n_actions) float32 array in canonical
+# combo order, and a boolean mask of the combos the solver actually reported
+Strategy = namedtuple("Strategy", ["actions", "probabilities", "mask"])
+
+
+class StringTable:
+    """Interned strings addressed by integer id"""
+
+    def __init__(self, strings=None):
+        self.strings = list(strings or [])
+        self.ids = {s: i for i, s in enumerate(self.strings)}
+
+    def intern(self, value):
+        """Return the id of a string, adding it if needed"""
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            value = sys.intern(value)
+            self.strings.append(value)
+            self.ids[value] = string_id
+        return string_id
+
+    def lookup(self, value):
+        """Return the id of a string, or -1 if it was never interned"""
+        return self.ids.get(value, -1)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class NodeStore:
+    """
+    Flattened game tree: one row per node in NumPy arrays, children stored as
+    contiguous edge ranges, and all labels interned in a shared string table.
+    Node ids are assigned in pre-order, so the root is 0 and parents precede children.
+    """
+
+    def __init__(self, strings, nodes, edges, strategies):
+        self.strings = strings
+
+        self.parent = nodes["parent"]
+        self.depth = nodes["depth"]
+        self.flags = nodes["flags"]
+        self.node_type = nodes["node_type"]
+        self.player = nodes["player"]
+        self.pot = nodes["pot"]
+        self.board = nodes["board"]
+        self.deal_number = nodes["deal_number"]
+        self.edge_start = nodes["edge_start"]
+        self.edge_count = nodes["edge_count"]
+        self.strategy_index = nodes["strategy_index"]
+
+        self.edge_kind = edges["kind"]
+        self.edge_label = edges["label"]
+        self.edge_child = edges["child"]
+
+        self.strategy_flags = strategies["flags"]
+        self.strategy_action_start = strategies["action_start"]
+        self.strategy_action_count = strategies["action_count"]
+        self.strategy_actions = strategies["actions"]
+        self.strategy_mask_bits = strategies["mask_bits"]
+        self.strategy_blocks = strategies["blocks"]
+
+        # Sorted (parent, label, is_card) keys of every edge with a child, built on first use
+        self._edge_keys = None
+        self._edge_targets = None
+        self._incoming_edge = None
+
+    @property
+    def node_count(self):
+        return len(self.parent)
+
+    @property
+    def nbytes(self):
+        """Approximate size of the node and edge tables"""
+        arrays = (self.parent, self.depth, self.flags, self.node_type, self.player, self.pot,
+                  self.board, self.deal_number, self.edge_start, self.edge_count,
+                  self.strategy_index, self.edge_kind, self.edge_label, self.edge_child,
+                  self.strategy_flags, self.strategy_action_start, self.strategy_action_count,
+                  self.strategy_actions, self.strategy_mask_bits)
+        blocks = self.strategy_blocks
+        blocks_nbytes = blocks.nbytes if hasattr(blocks, "nbytes") else sum(b.nbytes for b in blocks)
+        return sum(a.nbytes for a in arrays) + blocks_nbytes
+
+    def strategy_sizes(self):
+        """Return the number of probabilities stored in each strategy block"""
+        blocks = self.strategy_blocks
+        if hasattr(blocks, "offsets"):
+            return np.diff(blocks.offsets)
+        return np.array([block.size for block in blocks], dtype=np.int64)
+
+    def string(self, string_id):
+        """Return an interned string, or None for a missing (-1) id"""
+        return self.strings[string_id] if string_id >= 0 else None
+
+    def edges(self, node_id):
+        """Return the edge index range of a node"""
+        start = int(self.edge_start[node_id])
+        return range(start, start + int(self.edge_count[node_id]))
+
+    def actions(self, node_id):
+        """Return the node's listed actions in their original order"""
+        return [self.strings[self.edge_label[e]] for e in self.edges(node_id)
+                if self.edge_kind[e] == EDGE_ACTION]
+
+    def dealcards(self, node_id):
+        """Return (card, child id) pairs for a chance node"""
+        return [(self.strings[self.edge_label[e]], int(self.edge_child[e])) for e in self.edges(node_id)
+                if self.edge_kind[e] == EDGE_CARD]
+
+    def _build_edge_index(self):
+        edges = np.flatnonzero(self.edge_child != NO_CHILD)
+        children = self.edge_child[edges].astype(np.int64)
+        keys = ((self.parent[children].astype(np.int64) << 32)
+                | (self.edge_label[edges].astype(np.int64) << 1)
+                | (self.edge_kind[edges] == EDGE_CARD))
+
+        order = np.argsort(keys, kind="stable")
+        self._edge_targets = children[order].astype(np.int32)
+        self._edge_keys = keys[order]
+
+        incoming = np.full(self.node_count, -1, dtype=np.int64)
+        incoming[children] = edges
+        self._incoming_edge = incoming
+
+    def child(self, node_id, label, card=False):
+        """Return the child reached by an action (or dealt card) label, or None"""
+        label_id = self.strings.lookup(label)
+        if label_id < 0:
+            return None
+
+        if self._edge_keys is None:
+            self._build_edge_index()
+
+        key = (int(node_id) << 32) | (label_id << 1) | int(card)
+        i = int(np.searchsorted(self._edge_keys, key))
+        if i < len(self._edge_keys) and self._edge_keys[i] == key:
+            return int(self._edge_targets[i])
+        return None
+
+    def children_of(self, node_ids, label_ids, cards):
+        """Vectorized child(): look up arrays of (node id, label id, is card), giving -1 where there is no child"""
+        if self._edge_keys is None:
+            self._build_edge_index()
+
+        keys = ((np.asarray(node_ids, dtype=np.int64) << 32) | (np.asarray(label_ids, dtype=np.int64) << 1)
+                | np.asarray(cards, dtype=np.int64))
+        i = np.minimum(np.searchsorted(self._edge_keys, keys), max(len(self._edge_keys) - 1, 0))
+        if not len(self._edge_keys):
+            return np.full(len(keys), -1, dtype=np.int32)
+        return np.where(self._edge_keys[i] == keys, self._edge_targets[i], -1).astype(np.int32)
+
+    def incoming_edge(self, node_id):
+        """Return the edge leading from a node's parent to it, or -1 for the root"""
+        if self._incoming_edge is None:
+            self._build_edge_index()
+        return int(self._incoming_edge[node_id])
+
+    def incoming_edges(self):
+        """Return the incoming edge of every node, -1 for the root"""
+        if self._incoming_edge is None:
+            self._build_edge_index()
+        return self._incoming_edge
+
+    def strategy(self, node_id):
+        """Return the node's Strategy, or None if it has no strategy block"""
+        index = self.strategy_index[node_id]
+        if index < 0:
+            return None
+
+        flags = self.strategy_flags[index]
+        actions = probabilities = mask = None
+        if flags & STRATEGY_ACTIONS:
+            start = self.strategy_action_start[index]
+            labels = self.strategy_actions[start:start + self.strategy_action_count[index]]
+            actions = [self.strings[label] for label in labels]
+        if flags & STRATEGY_HANDS:
+            probabilities = self.strategy_blocks[index]
+            mask = np.unpackbits(self.strategy_mask_bits[index], count=COMBO_COUNT).view(bool)
+        return Strategy(actions, probabilities, mask)
+
+
+class _NodeFrame:
+    """Fields of a node collected while its JSON object is being read"""
+
+    __slots__ = ("node_id", "actions", "childrens", "dealcards", "flags", "node_type",
+                 "player", "pot", "pot_size", "board", "deal_number", "strategy")
+
+    def __init__(self, node_id):
+        self.node_id = node_id
+        self.actions = []
+        self.childrens = {}
+        self.dealcards = {}
+        self.flags = 0
+        self.node_type = None
+        self.player = None
+        self.pot = None
+        self.pot_size = None
+        self.board = None
+        self.deal_number = None
+        self.strategy = None
+
+
+class NodeStoreBuilder:
+    """Builds a NodeStore directly from a JsonStreamReader, one node at a time"""
+
+    def __init__(self):
+        self.strings = StringTable()
+
+        self.parent = array('i')
+        self.depth = array('i')
+        self.flags = array('B')
+        self.node_type = array('i')
+        self.player = array('b')
+        self.pot = array('f')
+        self.board = array('i')
+        self.deal_number = array('i')
+        self.edge_start = array('i')
+        self.edge_count = array('i')
+        self.strategy_index = array('i')
+
+        self.edge_kind = array('B')
+        self.edge_label = array('i')
+        self.edge_child = array('i')
+
+        self.strategy_flags = array('B')
+        self.strategy_action_start = array('i')
+        self.strategy_action_count = array('i')
+        self.strategy_actions = array('i')
+        self.strategy_mask_bits = []
+        self.strategy_blocks = []
+
+    def _new_node(self, parent_id):
+        node_id = len(self.parent)
+        self.parent.append(parent_id)
+        self.depth.append(self.depth[parent_id] + 1 if parent_id >= 0 else 0)
+        for column in (self.node_type, self.board, self.deal_number, self.strategy_index):
+            column.append(-1)
+        self.flags.append(0)
+        self.player.append(-1)
+        self.pot.append(float("nan"))
+        self.edge_start.append(0)
+        self.edge_count.append(0)
+        return _NodeFrame(node_id)
+
+    def _set_field(self, frame, key, value):
+        if key == "actions":
+            frame.flags |= FLAG_ACTIONS
+            if isinstance(value, list):
+                frame.actions = [str(a) for a in value]
+        elif key == "node_type" and isinstance(value, str):
+            frame.node_type = value
+        elif key == "player" and isinstance(value, int):
+            frame.player = value
+        elif key == "pot" and isinstance(value, (int, float)):
+            frame.pot = value
+        elif key == "potSize" and isinstance(value, (int, float)):
+            frame.pot_size = value
+        elif key == "board" and isinstance(value, str):
+            frame.board = value
+        elif key == "deal_number" and isinstance(value, int):
+            frame.deal_number = value
+        elif key == "strategy":
+            frame.strategy = self._convert_strategy(value)
+
+    def _convert_strategy(self, strategy):
+        """Convert a strategy block to canonical combo order and return its strategy index"""
+        index = len(self.strategy_flags)
+        flags = 0
+        if not isinstance(strategy, dict):
+            strategy = {}
+
+        actions = strategy.get("actions")
+        self.strategy_action_start.append(len(self.strategy_actions))
+        if isinstance(actions, list):
+            flags |= STRATEGY_ACTIONS
+            for action in actions:
+                self.strategy_actions.append(self.strings.intern(str(action)))
+        else:
+            actions = []
+        self.strategy_action_count.append(len(self.strategy_actions) - self.strategy_action_start[index])
+
+        hands = strategy.get("strategy")
+        mask = np.zeros(COMBO_COUNT, dtype=bool)
+        if isinstance(hands, dict):
+            flags |= STRATEGY_HANDS
+            rows = [hand_index(k) for k in hands.keys()]
+            width = len(actions) or max((len(p) for p in hands.values() if isinstance(p, list)), default=0)
+            block = np.zeros((COMBO_COUNT, width), dtype=np.float32)
+            try:
+                values = np.array(list(hands.values()), dtype=np.float32).reshape(len(rows), -1)[:, :width]
+                rows = np.array(rows, dtype=np.int32)
+                valid = rows >= 0
+                block[rows[valid], :values.shape[1]] = values[valid]
+                mask[rows[valid]] = True
+            except ValueError:
+                # Ragged or malformed rows: fill them one at a time
+                for row, probs in zip(rows, hands.values()):
+                    if row >= 0 and isinstance(probs, list):
+                        probs = probs[:width]
+                        block[row, :len(probs)] = probs
+                        mask[row] = True
+        else:
+            block = np.zeros((COMBO_COUNT, 0), dtype=np.float32)
+
+        self.strategy_flags.append(flags)
+        self.strategy_blocks.append(block)
+        self.strategy_mask_bits.append(np.packbits(mask))
+        return index
+
+    def _finish_node(self, frame):
+        node_id = frame.node_id
+        strings = self.strings
+
+        self.flags[node_id] = frame.flags
+        if frame.node_type is not None:
+            self.node_type[node_id] = strings.intern(frame.node_type)
+        if frame.player is not None and -128 <= frame.player < 128:
+            self.player[node_id] = frame.player
+        pot = frame.pot if frame.pot is not None else frame.pot_size
+        if pot is not None:
+            self.pot[node_id] = pot
+        if frame.board is not None:
+            self.board[node_id] = strings.intern(frame.board)
+        if frame.deal_number is not None:
+            self.deal_number[node_id] = frame.deal_number
+        if frame.strategy is not None:
+            self.strategy_index[node_id] = frame.strategy
+
+        # Edges: listed actions first (in order), then unlisted children, then cards
+        self.edge_start[node_id] = len(self.edge_kind)
+        listed = set()
+        for action in frame.actions:
+            self._add_edge(EDGE_ACTION, action, frame.childrens.get(action, NO_CHILD))
+            listed.add(action)
+        for action, child_id in frame.childrens.items():
+            if action not in listed:
+                self._add_edge(EDGE_CHILD, action, child_id)
+        for card, child_id in frame.dealcards.items():
+            self._add_edge(EDGE_CARD, card, child_id)
+        self.edge_count[node_id] = len(self.edge_kind) - self.edge_start[node_id]
+
+    def _add_edge(self, kind, label, child_id):
+        self.edge_kind.append(kind)
+        self.edge_label.append(self.strings.intern(label))
+        self.edge_child.append(child_id)
+
+    def build(self, reader):
+        """Consume a whole document from the reader and return the NodeStore"""
+        reader.begin_object()
+        root = self._new_node(-1)
+
+        # Frames are node frames, or (node frame, container key) while inside childrens/dealcards
+        stack = [root]
+        while stack:
+            frame = stack[-1]
+            key = reader.next_key()
+
+            if isinstance(frame, tuple):
+                owner, container = frame
+                if key is None:
+                    stack.pop()
+                elif reader.peek() == '{':
+                    reader.begin_object()
+                    child = self._new_node(owner.node_id)
+                    getattr(owner, container)[key] = child.node_id
+                    stack.append(child)
+                else:
+                    reader.skip_value()
+                continue
+
+            if key is None:
+                self._finish_node(frame)
+                stack.pop()
+            elif key in ("childrens", "dealcards") and reader.peek() == '{':
+                reader.begin_object()
+                frame.flags |= FLAG_CHILDRENS if key == "childrens" else FLAG_DEALCARDS
+                stack.append((frame, key))
+            else:
+                self._set_field(frame, key, reader.read_value())
+
+        return self.finish()
+
+    def finish(self):
+        """Freeze the growable buffers into NumPy arrays"""
+        def frozen(buffer, dtype):
+            return np.frombuffer(buffer, dtype=dtype) if len(buffer) else np.zeros(0, dtype=dtype)
+
+        nodes = {
+            "parent": frozen(self.parent, np.int32),
+            "depth": frozen(self.depth, np.int32),
+            "flags": frozen(self.flags, np.uint8),
+            "node_type": frozen(self.node_type, np.int32),
+            "player": frozen(self.player, np.int8),
+            "pot": frozen(self.pot, np.float32),
+            "board": frozen(self.board, np.int32),
+            "deal_number": frozen(self.deal_number, np.int32),
+            "edge_start": frozen(self.edge_start, np.int32),
+            "edge_count": frozen(self.edge_count, np.int32),
+            "strategy_index": frozen(self.strategy_index, np.int32),
+        }
+        edges = {
+            "kind": frozen(self.edge_kind, np.uint8),
+            "label": frozen(self.edge_label, np.int32),
+            "child": frozen(self.edge_child, np.int32),
+        }
+        strategies = {
+            "flags": frozen(self.strategy_flags, np.uint8),
+            "action_start": frozen(self.strategy_action_start, np.int32),
+            "action_count": frozen(self.strategy_action_count, np.int32),
+            "actions": frozen(self.strategy_actions, np.int32),
+            "mask_bits": (np.array(self.strategy_mask_bits, dtype=np.uint8) if self.strategy_mask_bits
+                          else np.zeros((0, (COMBO_COUNT + 7) // 8), dtype=np.uint8)),
+            "blocks": self.strategy_blocks,
+        }
+        return NodeStore(self.strings, nodes, edges, strategies)
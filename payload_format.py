@@ -0,0 +1,58 @@
+import json
+import struct
+
+import numpy as np
+
+
+# Compact hand matrix / hand details payloads: a small JSON header followed by
+# little-endian typed-array columns, each starting on a 4-byte boundary.
+#
+#   magic (4s) | version (u8) | dtype (u8) | n_actions (u16) | header length (u32)
+#   header JSON | pad | columns...
+#
+# Hand matrix columns: Uint8[169] reported combos per cell, then the per-cell
+# action probabilities, 169 x n_actions, as Float32 or as Uint8 quantized to 1/255.
+# Hand details columns: the per-combo action probabilities, n_combos x n_actions.
+MATRIX_MAGIC = b"GTHM"
+DETAILS_MAGIC = b"GTHD"
+PAYLOAD_VERSION = 1
+
+DTYPE_FLOAT32 = 0
+DTYPE_UINT8 = 1
+
+MIMETYPE = "application/octet-stream"
+
+_PREAMBLE = struct.Struct("<4sBBHI")
+
+
+def _pad(data):
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _encode(magic, header, columns, probabilities, quantize):
+    probabilities = np.nan_to_num(np.asarray(probabilities, dtype=np.float32))
+    if quantize:
+        values = np.rint(np.clip(probabilities, 0, 1) * 255).astype(np.uint8)
+        dtype = DTYPE_UINT8
+    else:
+        values = probabilities.astype("<f4")
+        dtype = DTYPE_FLOAT32
+
+    header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    n_actions = probabilities.shape[1] if probabilities.ndim == 2 else 0
+    parts = [_PREAMBLE.pack(magic, PAYLOAD_VERSION, dtype, n_actions, len(header)) + header]
+    parts.extend(np.ascontiguousarray(column).tobytes() for column in columns)
+    parts.append(values.tobytes())
+    return b"".join(_pad(part) for part in parts)
+
+
+def encode_hand_matrix(actions, ranks, counts, averages, quantize=False):
+    """Encode per-cell combo counts and average action probabilities"""
+    header = {"actions": actions, "ranks": ranks}
+    return _encode(MATRIX_MAGIC, header, [np.minimum(counts, 255).astype(np.uint8)], averages, quantize)
+
+
+def encode_hand_details(hand, actions, combos, probabilities, expected_combos, quantize=False):
+    """Encode the action probabilities of each reported combo of one hand"""
+    header = {"hand": hand, "actions": actions, "combinations": combos, "expected_combos": expected_combos}
+    return _encode(DETAILS_MAGIC, header, [], probabilities, quantize)
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# How long a prefetch task waits for foreground requests to finish before running anyway
+FOREGROUND_WAIT = 0.25
+
+
+class Prefetcher:
+    """
+    Runs speculative work for the nodes a user is likely to open next on a small
+    background pool. Each session has a generation token: scheduling new work
+    for a session cancels whatever is still queued for it, and tasks yield to
+    foreground requests in flight before they start.
+    """
+
+    def __init__(self, max_workers):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.generations = {}
+        self.futures = {}
+        self.active_requests = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.lock = threading.Lock()
+
+    def request_started(self):
+        with self.lock:
+            self.active_requests += 1
+
+    def request_finished(self):
+        with self.lock:
+            self.active_requests -= 1
+
+    def schedule(self, session_id, tasks):
+        """Replace the queued work of a session with new tasks (callables)"""
+        with self.lock:
+            generation = self.generations.get(session_id, 0) + 1
+            self.generations[session_id] = generation
+            self._cancel_futures(session_id)
+            self.futures[session_id] = [self.executor.submit(self._run, session_id, generation, task)
+                                        for task in tasks]
+
+    def cancel(self, session_id):
+        """Drop all queued work of a session"""
+        with self.lock:
+            self.generations[session_id] = self.generations.get(session_id, 0) + 1
+            self._cancel_futures(session_id)
+            del self.generations[session_id]
+
+    def _cancel_futures(self, session_id):
+        for future in self.futures.pop(session_id, ()):
+            if future.cancel():
+                self.cancelled += 1
+
+    def _run(self, session_id, generation, task):
+        # Let foreground requests go first, within a bounded wait
+        deadline = time.monotonic() + FOREGROUND_WAIT
+        while self.active_requests > 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        with self.lock:
+            if self.generations.get(session_id) != generation:
+                self.cancelled += 1
+                return
+
+        try:
+            task()
+            with self.lock:
+                self.completed += 1
+        except Exception:
+            logger.exception("Prefetch task failed for session %s", session_id)
+
+    def usage(self):
+        """Return prefetch counters"""
+        with self.lock:
+            return {
+                "sessions": len(self.futures),
+                "queued": sum(not f.done() for futures in self.futures.values() for f in futures),
+                "completed": self.completed,
+                "cancelled": self.cancelled
+            }
@@ -0,0 +1,69 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+
+# A serialized response body and its strong ETag
+CacheEntry = namedtuple("CacheEntry", ["body", "etag"])
+
+
+class ResultCache:
+    """
+    Serialized per-node responses, keyed by (tree content hash, endpoint, node, ...).
+    Trees never change once converted, so entries stay valid until they are
+    evicted, least recently used first, to keep the total body size under max_bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached entry for a key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body):
+        """Cache a response body and return its entry"""
+        entry = CacheEntry(body, hashlib.sha256(body).hexdigest()[:32])
+        if len(body) > self.max_bytes:
+            return entry
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= len(previous.body)
+            self.entries[key] = entry
+            self.nbytes += len(body)
+
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= len(evicted.body)
+        return entry
+
+    def clear(self):
+        """Drop every entry; the hit and miss counts are kept"""
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def usage(self):
+        """Return the size and hit counts of the cache"""
+        with self.lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "nbytes": self.nbytes,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
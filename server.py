@@ -1,9 +1,26 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, g, request, jsonify, render_template, stream_with_context
+import gzip
 import json
+import hashlib
 import os
 import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
 from werkzeug.utils import secure_filename
-from tree_processor import GameTreeProcessor
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from chunked_upload import CHECKSUMS, ChunkedUploads, UploadError
+from ingest import IngestQueue, StreamNotReady
+from metrics import Metrics, SlowRequestProfiler, finish_request, phase, start_request
+from payload_format import MIMETYPE as BINARY_MIMETYPE
+from prefetch import Prefetcher
+from result_cache import ResultCache
+from session_manager import SessionManager
+from tree_processor import BUNDLE_VIEWS
+from tree_export import EXPORT_FORMATS
+from tree_query import QUERY_FIELDS
 
 app = Flask(__name__,
             static_url_path='',
@@ -11,11 +28,296 @@ app = Flask(__name__,
             template_folder='templates')
 
 # Configuration
-app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024  # 32MB max file size
-
-# Temporary storage for the loaded trees
-loaded_trees = {}
+# Larger files are sent as chunked uploads, each chunk within MAX_CONTENT_LENGTH
+app.config['MAX_UPLOAD_SIZE'] = int(os.environ.get('GTO_MAX_UPLOAD_MB', 8192)) * 1024 * 1024
+app.config['UPLOAD_CHUNK_BYTES'] = int(os.environ.get('GTO_UPLOAD_CHUNK_MB', 8)) * 1024 * 1024
+app.config['SESSION_FOLDER'] = os.environ.get('GTO_SESSION_FOLDER',
+                                              os.path.join(tempfile.gettempdir(), 'gto_sessions'))
+app.config['SESSION_MEMORY_BUDGET'] = int(os.environ.get('GTO_SESSION_MEMORY_MB', 1024)) * 1024 * 1024
+app.config['SESSION_IDLE_TTL'] = int(os.environ.get('GTO_SESSION_IDLE_TTL', 30 * 60))  # seconds
+app.config['SESSION_TTL'] = int(os.environ.get('GTO_SESSION_TTL', 7 * 24 * 60 * 60))  # seconds
+app.config['INGEST_WORKERS'] = int(os.environ.get('GTO_INGEST_WORKERS', os.cpu_count() or 1))
+app.config['STREAM_READY_TIMEOUT'] = float(os.environ.get('GTO_STREAM_READY_TIMEOUT', 10))  # seconds
+app.config['STREAM_IDLE_TIMEOUT'] = float(os.environ.get('GTO_STREAM_IDLE_TIMEOUT', 60))  # seconds
+app.config['RESULT_CACHE_BYTES'] = int(os.environ.get('GTO_RESULT_CACHE_MB', 64)) * 1024 * 1024
+app.config['PREFETCH_WORKERS'] = int(os.environ.get('GTO_PREFETCH_WORKERS', 1))
+app.config['PROFILE_SLOW_MS'] = int(os.environ.get('GTO_PROFILE_SLOW_MS', 0))  # 0 disables profiling
+app.config['PROFILE_FOLDER'] = os.environ.get('GTO_PROFILE_FOLDER',
+                                              os.path.join(app.config['SESSION_FOLDER'], 'profiles'))
+app.config['METRICS_ALLOW_REMOTE'] = os.environ.get('GTO_METRICS_ALLOW_REMOTE') == '1'
+
+# Read size used when forwarding request bodies to the parser
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Bounds for lazily loaded tree pages
+MAX_SUBTREE_DEPTH = 4
+MAX_SUBTREE_PAGE = 200
+
+# Most nodes a single bundle request may ask for
+MAX_BUNDLE_NODES = 20
+
+# Most children of a node whose views are precomputed after it is opened
+MAX_PREFETCH_CHILDREN = 64
+
+# Default and largest number of matches a tree query streams back
+DEFAULT_QUERY_LIMIT = 500
+MAX_QUERY_LIMIT = 5000
+
+# Default and largest number of nodes and combos a diff reports
+DEFAULT_DIFF_TOP = 20
+MAX_DIFF_TOP = 200
+
+# API responses smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = ('application/json', BINARY_MIMETYPE)
+
+# Precomputes the views of children of the node a user just opened
+prefetcher = Prefetcher(app.config['PREFETCH_WORKERS'])
+
+# Open trees, bounded by a memory budget and spilled to SESSION_FOLDER
+# Work still queued for a session is dropped when it is removed or expires
+sessions = SessionManager(app.config['SESSION_FOLDER'],
+                          memory_budget=app.config['SESSION_MEMORY_BUDGET'],
+                          idle_ttl=app.config['SESSION_IDLE_TTL'],
+                          session_ttl=app.config['SESSION_TTL'],
+                          on_forget=prefetcher.cancel)
+
+# Request latencies, phase timings and ingest durations of this process
+metrics = Metrics()
+
+# Samples the stacks of requests in flight, keeping profiles of the slow ones
+profiler = (SlowRequestProfiler(app.config['PROFILE_FOLDER'], app.config['PROFILE_SLOW_MS'] / 1000)
+            if app.config['PROFILE_SLOW_MS'] > 0 else None)
+
+# Uploads are parsed in worker processes; job state is kept next to the sessions
+ingest = IngestQueue(os.path.join(app.config['SESSION_FOLDER'], 'jobs'),
+                     max_workers=app.config['INGEST_WORKERS'],
+                     ready_timeout=app.config['STREAM_READY_TIMEOUT'],
+                     on_finish=metrics.observe_ingest)
+
+# Chunked uploads in progress, stored next to the sessions
+uploads = ChunkedUploads(os.path.join(app.config['SESSION_FOLDER'], 'uploads'), ingest, sessions,
+                         max_size=app.config['MAX_UPLOAD_SIZE'],
+                         max_chunk_size=app.config['MAX_CONTENT_LENGTH'],
+                         idle_timeout=app.config['STREAM_IDLE_TIMEOUT'])
+
+# Serialized per-node responses shared by every session of the same tree
+results = ResultCache(app.config['RESULT_CACHE_BYTES'])
+
+
+@app.before_request
+def track_request_start():
+    if request.path.startswith('/api/'):
+        prefetcher.request_started()
+        g.timings = start_request()
+        if profiler is not None:
+            profiler.start()
+
+        # Compressed responses carry an encoding suffix on their ETag; match on the body's ETag
+        if_none_match = request.environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            request.environ['HTTP_IF_NONE_MATCH'] = if_none_match.replace('-br"', '"').replace('-gzip"', '"')
+
+
+def endpoint_label():
+    """Name a request by its URL rule so metrics do not grow with session ids"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+# Registered before compress_response so it runs after it and sees the compression time
+@app.after_request
+def record_timing(response):
+    """Report the phases of an API request in a Server-Timing header and record its latency"""
+    timings = finish_request() if request.path.startswith('/api/') else None
+    if timings is None:
+        return response
+
+    total = timings.elapsed()
+    response.headers['Server-Timing'] = timings.server_timing(total)
+    metrics.observe_request(endpoint_label(), request.method, response.status_code, timings, total)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Compress API responses with brotli or gzip when the client accepts it"""
+    # Streamed responses are left alone: compressing them here would buffer the whole body
+    if (not request.path.startswith('/api/') or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    accepted = request.accept_encodings
+    with phase('compress'):
+        if brotli is not None and accepted['br']:
+            encoding, data = 'br', brotli.compress(data, quality=5)
+        elif accepted['gzip']:
+            encoding, data = 'gzip', gzip.compress(data, compresslevel=6)
+        else:
+            return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+@app.teardown_request
+def track_request_end(exc=None):
+    if request.path.startswith('/api/'):
+        prefetcher.request_finished()
+        if profiler is not None and 'timings' in g:
+            profiler.stop(f'{request.method} {endpoint_label()}', g.timings.elapsed())
+
+
+def get_processor(session_id):
+    """Return the processor for a session, or None if it does not exist"""
+    return sessions.get(session_id)
+
+
+def node_key(processor, path, node_id):
+    """Identify the node a request is about for result caching"""
+    resolved = processor.resolve_node(path, node_id)
+    return resolved if resolved is not None else path
+
+
+def has_node(processor, node_id):
+    """Check a node id given in a request; requests without one address a node by path"""
+    return node_id is None or processor.resolve_node(node_id=node_id) is not None
+
+
+def conditional_response(entry, mimetype):
+    """Send a cached body with a strong ETag, answering If-None-Match with 304"""
+    response = app.response_class(entry.body, mimetype=mimetype)
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def cached_json(session_id, endpoint, key, compute):
+    """Serve a cached JSON result"""
+    cache_key = (sessions.content_hash(session_id), endpoint) + key
+    with phase('cache'):
+        entry = results.get(cache_key)
+    if entry is None:
+        value = compute()
+        with phase('serialize'):
+            body = jsonify(value).get_data()
+        with phase('cache'):
+            entry = results.put(cache_key, body)
+    return conditional_response(entry, 'application/json')
+
+
+def cached_binary(session_id, endpoint, key, compute):
+    """Serve a cached compact binary payload; compute may return a dict to answer in JSON instead"""
+    cache_key = (sessions.content_hash(session_id), endpoint, 'binary') + key
+    with phase('cache'):
+        entry = results.get(cache_key)
+    if entry is None:
+        payload = compute()
+        if isinstance(payload, dict):
+            return jsonify(payload)
+        with phase('cache'):
+            entry = results.put(cache_key, payload)
+    return conditional_response(entry, BINARY_MIMETYPE)
+
+
+def cached_view(content_hash, processor, view, node_id, path, shared=None):
+    """Return the serialized bundle view of a resolved node, computing it on a cache miss"""
+    key = (content_hash, view, node_id, path) if view == 'node' else (content_hash, view, node_id)
+    with phase('cache'):
+        entry = results.get(key)
+    if entry is None:
+        value = processor.bundle_view(view, node_id, path, shared)
+        with phase('serialize'):
+            body = jsonify(value).get_data()
+        with phase('cache'):
+            entry = results.put(key, body)
+    return entry.body
+
+
+def prefetch_children(session_id, processor, node_id, path, views):
+    """Queue the views of a node's children so the next click is a cache hit"""
+    content_hash = sessions.content_hash(session_id)
+    children = processor.child_paths(node_id, path)[:MAX_PREFETCH_CHILDREN]
+
+    def task(child_id, child_path):
+        def run():
+            shared = {}
+            with app.app_context():
+                for view in views:
+                    cached_view(content_hash, processor, view, child_id, child_path, shared)
+        return run
+
+    prefetcher.schedule(session_id, [task(child_id, child_path) for child_id, child_path in children])
+
+
+def read_chunks(stream):
+    """Yield a request body in chunks as it arrives"""
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def multipart_file(stream, boundary, field_name):
+    """
+    Find a file field of a multipart body as it streams in, without spooling it.
+    Yields the file's name first, then its content in chunks; yields nothing if the field is missing.
+    """
+    decoder = MultipartDecoder(boundary)
+    in_field = False
+    while True:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            if decoder.complete:
+                return
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+        elif isinstance(event, File):
+            in_field = event.name == field_name
+            if in_field:
+                yield event.filename
+        elif isinstance(event, Data):
+            if in_field:
+                if event.data:
+                    yield event.data
+                if not event.more_data:
+                    return
+        elif isinstance(event, Epilogue):
+            return
+        else:
+            in_field = False
+
+
+def upload_source():
+    """
+    Return (filename, chunks) for an upload sent either as multipart form data
+    with a "file" field or as the raw request body with a filename parameter.
+    Raises ValueError when there is no file.
+    """
+    if request.mimetype == 'multipart/form-data':
+        boundary = request.mimetype_params.get('boundary', '').encode('latin-1')
+        parts = multipart_file(request.stream, boundary, 'file')
+        filename = next(parts, None)
+        if filename is None:
+            raise ValueError('No file part')
+        if filename == '':
+            raise ValueError('No selected file')
+        return filename, parts
+
+    filename = request.args.get('filename') or request.headers.get('X-Filename', '')
+    if not filename:
+        raise ValueError('No selected file')
+    return filename, read_chunks(request.stream)
 
 
 @app.route('/')
@@ -24,62 +326,236 @@ def index():
     return render_template('index.html')
 
 
+def publish_upload(filename, content_hash, upload):
+    """
+    Open a session on uploaded content. The upload is committed to ingestion
+    unless its tree already exists or is being parsed, in which case it is
+    discarded. Returns the response body and status.
+    """
+    # Identical uploads share one tree; only the first one to finish is kept
+    with sessions.ingest_lock(content_hash):
+        job_id = None
+        if sessions.has_tree(content_hash):
+            if upload is not None:
+                upload.discard()
+        else:
+            if upload is None:
+                # The announced tree vanished while the body was hashed; have the client send it again
+                return {'error': 'Tree is no longer available; upload it again'}, 409
+            job_id = ingest.pending_job(content_hash)
+            if job_id is None:
+                job_id = upload.commit(content_hash, sessions.tree_file_path(content_hash))
+            else:
+                upload.discard()
+        session_id = sessions.open_session(content_hash)
+
+    if job_id is not None:
+        # Conversion continues in the background; the client polls the job
+        return {
+            'session_id': session_id,
+            'filename': filename,
+            'job_id': job_id
+        }, 202
+
+    # Return session ID and basic info
+    return {
+        'session_id': session_id,
+        'filename': filename,
+        'reused': True,
+        'game_info': get_processor(session_id).get_game_info()
+    }, 200
+
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Handle file upload and preprocessing"""
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
+    """Stream an upload into a background parser, hashing it and enforcing the size limit in flight"""
+    try:
+        filename, chunks = upload_source()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'File too large'}), 413
+
+    filename = secure_filename(filename)
+    # Clients may announce the content hash so re-uploads of a known tree are only hashed, not parsed
+    expected_hash = request.headers.get('X-Content-SHA256', '').lower() or None
+    upload = None
+    try:
+        # The body goes straight to a parsing worker; nothing is written to disk until the tree is converted.
+        # When every streaming worker is taken, it is spooled to disk and parsed once it has arrived.
+        if expected_hash is None or not sessions.has_tree(expected_hash):
+            upload = ingest.open_stream(filename, request.content_length) or ingest.spool(filename)
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if size > app.config['MAX_CONTENT_LENGTH']:
+                raise RequestEntityTooLarge()
+            digest.update(chunk)
+            if upload is not None:
+                try:
+                    upload.write(chunk)
+                except StreamNotReady:
+                    # No worker freed up in time; nothing was forwarded yet
+                    upload = ingest.spool(filename)
+                    upload.write(chunk)
+        if size == 0:
+            return jsonify({'error': 'Uploaded file is empty'}), 400
+        content_hash = digest.hexdigest()
+        if expected_hash is not None and content_hash != expected_hash:
+            return jsonify({'error': 'Uploaded content does not match X-Content-SHA256'}), 400
+
+        result, status = publish_upload(filename, content_hash, upload)
+        upload = None
+        return jsonify(result), status
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'File too large'}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if upload is not None:
+            upload.abort()
 
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
 
-    if file:
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+@app.route('/api/uploads', methods=['POST'])
+def create_chunked_upload():
+    """Start a chunked upload; the client then PUTs its chunks and finalizes it"""
+    try:
+        body = request.get_json(silent=True) or {}
+        filename = secure_filename(body.get('filename') or '')
+        if not filename:
+            return jsonify({'error': 'No selected file'}), 400
+        content_hash = (body.get('sha256') or '').lower() or None
+        upload = uploads.create(filename, body.get('size'),
+                                body.get('chunk_size') or app.config['UPLOAD_CHUNK_BYTES'], content_hash)
+        return jsonify(upload.status()), 201
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        try:
-            # Process the game tree
-            processor = GameTreeProcessor(file_path)
-            session_id = processor.get_session_id()
-            loaded_trees[session_id] = processor
-
-            # Return session ID and basic info
-            return jsonify({
-                'session_id': session_id,
-                'filename': filename,
-                'game_info': processor.get_game_info()
-            })
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
-        finally:
-            # Clean up the file
-            os.remove(file_path)
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """Report which chunks of an upload have arrived, so an interrupted client can resume"""
+    upload = uploads.get(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(upload.status())
+
+
+@app.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """Store one chunk, checked against its X-Chunk-SHA256 or X-Chunk-CRC32 header"""
+    upload = uploads.get(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    try:
+        for algorithm in CHECKSUMS:
+            checksum = request.headers.get(f'X-Chunk-{algorithm.upper()}', '').lower()
+            if checksum:
+                break
+        else:
+            return jsonify({'error': 'Missing X-Chunk-SHA256 or X-Chunk-CRC32 header'}), 400
+
+        upload.put_chunk(index, request.get_data(cache=False), algorithm, checksum)
+        status = upload.status()
+        return jsonify({
+            'upload_id': upload_id,
+            'index': index,
+            'chunks_received': status['chunks_received'],
+            'offset': status['offset']
+        })
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Chunk too large'}), 413
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """Check a complete upload against its announced hash and open a session on it"""
+    upload = uploads.get(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    try:
+        if upload.state['result'] is not None:
+            return jsonify(upload.state['result']), 202 if 'job_id' in upload.state['result'] else 200
+
+        content_hash = upload.wait_hashed()
+        if upload.state['sha256'] is not None and content_hash != upload.state['sha256']:
+            return jsonify({'error': 'Uploaded content does not match its sha256'}), 400
+
+        result, status = publish_upload(upload.filename, content_hash, upload)
+        if status < 300:
+            upload.finish(result)
+        return jsonify(result), status
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def delete_chunked_upload(upload_id):
+    """Cancel an upload and delete its chunks"""
+    if not uploads.delete(upload_id):
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify({'status': 'success'})
 
 
-@app.route('/api/tree/<session_id>', methods=['GET'])
-def get_tree_structure(session_id):
-    """Get the tree structure for rendering"""
-    if session_id not in loaded_trees:
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Report the stage, progress and ETA of a background upload"""
+    status = ingest.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
+
+
+@app.route('/api/subtree/<session_id>', methods=['GET'])
+def get_subtree(session_id):
+    """Get a few levels of the tree below a path, with paginated children"""
+    processor = get_processor(session_id)
+    if processor is None:
         return jsonify({'error': 'Session not found'}), 404
 
-    processor = loaded_trees[session_id]
-    return jsonify(processor.get_tree_structure())
+    path = request.args.get('path', '')
+    node_id = request.args.get('node', type=int)
+    depth = min(max(request.args.get('depth', 2, type=int), 1), MAX_SUBTREE_DEPTH)
+    cursor = max(request.args.get('cursor', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_SUBTREE_PAGE)
+
+    try:
+        key = (path, node_id, depth, cursor, limit)
+        return cached_json(session_id, 'subtree', key,
+                           lambda: processor.get_subtree(path, depth, cursor, limit, node_id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/node/<session_id>', methods=['GET'])
 def get_node(session_id):
     """Get detailed information about a specific node"""
-    if session_id not in loaded_trees:
+    processor = get_processor(session_id)
+    if processor is None:
         return jsonify({'error': 'Session not found'}), 404
 
     path = request.args.get('path', '')
-    processor = loaded_trees[session_id]
+    node_id = request.args.get('node', type=int)
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
 
     try:
-        node_info = processor.get_node_info(path)
-        return jsonify(node_info)
+        key = (node_key(processor, path, node_id), path)
+        return cached_json(session_id, 'node', key, lambda: processor.get_node_info(path, node_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -87,15 +563,19 @@ def get_node(session_id):
 @app.route('/api/strategy/<session_id>', methods=['GET'])
 def get_strategy(session_id):
     """Get strategy information for a specific node"""
-    if session_id not in loaded_trees:
+    processor = get_processor(session_id)
+    if processor is None:
         return jsonify({'error': 'Session not found'}), 404
 
     path = request.args.get('path', '')
-    processor = loaded_trees[session_id]
+    node_id = request.args.get('node', type=int)
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
 
     try:
-        strategy_info = processor.get_strategy_info(path)
-        return jsonify(strategy_info)
+        key = (node_key(processor, path, node_id),)
+        return cached_json(session_id, 'strategy', key, lambda: processor.get_strategy_info(path, node_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -103,70 +583,246 @@ def get_strategy(session_id):
 @app.route('/api/hand_matrix/<session_id>', methods=['GET'])
 def get_hand_matrix(session_id):
     """Get hand matrix data for a specific node"""
-    if session_id not in loaded_trees:
+    processor = get_processor(session_id)
+    if processor is None:
         return jsonify({'error': 'Session not found'}), 404
 
     path = request.args.get('path', '')
-    processor = loaded_trees[session_id]
+    node_id = request.args.get('node', type=int)
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
 
     try:
-        matrix_data = processor.get_hand_matrix_data(path)
-        return jsonify(matrix_data)
+        key = (node_key(processor, path, node_id),)
+        if request.args.get('format') == 'binary':
+            quantize = request.args.get('precision') == 'u8'
+            return cached_binary(session_id, 'hand_matrix', key + (quantize,), lambda: (
+                processor.get_hand_matrix_packed(path, node_id, quantize) or {'has_strategy': False}))
+        return cached_json(session_id, 'hand_matrix', key, lambda: processor.get_hand_matrix_data(path, node_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/direct_node/<session_id>', methods=['GET'])
-def get_direct_node(session_id):
-    """Direct node access when regular path navigation fails"""
-    if session_id not in loaded_trees:
+@app.route('/api/bundle/<session_id>', methods=['GET'])
+def get_bundle(session_id):
+    """Get several views of one or more nodes in a single request"""
+    processor = get_processor(session_id)
+    if processor is None:
         return jsonify({'error': 'Session not found'}), 404
 
-    path = request.args.get('path', '')
+    targets = ([(None, node_id) for node_id in request.args.getlist('node', type=int)]
+               + [(path, None) for path in request.args.getlist('path')])
+    if not targets:
+        targets = [('', None)]
+    if len(targets) > MAX_BUNDLE_NODES:
+        return jsonify({'error': f'At most {MAX_BUNDLE_NODES} nodes per bundle'}), 400
+
+    requested = request.args.get('views', ','.join(BUNDLE_VIEWS)).split(',')
+    views = tuple(view for view in BUNDLE_VIEWS if view in requested)
     action_sequence = request.args.get('actions', '')
-    processor = loaded_trees[session_id]
-
-    try:
-        # First try using the normal method
-        node_info = processor.get_node_info(path)
-        return jsonify(node_info)
-    except Exception as e:
-        # If that fails, try finding the node by action sequence
-        if action_sequence:
-            try:
-                actions = action_sequence.split(',')
-                node = processor.get_node_by_action_sequence(actions)
-                if node:
-                    # Create minimal node info
-                    return jsonify({
-                        "node_type": node.get("node_type", "unknown"),
-                        "player": node.get("player", 0),
-                        "actions": node.get("actions", []),
-                        "has_strategy": "strategy" in node,
-                        "path": path
-                    })
-            except Exception as inner_e:
-                pass
-
-        # Last resort - return an error with recovery info
-        return jsonify({
-            'error': str(e),
-            'recovery_info': 'Node not found in tree structure. Try navigating through a different path.'
-        }), 404
+    actions = action_sequence.split(',') if action_sequence else None
+
+    try:
+        content_hash = sessions.content_hash(session_id)
+        nodes = []
+        for path, node_id in targets:
+            resolved, resolved_path = processor.resolve_bundle_target(path or '', node_id, actions)
+            if resolved is None:
+                if node_id is None and 'node' in views and processor.is_container_path(path):
+                    nodes.append(json.dumps({'node': {'has_strategy': False, 'path': path}}).encode())
+                else:
+                    missing = f'Node not found: {node_id}' if node_id is not None else f'Node not found at path: {path}'
+                    nodes.append(json.dumps({'error': missing}).encode())
+                continue
+
+            # Views are cached one by one so prefetched and single-view results are reused
+            shared = {}
+            parts = [b'"node_id":%d' % resolved]
+            for view in views:
+                body = cached_view(content_hash, processor, view, resolved, resolved_path, shared)
+                parts.append(b'"%s":%s' % (view.encode(), body.strip()))
+            nodes.append(b'{' + b','.join(parts) + b'}')
+
+            if len(targets) == 1:
+                prefetch_children(session_id, processor, resolved, resolved_path, views)
+
+        response = app.response_class(b'{"nodes":[' + b','.join(nodes) + b']}', mimetype='application/json')
+        response.add_etag()
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/ev_analysis/<session_id>', methods=['GET'])
 def get_ev_analysis(session_id):
     """Get EV analysis data for a specific node"""
-    if session_id not in loaded_trees:
+    processor = get_processor(session_id)
+    if processor is None:
         return jsonify({'error': 'Session not found'}), 404
 
     path = request.args.get('path', '')
-    processor = loaded_trees[session_id]
+    node_id = request.args.get('node', type=int)
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
 
     try:
-        ev_data = processor.get_ev_analysis(path)
-        return jsonify(ev_data)
+        key = (node_key(processor, path, node_id),)
+        return cached_json(session_id, 'ev_analysis', key, lambda: processor.get_ev_analysis(path, node_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/runout/<session_id>', methods=['GET'])
+def get_runout(session_id):
+    """Get per-card action frequencies across every dealt card of a chance node"""
+    processor = get_processor(session_id)
+    if processor is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    path = request.args.get('path', '')
+    node_id = request.args.get('node', type=int)
+    heatmap = request.args.get('heatmap') in ('1', 'true')
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
+
+    try:
+        key = (node_key(processor, path, node_id), heatmap)
+        return cached_json(session_id, 'runout', key, lambda: processor.get_runout_report(path, node_id, heatmap))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/query/<session_id>', methods=['GET'])
+def query_tree(session_id):
+    """Stream the nodes matching a tree-wide query as newline-delimited JSON"""
+    processor = get_processor(session_id)
+    if processor is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    criteria = {field: request.args.get(field) for field in QUERY_FIELDS if request.args.get(field)}
+    if 'history' in criteria:
+        criteria['history'] = criteria['history'].split(',')
+    limit = min(max(request.args.get('limit', DEFAULT_QUERY_LIMIT, type=int), 1), MAX_QUERY_LIMIT)
+
+    try:
+        # One match past the limit tells whether the results were cut short
+        matches = processor.query_nodes(criteria, limit + 1)
+        # Surface invalid criteria as a JSON error before streaming starts
+        first = next(matches, None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        count = 0
+        try:
+            if first is not None:
+                count += 1
+                yield json.dumps(first) + '\n'
+            for match in matches:
+                if count == limit:
+                    yield json.dumps({'done': True, 'matched': count, 'truncated': True}) + '\n'
+                    return
+                count += 1
+                yield json.dumps(match) + '\n'
+            yield json.dumps({'done': True, 'matched': count, 'truncated': False}) + '\n'
+        except Exception as e:
+            yield json.dumps({'done': True, 'matched': count, 'error': str(e)}) + '\n'
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/export/<session_id>', methods=['GET'])
+def export_strategies(session_id):
+    """Stream every decision node's strategy as a long table in Parquet, NPZ or CSV"""
+    processor = get_processor(session_id)
+    if processor is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    export_format = request.args.get('format', 'parquet')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown export format: {export_format} "
+                                 f"(expected one of {', '.join(EXPORT_FORMATS)})"}), 400
+    try:
+        chunks = processor.export_strategies(export_format)
+        # Surface a missing writer dependency as a JSON error before streaming starts
+        first = next(chunks, b'')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        yield first
+        yield from chunks
+
+    _, extension, mimetype = EXPORT_FORMATS[export_format]
+    response = app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="strategies-{session_id}.{extension}"'
+    return response
+
+
+@app.route('/api/diff/<session_id>', methods=['GET'])
+def diff_sessions(session_id):
+    """Compare a session's strategies with another session's, reporting the most divergent nodes and combos"""
+    processor = get_processor(session_id)
+    other_id = request.args.get('other', '')
+    other = get_processor(other_id)
+    if processor is None or other is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    path = request.args.get('path', '')
+    node_id = request.args.get('node', type=int)
+    top_k = max(1, min(request.args.get('top', DEFAULT_DIFF_TOP, type=int), MAX_DIFF_TOP))
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
+
+    try:
+        key = (sessions.content_hash(other_id), node_key(processor, path, node_id), top_k)
+        return cached_json(session_id, 'diff', key, lambda: processor.diff_with(other, path, node_id, top_k))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/summary/<session_id>', methods=['GET'])
+def get_summary(session_id):
+    """Get the precomputed subtree stats and range-weighted frequencies of a node"""
+    processor = get_processor(session_id)
+    if processor is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    path = request.args.get('path', '')
+    node_id = request.args.get('node', type=int)
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
+
+    try:
+        summary = processor.get_node_summary(path, node_id)
+        with phase('serialize'):
+            return jsonify(summary)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/stats/<session_id>', methods=['GET'])
+def get_tree_stats(session_id):
+    """Get the node, depth, branching and size counts gathered when the tree was ingested"""
+    processor = get_processor(session_id)
+    if processor is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    path = request.args.get('path', '')
+    node_id = request.args.get('node', type=int)
+
+    try:
+        return jsonify(processor.get_tree_stats(path, node_id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -174,16 +830,24 @@ def get_ev_analysis(session_id):
 @app.route('/api/hand_details/<session_id>', methods=['GET'])
 def get_hand_details(session_id):
     """Get detailed information about a specific hand at a node"""
-    if session_id not in loaded_trees:
+    processor = get_processor(session_id)
+    if processor is None:
         return jsonify({'error': 'Session not found'}), 404
 
     path = request.args.get('path', '')
+    node_id = request.args.get('node', type=int)
     hand = request.args.get('hand', '')
-    processor = loaded_trees[session_id]
+
+    if not has_node(processor, node_id):
+        return jsonify({'error': f'Node not found: {node_id}'}), 404
 
     try:
-        hand_data = processor.get_hand_details(path, hand)
-        return jsonify(hand_data)
+        key = (node_key(processor, path, node_id), hand)
+        if request.args.get('format') == 'binary':
+            quantize = request.args.get('precision') == 'u8'
+            return cached_binary(session_id, 'hand_details', key + (quantize,),
+                                 lambda: processor.get_hand_details_packed(path, hand, node_id, quantize))
+        return cached_json(session_id, 'hand_details', key, lambda: processor.get_hand_details(path, hand, node_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -191,11 +855,58 @@ def get_hand_details(session_id):
 @app.route('/api/session/<session_id>', methods=['DELETE'])
 def delete_session(session_id):
     """Clean up a session when the user is done"""
-    if session_id in loaded_trees:
-        del loaded_trees[session_id]
+    if sessions.remove(session_id):
         return jsonify({'status': 'success'})
     return jsonify({'error': 'Session not found'}), 404
 
 
+@app.route('/api/sessions/usage', methods=['GET'])
+def get_session_usage():
+    """Report memory used by open sessions against the configured budget"""
+    usage = sessions.usage()
+    usage['result_cache'] = results.usage()
+    usage['prefetch'] = prefetcher.usage()
+    return jsonify(usage)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose latencies, cache hit rates, session memory and ingest durations in the Prometheus text format"""
+    if not app.config['METRICS_ALLOW_REMOTE'] and request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'Metrics are only served locally'}), 403
+
+    cache = results.usage()
+    lookups = cache['hits'] + cache['misses']
+    usage = sessions.usage()
+    prefetch = prefetcher.usage()
+    families = [
+        ('gto_result_cache_hits_total', 'counter', 'Result cache lookups that found an entry', (), [((), cache['hits'])]),
+        ('gto_result_cache_misses_total', 'counter', 'Result cache lookups that missed', (), [((), cache['misses'])]),
+        ('gto_result_cache_hit_ratio', 'gauge', 'Share of result cache lookups that hit since startup', (),
+         [((), round(cache['hits'] / lookups, 6) if lookups else 0)]),
+        ('gto_result_cache_bytes', 'gauge', 'Size of the cached response bodies', (), [((), cache['nbytes'])]),
+        ('gto_result_cache_entries', 'gauge', 'Number of cached responses', (), [((), cache['entries'])]),
+        ('gto_session_memory_budget_bytes', 'gauge', 'Memory budget for open trees', (), [((), usage['memory_budget'])]),
+        ('gto_session_memory_used_bytes', 'gauge', 'Memory held by open trees', (), [((), usage['memory_used'])]),
+        ('gto_tree_memory_bytes', 'gauge', 'Memory held by each open tree', ('content_hash',),
+         [((tree['content_hash'],), tree['nbytes']) for tree in usage['trees']]),
+        ('gto_tree_sessions', 'gauge', 'Sessions referencing each open tree', ('content_hash',),
+         [((tree['content_hash'],), tree['sessions']) for tree in usage['trees']]),
+        ('gto_sessions', 'gauge', 'Known sessions', (), [((), usage['session_count'])]),
+        ('gto_session_evictions_total', 'counter', 'Trees dropped from memory', (), [((), usage['evictions'])]),
+        ('gto_session_reloads_total', 'counter', 'Trees reopened from their session file', (), [((), usage['reloads'])]),
+        ('gto_prefetch_queued', 'gauge', 'Prefetch tasks waiting to run', (), [((), prefetch['queued'])]),
+        ('gto_prefetch_completed_total', 'counter', 'Prefetch tasks run', (), [((), prefetch['completed'])]),
+        ('gto_prefetch_cancelled_total', 'counter', 'Prefetch tasks cancelled before running', (),
+         [((), prefetch['cancelled'])]),
+    ]
+    if profiler is not None:
+        families.append(('gto_slow_request_profiles_total', 'counter', 'Profiles written for slow requests', (),
+                         [((), profiler.written)]))
+
+    return app.response_class(metrics.render(families), mimetype='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5100)
+    # Threaded, so a slow upload only holds its own thread while others keep browsing
+    app.run(debug=True, host='0.0.0.0', port=5100, threaded=True)
@@ -0,0 +1,180 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from combos import COMBO_COUNT
+from node_store import NodeStore, StringTable
+
+
+# File layout: magic, version, header length, JSON header, then 64-byte aligned arrays.
+# Bump FORMAT_VERSION whenever the layout or the meaning of an array changes.
+MAGIC = b"GTOSTORE"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sII")
+
+NODE_ARRAYS = ("parent", "depth", "flags", "node_type", "player", "pot", "board",
+               "deal_number", "edge_start", "edge_count", "strategy_index")
+EDGE_ARRAYS = {"kind": "edge_kind", "label": "edge_label", "child": "edge_child"}
+STRATEGY_ARRAYS = {"flags": "strategy_flags", "action_start": "strategy_action_start",
+                   "action_count": "strategy_action_count", "actions": "strategy_actions",
+                   "mask_bits": "strategy_mask_bits"}
+
+
+class SessionFormatError(ValueError):
+    """Raised when a session file is missing, truncated or written by another format version"""
+
+
+class MappedBlocks:
+    """Per-node strategy arrays viewed on demand from one flat memory-mapped buffer"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __getitem__(self, index):
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self.data[start:end].reshape(COMBO_COUNT, (end - start) // COMBO_COUNT)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_store(store, file_path, metadata=None, extra_arrays=None):
+    """
+    Write a NodeStore to file_path atomically in the memory-mappable session format.
+    extra_arrays holds derived per-tree arrays by name, returned again by load_store.
+    """
+    arrays = {}
+    for name in NODE_ARRAYS:
+        arrays["node." + name] = getattr(store, name)
+    for name, attribute in EDGE_ARRAYS.items():
+        arrays["edge." + name] = getattr(store, attribute)
+    for name, attribute in STRATEGY_ARRAYS.items():
+        arrays["strategy." + name] = getattr(store, attribute)
+
+    blocks = store.strategy_blocks
+    sizes = [blocks[i].size for i in range(len(blocks))]
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    arrays["strategy.offsets"] = offsets
+    for name, values in (extra_arrays or {}).items():
+        arrays["extra." + name] = np.asarray(values)
+
+    strings = json.dumps(store.strings.strings).encode("utf-8")
+
+    # Lay out every array after the header, keeping each one aligned
+    layout = {}
+    position = 0
+    for name, values in arrays.items():
+        layout[name] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": position}
+        position = _aligned(position + values.nbytes)
+    layout["strategy.data"] = {"dtype": np.dtype(np.float32).str, "shape": [int(offsets[-1])], "offset": position}
+    position = _aligned(position + int(offsets[-1]) * 4)
+    layout["strings"] = {"offset": position, "length": len(strings)}
+
+    header = json.dumps({"arrays": layout, "metadata": metadata or {}}).encode("utf-8")
+    data_start = _aligned(_PREAMBLE.size + len(header))
+
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+
+            for name, values in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(np.ascontiguousarray(values).tobytes())
+
+            f.seek(data_start + layout["strategy.data"]["offset"])
+            for i in range(len(blocks)):
+                f.write(np.ascontiguousarray(blocks[i], dtype=np.float32).tobytes())
+
+            f.seek(data_start + layout["strings"]["offset"])
+            f.write(strings)
+
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def read_header(file_path):
+    """Read and validate the header of a session file, returning (header, data offset)"""
+    try:
+        with open(file_path, "rb") as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise SessionFormatError(f"Truncated session file: {file_path}")
+
+            magic, version, header_length = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC:
+                raise SessionFormatError(f"Not a session file: {file_path}")
+            if version != FORMAT_VERSION:
+                raise SessionFormatError(
+                    f"Session file format version {version} is not supported (expected {FORMAT_VERSION})")
+
+            header_bytes = f.read(header_length)
+            if len(header_bytes) < header_length:
+                raise SessionFormatError(f"Truncated session file: {file_path}")
+    except OSError as e:
+        raise SessionFormatError(f"Cannot read session file: {e}")
+
+    try:
+        header = json.loads(header_bytes.decode("utf-8"))
+    except ValueError as e:
+        raise SessionFormatError(f"Corrupt session header in {file_path}: {e}")
+    if not isinstance(header, dict) or not isinstance(header.get("arrays"), dict):
+        raise SessionFormatError(f"Corrupt session header in {file_path}")
+
+    return header, _aligned(_PREAMBLE.size + header_length)
+
+
+def load_store(file_path):
+    """
+    Open a session file as a NodeStore whose arrays are read-only memory-mapped views.
+    Returns (store, metadata, extra arrays); files written without extras give an empty dict.
+    """
+    header, data_start = read_header(file_path)
+    layout = header["arrays"]
+
+    buffer = np.memmap(file_path, dtype=np.uint8, mode="r")
+
+    def view(name):
+        spec = layout[name]
+        dtype = np.dtype(spec["dtype"])
+        start = data_start + spec["offset"]
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        end = start + count * dtype.itemsize
+        if end > len(buffer):
+            raise SessionFormatError(f"Truncated session file: {file_path}")
+        return buffer[start:end].view(dtype).reshape(spec["shape"])
+
+    strings_spec = layout["strings"]
+    strings_start = data_start + strings_spec["offset"]
+    if strings_start + strings_spec["length"] > len(buffer):
+        raise SessionFormatError(f"Truncated session file: {file_path}")
+    try:
+        strings = json.loads(bytes(buffer[strings_start:strings_start + strings_spec["length"]]).decode("utf-8"))
+    except ValueError as e:
+        raise SessionFormatError(f"Corrupt string table in {file_path}: {e}")
+
+    nodes = {name: view("node." + name) for name in NODE_ARRAYS}
+    edges = {name: view("edge." + name) for name in EDGE_ARRAYS}
+    strategies = {name: view("strategy." + name) for name in STRATEGY_ARRAYS}
+    strategies["blocks"] = MappedBlocks(view("strategy.data"), view("strategy.offsets"))
+
+    extra = {name[len("extra."):]: view(name) for name in layout if name.startswith("extra.")}
+
+    return NodeStore(StringTable(strings), nodes, edges, strategies), header.get("metadata", {}), extra
@@ -0,0 +1,377 @@
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from session_format import SessionFormatError
+from tree_processor import GameTreeProcessor
+
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_HASH = re.compile(r"[0-9a-f]{64}")
+
+# Sessions untouched on disk for this long are deleted, with trees no session references
+SESSION_TTL = 7 * 24 * 60 * 60
+
+# Least time between refreshing a link file's mtime, and between disk sweeps
+LINK_TOUCH_INTERVAL = 60 * 60
+SWEEP_INTERVAL = 10 * 60
+
+
+class _KeyedLocks:
+    """One lock per key, forgotten once no thread holds or waits for it"""
+
+    def __init__(self):
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, key, blocking=True):
+        """Hold the key's lock; without blocking, yields False instead of waiting for it"""
+        with self.lock:
+            entry = self.locks.get(key)
+            if entry is None:
+                entry = self.locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            acquired = entry[0].acquire(blocking)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    entry[0].release()
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.locks[key]
+
+    def __len__(self):
+        with self.lock:
+            return len(self.locks)
+
+
+class _Tree:
+    __slots__ = ("processor", "nbytes", "last_access")
+
+    def __init__(self, processor, now):
+        self.processor = processor
+        self.nbytes = processor.nbytes
+        self.last_access = now
+
+
+class SessionManager:
+    """
+    Keeps open game trees within a memory budget.
+    Trees are keyed by the sha256 of the uploaded file and shared read-only by
+    every session that uploaded the same content. Each tree is spilled to a
+    session file when added, so trees that sit idle past the TTL, or are least
+    recently used when the budget is exceeded, can be dropped from memory and
+    reopened from disk on their next request. Sessions unused for session_ttl
+    are deleted from disk, along with the trees they alone referenced.
+    """
+
+    def __init__(self, session_folder, memory_budget, idle_ttl, session_ttl=SESSION_TTL, on_forget=None):
+        """
+        memory_budget is in bytes, idle_ttl and session_ttl in seconds.
+        on_forget is called with the id of every session removed or expired.
+        """
+        self.session_folder = session_folder
+        self.memory_budget = memory_budget
+        self.idle_ttl = idle_ttl
+        self.session_ttl = session_ttl
+        self.on_forget = on_forget
+
+        # Content hash -> open tree, least recently used first
+        self.trees = OrderedDict()
+        # Session id -> content hash, mirrored by link files in session_folder/sessions
+        self.session_index = {}
+
+        self.memory_used = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.lock = threading.RLock()
+        self._ingest_locks = _KeyedLocks()
+        # Trees being reopened from disk, so other trees are served meanwhile
+        self._load_locks = _KeyedLocks()
+        # Session id -> when its link file was last refreshed
+        self._touched = {}
+        self._last_sweep = 0.0
+
+    def tree_file_path(self, content_hash):
+        """Return the session file for a content hash, or None if the hash is malformed"""
+        if not isinstance(content_hash, str) or not _CONTENT_HASH.fullmatch(content_hash):
+            return None
+        return os.path.join(self.session_folder, f"{content_hash}.gtree")
+
+    def link_file_path(self, session_id):
+        """Return the file linking a session id to its tree, or None if the id is malformed"""
+        try:
+            session_id = str(uuid.UUID(session_id))
+        except ValueError:
+            return None
+        return os.path.join(self.session_folder, "sessions", session_id)
+
+    def ingest_lock(self, content_hash):
+        """Hold a lock serializing ingestion of one content hash, so it is only parsed once"""
+        return self._ingest_locks.hold(content_hash)
+
+    def has_tree(self, content_hash):
+        """Return True if a tree with this content hash has already been converted"""
+        with self.lock:
+            if content_hash in self.trees:
+                return True
+        file_path = self.tree_file_path(content_hash)
+        return file_path is not None and os.path.exists(file_path)
+
+    def open_session(self, content_hash):
+        """Create a new session id referencing an existing tree"""
+        session_id = str(uuid.uuid4())
+        link_path = self.link_file_path(session_id)
+        os.makedirs(os.path.dirname(link_path), exist_ok=True)
+        with open(link_path, "w") as f:
+            f.write(content_hash)
+
+        with self.lock:
+            self.session_index[session_id] = content_hash
+            self._touched[session_id] = time.monotonic()
+
+        if time.monotonic() - self._last_sweep > min(SWEEP_INTERVAL, self.session_ttl):
+            self.sweep()
+        return session_id
+
+    def get(self, session_id):
+        """Return the shared processor for a session, reloading its tree from disk if it was evicted"""
+        content_hash = self.content_hash(session_id)
+        if content_hash is None:
+            return None
+        self._touch(session_id)
+
+        processor = self._cached(content_hash)
+        if processor is not None:
+            return processor
+
+        # Reopen without the manager lock, so requests for other trees go on meanwhile
+        with self._load_locks.hold(content_hash):
+            # Another request may have reopened it while this one waited
+            processor = self._cached(content_hash)
+            if processor is not None:
+                return processor
+
+            file_path = self.tree_file_path(content_hash)
+            if file_path is None or not os.path.exists(file_path):
+                return None
+            try:
+                processor = GameTreeProcessor.open_session(file_path)
+            except (SessionFormatError, FileNotFoundError) as e:
+                logger.warning("Discarding tree %s: %s", content_hash, e)
+                return None
+
+            with self.lock:
+                self.reloads += 1
+                self._track(content_hash, processor)
+            return processor
+
+    def remove(self, session_id):
+        """Forget a session, deleting its tree once no session references it; returns False if unknown"""
+        content_hash = self.content_hash(session_id)
+        if content_hash is None:
+            return False
+
+        with self.lock:
+            self._forget(session_id)
+        if self.on_forget is not None:
+            self.on_forget(session_id)
+
+        # Uploads check for the tree and link a session to it under the same lock
+        with self.ingest_lock(content_hash):
+            if self._is_referenced(content_hash):
+                return True
+            with self.lock:
+                self._drop(content_hash)
+            file_path = self.tree_file_path(content_hash)
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+        return True
+
+    def sweep(self):
+        """
+        Delete sessions whose link files were untouched for longer than the
+        session TTL, then trees older than the TTL that no session references.
+        """
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - self.session_ttl
+        links_folder = os.path.join(self.session_folder, "sessions")
+        try:
+            link_names = os.listdir(links_folder)
+        except OSError:
+            link_names = []
+
+        referenced = set()
+        for name in link_names:
+            link_path = os.path.join(links_folder, name)
+            try:
+                if os.path.getmtime(link_path) < cutoff:
+                    with self.lock:
+                        self._forget(name)
+                    if self.on_forget is not None:
+                        self.on_forget(name)
+                    continue
+                with open(link_path) as f:
+                    referenced.add(f.read().strip())
+            except OSError:
+                continue
+
+        try:
+            tree_names = os.listdir(self.session_folder)
+        except OSError:
+            return
+        for name in tree_names:
+            content_hash, extension = os.path.splitext(name)
+            if extension != ".gtree" or content_hash in referenced or self.tree_file_path(content_hash) is None:
+                continue
+            file_path = self.tree_file_path(content_hash)
+            # Skip trees an upload is opening a session on right now
+            with self._ingest_locks.hold(content_hash, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                try:
+                    if os.path.getmtime(file_path) >= cutoff or self._is_referenced(content_hash):
+                        continue
+                    os.remove(file_path)
+                except OSError:
+                    continue
+                with self.lock:
+                    self._drop(content_hash)
+            logger.info("Deleted expired tree %s", content_hash)
+
+    def usage(self):
+        """Return memory accounting for the trees currently held in memory"""
+        with self.lock:
+            self._evict_expired()
+            now = time.monotonic()
+
+            session_counts = {}
+            for content_hash in self.session_index.values():
+                session_counts[content_hash] = session_counts.get(content_hash, 0) + 1
+
+            return {
+                "memory_budget": self.memory_budget,
+                "memory_used": self.memory_used,
+                "idle_ttl": self.idle_ttl,
+                "tree_count": len(self.trees),
+                "session_count": len(self.session_index),
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "trees": [
+                    {
+                        "content_hash": content_hash,
+                        "nbytes": tree.nbytes,
+                        "sessions": session_counts.get(content_hash, 0),
+                        "idle_seconds": round(now - tree.last_access, 1)
+                    }
+                    for content_hash, tree in reversed(self.trees.items())
+                ]
+            }
+
+    def content_hash(self, session_id):
+        """Resolve a session id to its content hash, falling back to its link file"""
+        with self.lock:
+            content_hash = self.session_index.get(session_id)
+        if content_hash is not None:
+            return content_hash
+
+        link_path = self.link_file_path(session_id)
+        if link_path is None or not os.path.exists(link_path):
+            return None
+        with open(link_path) as f:
+            content_hash = f.read().strip()
+        if self.tree_file_path(content_hash) is None:
+            return None
+
+        with self.lock:
+            self.session_index[session_id] = content_hash
+        return content_hash
+
+    def _touch(self, session_id):
+        """Refresh the link file's mtime now and then, keeping sessions in use from expiring"""
+        now = time.monotonic()
+        with self.lock:
+            if now - self._touched.get(session_id, 0.0) < min(LINK_TOUCH_INTERVAL, self.session_ttl / 2):
+                return
+            self._touched[session_id] = now
+        try:
+            os.utime(self.link_file_path(session_id))
+        except OSError:
+            pass
+
+    def _forget(self, session_id):
+        self.session_index.pop(session_id, None)
+        self._touched.pop(session_id, None)
+        link_path = self.link_file_path(session_id)
+        if link_path and os.path.exists(link_path):
+            os.remove(link_path)
+
+    def _is_referenced(self, content_hash):
+        """Check the link files, which other worker processes may also have written; call without self.lock"""
+        links_folder = os.path.join(self.session_folder, "sessions")
+        if not os.path.isdir(links_folder):
+            return False
+        for name in os.listdir(links_folder):
+            try:
+                with open(os.path.join(links_folder, name)) as f:
+                    if f.read().strip() == content_hash:
+                        return True
+            except OSError:
+                continue
+        return False
+
+    def _cached(self, content_hash):
+        with self.lock:
+            tree = self.trees.get(content_hash)
+            if tree is None:
+                return None
+            tree.last_access = time.monotonic()
+            self.trees.move_to_end(content_hash)
+            self._evict_expired()
+            return tree.processor
+
+    def _track(self, content_hash, processor):
+        self._drop(content_hash)
+        tree = _Tree(processor, time.monotonic())
+        self.trees[content_hash] = tree
+        self.memory_used += tree.nbytes
+        self._evict_expired()
+        self._enforce_budget()
+
+    def _drop(self, content_hash):
+        tree = self.trees.pop(content_hash, None)
+        if tree is None:
+            return False
+        self.memory_used -= tree.nbytes
+        return True
+
+    def _evict(self, content_hash, reason):
+        self._drop(content_hash)
+        self.evictions += 1
+        logger.info("Evicted tree %s (%s)", content_hash, reason)
+
+    def _evict_expired(self):
+        """Drop trees idle for longer than the TTL, oldest first"""
+        deadline = time.monotonic() - self.idle_ttl
+        while self.trees:
+            content_hash, tree = next(iter(self.trees.items()))
+            if tree.last_access > deadline:
+                break
+            self._evict(content_hash, "idle")
+
+    def _enforce_budget(self):
+        """Drop least recently used trees until the rest fit, always keeping the newest"""
+        while self.memory_used > self.memory_budget and len(self.trees) > 1:
+            content_hash = next(iter(self.trees))
+            self._evict(content_hash, "memory budget")
@@ -1,6 +1,99 @@
 // Hand Matrix Component for Poker GTO Explorer - Modified Version
 
 const handMatrix = {
+    // Read the header and typed-array columns of a compact binary payload
+    readPayload(buffer, magic) {
+        const view = new DataView(buffer);
+        const found = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (found !== magic || view.getUint8(4) !== 1) {
+            throw new Error('Unsupported payload format');
+        }
+
+        const quantized = view.getUint8(5) === 1;
+        const actionCount = view.getUint16(6, true);
+        const headerLength = view.getUint32(8, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength)));
+
+        const align = offset => Math.ceil(offset / 4) * 4;
+        return { header, quantized, actionCount, offset: align(12 + headerLength), align };
+    },
+
+    // Read count probabilities as unrounded percentages
+    readProbabilities(buffer, offset, count, quantized) {
+        const values = quantized ? new Uint8Array(buffer, offset, count) : new Float32Array(buffer, offset, count);
+        const scale = quantized ? 100 / 255 : 100;
+        return Array.from(values, value => value * scale);
+    },
+
+    // Round a percentage to 0.1 like the JSON responses
+    roundPercent(value) {
+        return Math.round(value * 10) / 10;
+    },
+
+    // Decode a compact hand matrix payload into the same shape as the JSON response
+    decodeHandMatrix(buffer) {
+        const { header, quantized, actionCount, offset, align } = this.readPayload(buffer, 'GTHM');
+        const counts = new Uint8Array(buffer, offset, 169);
+        const probabilities = this.readProbabilities(buffer, align(offset + 169), 169 * actionCount, quantized);
+
+        const ranks = header.ranks;
+        const cells = [];
+        for (let index = 0; index < 169; index++) {
+            const row = Math.floor(index / 13);
+            const col = index % 13;
+            const cell = {
+                row,
+                col,
+                hand: row === col ? ranks[row] + ranks[col] : `${ranks[row]}${ranks[col]}${row < col ? 's' : 'o'}`,
+                type: row === col ? 'pair' : (row < col ? 'suited' : 'offsuit'),
+                action: 'none',
+                probability: 0,
+                probabilities: []
+            };
+
+            if (counts[index] && actionCount) {
+                const probs = probabilities.slice(index * actionCount, (index + 1) * actionCount).map(this.roundPercent);
+                let best = 0;
+                probs.forEach((p, i) => { if (p > probs[best]) best = i; });
+                cell.action = header.actions[best];
+                cell.probability = probs[best];
+                cell.probabilities = probs;
+            }
+            cells.push(cell);
+        }
+
+        return { has_strategy: true, actions: header.actions, ranks, cells };
+    },
+
+    // Decode a compact hand details payload into the same shape as the JSON response
+    decodeHandDetails(buffer) {
+        const { header, quantized, actionCount, offset } = this.readPayload(buffer, 'GTHD');
+        const comboCount = header.combinations.length;
+        const probabilities = this.readProbabilities(buffer, offset, comboCount * actionCount, quantized);
+
+        const combinations = header.combinations.map((hand, i) => ({
+            hand,
+            probabilities: probabilities.slice(i * actionCount, (i + 1) * actionCount).map(this.roundPercent)
+        }));
+
+        // Average over the reported combos, as the server does for JSON responses
+        const averages = header.actions.map((_, a) => {
+            let total = 0;
+            for (let i = 0; i < comboCount; i++) {
+                total += probabilities[i * actionCount + a];
+            }
+            return this.roundPercent(total / comboCount);
+        });
+
+        return {
+            hand: header.hand,
+            actions: header.actions,
+            combinations,
+            average_probabilities: averages,
+            expected_combos: header.expected_combos
+        };
+    },
+
     // Update the hand matrix display
     updateHandMatrix(matrixData, container, clickHandler) {
         container.innerHTML = '';
@@ -11,6 +104,8 @@ const handMatrix = {
         }
 
         const ranks = matrixData.ranks;
+        const cellsByPosition = {};
+        matrixData.cells.forEach(cell => { cellsByPosition[cell.row * 13 + cell.col] = cell; });
 
         // Create the grid with headers
 
@@ -38,8 +133,7 @@ const handMatrix = {
             // Cells for this row
             ranks.forEach((colRank, colIndex) => {
                 // Find the cell data
-                const cellData = matrixData.cells.find(cell =>
-                    cell.row === rowIndex && cell.col === colIndex);
+                const cellData = cellsByPosition[rowIndex * 13 + colIndex];
 
                 if (cellData) {
                     const cell = this.createCellElement(cellData, matrixData, clickHandler);
@@ -56,6 +56,11 @@ const elements = {
 };
 
 // ================ FILE HANDLING ================
+// Files larger than one request may carry (the server's 32MB limit) are sent in chunks
+const CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+const PARALLEL_CHUNKS = 4;
+const CHUNK_ATTEMPTS = 5;
+
 // Trigger file upload dialog
 function triggerFileUpload() {
     elements.fileInput.click();
@@ -69,23 +74,13 @@ async function handleFileUpload(event) {
     try {
         setLoading(true, `Loading ${file.name}...`);
 
-        // Create form data
-        const formData = new FormData();
-        formData.append('file', file);
-
-        // Upload file
-        const response = await fetch('/api/upload', {
-            method: 'POST',
-            body: formData
-        });
+        const data = file.size > CHUNKED_UPLOAD_THRESHOLD ? await uploadChunked(file) : await uploadWhole(file);
 
-        if (!response.ok) {
-            const error = await response.json();
-            throw new Error(error.error || 'Failed to upload file');
+        // New files are parsed in the background; wait for the job to finish
+        if (data.job_id) {
+            data.game_info = await waitForIngestJob(data.job_id, file.name);
         }
 
-        const data = await response.json();
-
         // Update app state
         app.sessionId = data.session_id;
 
@@ -118,10 +113,183 @@ async function handleFileUpload(event) {
     }
 }
 
+// Send a file as one raw request body; the server parses it as it arrives
+async function uploadWhole(file) {
+    // Announcing the hash lets the server skip parsing a tree it already has
+    const headers = { 'Content-Type': 'application/octet-stream' };
+    const contentHash = await sha256Hex(file);
+    if (contentHash) {
+        headers['X-Content-SHA256'] = contentHash;
+    }
+    const response = await fetch(`/api/upload?filename=${encodeURIComponent(file.name)}`, {
+        method: 'POST',
+        headers,
+        body: file
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.error || 'Failed to upload file');
+    }
+    return response.json();
+}
+
+// Send a file as a chunked upload, several chunks at a time. The server parses the
+// chunks as they complete a prefix of the file. An interrupted upload of the same
+// file resumes with the chunks the server is still missing.
+async function uploadChunked(file) {
+    const resumeKey = `gto-upload:${file.name}:${file.size}:${file.lastModified}`;
+    let upload = null;
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+        const response = await fetch(`/api/uploads/${savedId}`);
+        if (response.ok) {
+            upload = await response.json();
+        }
+    }
+    if (!upload) {
+        const response = await fetch('/api/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size })
+        });
+        upload = await response.json();
+        if (!response.ok) {
+            throw new Error(upload.error || 'Failed to start upload');
+        }
+        localStorage.setItem(resumeKey, upload.upload_id);
+    }
+
+    const pending = upload.missing.slice();
+    let received = upload.chunks_received;
+    const sendChunks = async () => {
+        while (pending.length) {
+            await putChunk(upload, file, pending.shift());
+            received += 1;
+            setStatus(`Uploading ${file.name}: ${Math.floor(received * 100 / upload.chunk_count)}%`);
+        }
+    };
+    await Promise.all(Array.from({ length: PARALLEL_CHUNKS }, sendChunks));
+
+    const response = await fetch(`/api/uploads/${upload.upload_id}/finalize`, { method: 'POST' });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || 'Failed to upload file');
+    }
+    localStorage.removeItem(resumeKey);
+    return data;
+}
+
+// Send one chunk with its checksum, retrying with backoff on network and server errors
+async function putChunk(upload, file, index) {
+    const start = index * upload.chunk_size;
+    const chunk = await file.slice(start, start + upload.chunk_size).arrayBuffer();
+    const headers = { 'Content-Type': 'application/octet-stream', ...await chunkChecksum(chunk) };
+
+    for (let attempt = 1; ; attempt++) {
+        let response = null;
+        try {
+            response = await fetch(`/api/uploads/${upload.upload_id}/chunks/${index}`, {
+                method: 'PUT',
+                headers,
+                body: chunk
+            });
+        } catch (error) {
+            if (attempt >= CHUNK_ATTEMPTS) {
+                throw error;
+            }
+        }
+        if (response) {
+            if (response.ok) {
+                return;
+            }
+            const error = await response.json();
+            // A chunk garbled in transit fails its checksum and may pass when sent again
+            if (attempt >= CHUNK_ATTEMPTS || (response.status !== 400 && response.status < 500)) {
+                throw new Error(error.error || `Failed to upload chunk ${index}`);
+            }
+        }
+        await new Promise(resolve => setTimeout(resolve, 500 * 2 ** (attempt - 1)));
+    }
+}
+
+// Hex SHA-256 of a file, or null where the browser does not offer it (outside secure contexts)
+async function sha256Hex(file) {
+    if (!window.crypto || !window.crypto.subtle) {
+        return null;
+    }
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return toHex(new Uint8Array(digest));
+}
+
+// Checksum header for a chunk: SHA-256 where the browser offers it, CRC-32 otherwise
+async function chunkChecksum(buffer) {
+    if (window.crypto && window.crypto.subtle) {
+        const digest = await window.crypto.subtle.digest('SHA-256', buffer);
+        return { 'X-Chunk-SHA256': toHex(new Uint8Array(digest)) };
+    }
+    return { 'X-Chunk-CRC32': crc32(new Uint8Array(buffer)).toString(16).padStart(8, '0') };
+}
+
+function toHex(bytes) {
+    return Array.from(bytes, byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+let crc32Table = null;
+
+function crc32(bytes) {
+    if (!crc32Table) {
+        crc32Table = new Uint32Array(256);
+        for (let n = 0; n < 256; n++) {
+            let c = n;
+            for (let k = 0; k < 8; k++) {
+                c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+            }
+            crc32Table[n] = c >>> 0;
+        }
+    }
+    let crc = 0xFFFFFFFF;
+    for (let i = 0; i < bytes.length; i++) {
+        crc = crc32Table[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+    }
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+}
+
+// Poll a background upload job until the tree is ready, returning its game info
+async function waitForIngestJob(jobId, filename) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.error || 'Failed to check upload status');
+        }
+
+        if (job.stage === 'done') {
+            return job.game_info;
+        }
+        if (job.stage === 'failed') {
+            throw new Error(job.error || 'Failed to process file');
+        }
+
+        if (job.stage === 'queued') {
+            setStatus(`Waiting to process ${filename}...`);
+        } else if (job.stage === 'converting') {
+            setStatus(`Preparing ${filename}...`);
+        } else {
+            const eta = job.eta_seconds !== null ? ` (about ${Math.ceil(job.eta_seconds)}s left)` : '';
+            const progress = job.progress !== null ? `: ${job.progress}%` : '...';
+            setStatus(`Processing ${filename}${progress}${eta}`);
+        }
+
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+}
+
 // Load tree structure
 async function loadTreeStructure() {
     try {
-        const response = await fetch(`/api/tree/${app.sessionId}`);
+        // Only the first levels are fetched; deeper nodes load when expanded
+        const response = await fetchWithEtag(`/api/subtree/${app.sessionId}?path=&depth=2&limit=${treeView.pageSize}`);
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.error || 'Failed to load tree structure');
@@ -200,7 +368,9 @@ function displayGameInfo(gameInfo) {
         { label: 'Starting Player', value: gameInfo.starting_player !== undefined ? gameInfo.starting_player : 'N/A' },
         { label: 'Starting Pot', value: gameInfo.starting_pot ? `$${gameInfo.starting_pot}` : 'N/A' },
         { label: 'Board', value: gameInfo.board || 'None (Preflop)' },
-        { label: 'Decision Points', value: gameInfo.decision_points }
+        { label: 'Decision Points', value: gameInfo.decision_points },
+        { label: 'Total Nodes', value: gameInfo.node_count !== undefined ? gameInfo.node_count : 'N/A' },
+        { label: 'Max Depth', value: gameInfo.max_depth !== undefined ? gameInfo.max_depth : 'N/A' }
     ];
 
     infoItems.forEach(item => {
@@ -226,7 +396,7 @@ async function loadStartingActions() {
         // Clear previous content to avoid duplication
         elements.startingActionsContainer.innerHTML = '';
 
-        const response = await fetch(`/api/node/${app.sessionId}?path=`);
+        const response = await fetchWithEtag(`/api/node/${app.sessionId}?path=`);
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.error || 'Failed to load node information');
@@ -284,23 +454,9 @@ async function navigateToPath(path) {
         // Update breadcrumb
         updateBreadcrumb(path);
 
-        // Get node information
-        let nodeInfo = null;
-        let response = await fetch(`/api/node/${app.sessionId}?path=${encodeURIComponent(path)}`);
-
-        if (!response.ok) {
-            // Try the direct node endpoint as fallback
-            console.log("Regular path failed, trying direct node access...");
-            const directResponse = await fetch(`/api/direct_node/${app.sessionId}?path=${encodeURIComponent(path)}&actions=${treeView.actionSequence?.join(',') || ''}`);
-
-            if (directResponse.ok) {
-                nodeInfo = await directResponse.json();
-            } else {
-                throw new Error("Failed to load node through both methods");
-            }
-        } else {
-            nodeInfo = await response.json();
-        }
+        // Get node information and strategy views in one request
+        const bundle = await fetchNodeBundle(path);
+        const nodeInfo = bundle.node;
 
         app.currentNode = nodeInfo;
 
@@ -309,9 +465,12 @@ async function navigateToPath(path) {
 
         // Update strategy displays if strategy exists
         if (nodeInfo.has_strategy) {
-            await updateStrategyDisplays(path);
+            updateStrategyDisplays(bundle);
         } else {
             clearStrategyDisplays();
+            if (nodeInfo.dealcards_count) {
+                await loadRunoutReport(path);
+            }
         }
 
         // Update tree selection
@@ -421,6 +580,18 @@ function updateNodeDisplay(nodeInfo) {
         infoItems.push({ label: 'Possible Cards', value: nodeInfo.dealcards_count });
     }
 
+    if (nodeInfo.street) {
+        infoItems.push({ label: 'Street', value: nodeInfo.street });
+    }
+
+    if (nodeInfo.subtree) {
+        const subtree = nodeInfo.subtree;
+        infoItems.push({ label: 'Subtree Nodes', value: `${subtree.node_count} (${subtree.decision_nodes} decisions)` });
+        infoItems.push({ label: 'Subtree Depth', value: subtree.depth });
+        const streets = Object.entries(subtree.streets).map(([street, count]) => `${street}: ${count}`);
+        infoItems.push({ label: 'Streets', value: streets.join(', ') });
+    }
+
     infoItems.forEach(item => {
         const labelElement = document.createElement('div');
         labelElement.classList.add('label');
@@ -573,42 +744,63 @@ function updateNavigationButtons(nodeInfo) {
 }
 
 // ================ STRATEGY DISPLAYS ================
-// Update strategy displays
-async function updateStrategyDisplays(path) {
-    try {
-        // Get strategy information
-        const response = await fetch(`/api/strategy/${app.sessionId}?path=${encodeURIComponent(path)}`);
-        if (!response.ok) {
-            const error = await response.json();
-            throw new Error(error.error || 'Failed to load strategy information');
-        }
+// Fetch the node info and the strategy views it needs in a single bundle request
+async function fetchNodeBundle(path) {
+    const views = ['node', 'strategy'];
+
+    // Only include tab data when the corresponding tab is active or about to be viewed
+    const activeTab = document.querySelector('.tab-btn.active')?.getAttribute('data-tab');
+    if (activeTab === 'hand-matrix' || app.matrixDataNeedsUpdate) {
+        views.push('hand_matrix_packed');
+    }
+    if (activeTab === 'ev-analysis' || app.evDataNeedsUpdate) {
+        views.push('ev_analysis');
+    }
 
-        const strategyInfo = await response.json();
+    // The URL depends only on the node and views, so revisits revalidate their cached copy
+    const response = await fetchWithEtag(`/api/bundle/${app.sessionId}?path=${encodeURIComponent(path)}&views=${views.join(',')}`);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || 'Failed to load node information');
+    }
 
-        // Update rough strategy
-        strategyView.updateRoughStrategy(strategyInfo, elements.roughStrategyContainer);
+    const bundle = data.nodes[0];
+    if (bundle.error) {
+        throw new Error(bundle.error);
+    }
+    return bundle;
+}
 
-        // Only fetch specific data when the corresponding tab is active or about to be viewed
-        const activeTab = document.querySelector('.tab-btn.active')?.getAttribute('data-tab');
+// Decode the packed hand matrix view of a bundle
+function decodePackedMatrix(packed) {
+    if (!packed.has_strategy) {
+        return packed;
+    }
+    return handMatrix.decodeHandMatrix(base64ToArrayBuffer(packed.data));
+}
 
-        // Get hand matrix data only when needed
-        if (activeTab === 'hand-matrix' || app.matrixDataNeedsUpdate) {
+// Read a response that is either a compact binary payload or a JSON fallback
+async function readCompactResponse(response, decode) {
+    if (response.headers.get('Content-Type') === 'application/octet-stream') {
+        return decode(await response.arrayBuffer());
+    }
+    return response.json();
+}
+
+// Update strategy displays from a node bundle
+function updateStrategyDisplays(bundle) {
+    try {
+        // Update rough strategy
+        strategyView.updateRoughStrategy(bundle.strategy, elements.roughStrategyContainer);
+
+        if (bundle.hand_matrix_packed) {
             app.matrixDataNeedsUpdate = false;
-            const matrixResponse = await fetch(`/api/hand_matrix/${app.sessionId}?path=${encodeURIComponent(path)}`);
-            if (matrixResponse.ok) {
-                const matrixData = await matrixResponse.json();
-                handMatrix.updateHandMatrix(matrixData, elements.handMatrixGrid, handleHandClick);
-            }
+            handMatrix.updateHandMatrix(decodePackedMatrix(bundle.hand_matrix_packed), elements.handMatrixGrid, handleHandClick);
         }
 
-        // Get EV analysis only when needed
-        if (activeTab === 'ev-analysis' || app.evDataNeedsUpdate) {
+        if (bundle.ev_analysis) {
             app.evDataNeedsUpdate = false;
-            const evResponse = await fetch(`/api/ev_analysis/${app.sessionId}?path=${encodeURIComponent(path)}`);
-            if (evResponse.ok) {
-                const evData = await evResponse.json();
-                evAnalysis.updateEvAnalysis(evData, elements.evAnalysisContainer);
-            }
+            evAnalysis.updateEvAnalysis(bundle.ev_analysis, elements.evAnalysisContainer);
         }
 
         // Adjust hand matrix size after content is loaded
@@ -619,6 +811,16 @@ async function updateStrategyDisplays(path) {
     }
 }
 
+// Compare every dealt card of a chance node in the rough strategy tab
+async function loadRunoutReport(path) {
+    const response = await fetchWithEtag(`/api/runout/${app.sessionId}?path=${encodeURIComponent(path)}`);
+    const report = await response.json();
+    if (!response.ok) {
+        throw new Error(report.error || 'Failed to load runout report');
+    }
+    strategyView.updateRunoutReport(report, elements.roughStrategyContainer);
+}
+
 // Clear strategy displays
 function clearStrategyDisplays() {
     // Clear rough strategy
@@ -640,13 +842,13 @@ async function handleHandClick(hand) {
         app.selectedHand = hand;
 
         // Get hand details
-        const response = await fetch(`/api/hand_details/${app.sessionId}?path=${encodeURIComponent(app.currentPath)}&hand=${encodeURIComponent(hand)}`);
+        const response = await fetchWithEtag(`/api/hand_details/${app.sessionId}?path=${encodeURIComponent(app.currentPath)}&hand=${encodeURIComponent(hand)}&format=binary`);
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.error || 'Failed to load hand details');
         }
 
-        const handData = await response.json();
+        const handData = await readCompactResponse(response, buffer => handMatrix.decodeHandDetails(buffer));
 
         // Update hand details display with enhanced styling
         handMatrix.displayHandDetails(handData, elements.handDetailsContent);
@@ -681,8 +883,8 @@ function initTabs() {
             // Load data when switching to a tab that needs it
             if (tabId === 'hand-matrix' && previousTab !== 'hand-matrix' && app.currentPath) {
                 if (!elements.handMatrixGrid.hasChildNodes()) {
-                    fetch(`/api/hand_matrix/${app.sessionId}?path=${encodeURIComponent(app.currentPath)}`)
-                        .then(response => response.json())
+                    fetchWithEtag(`/api/hand_matrix/${app.sessionId}?path=${encodeURIComponent(app.currentPath)}&format=binary`)
+                        .then(response => readCompactResponse(response, buffer => handMatrix.decodeHandMatrix(buffer)))
                         .then(matrixData => {
                             handMatrix.updateHandMatrix(matrixData, elements.handMatrixGrid, handleHandClick);
                         });
@@ -692,7 +894,7 @@ function initTabs() {
                 setTimeout(adjustHandMatrixSize, 100);
             } else if (tabId === 'ev-analysis' && previousTab !== 'ev-analysis' && app.currentPath) {
                 if (!elements.evAnalysisContainer.hasChildNodes()) {
-                    fetch(`/api/ev_analysis/${app.sessionId}?path=${encodeURIComponent(app.currentPath)}`)
+                    fetchWithEtag(`/api/ev_analysis/${app.sessionId}?path=${encodeURIComponent(app.currentPath)}`)
                         .then(response => response.json())
                         .then(evData => {
                             evAnalysis.updateEvAnalysis(evData, elements.evAnalysisContainer);
@@ -158,6 +158,59 @@ const strategyView = {
         }
     },
 
+    // Show how the strategy below a chance node shifts with each dealt card
+    updateRunoutReport(report, container) {
+        container.innerHTML = '';
+
+        const runoutCard = document.createElement('div');
+        runoutCard.classList.add('strategy-card');
+
+        const runoutTitle = document.createElement('h4');
+        runoutTitle.textContent = 'Runout Report';
+        runoutCard.appendChild(runoutTitle);
+
+        const table = document.createElement('table');
+        table.classList.add('hand-details-table');
+
+        // Header row: card, combos reaching it, then one column per action
+        const headerRow = document.createElement('tr');
+        ['Card', 'Combos', ...report.actions].forEach(label => {
+            const th = document.createElement('th');
+            th.textContent = label;
+            headerRow.appendChild(th);
+        });
+        table.appendChild(headerRow);
+
+        const addRow = (label, combos, frequencies) => {
+            const row = document.createElement('tr');
+            [label, combos, ...frequencies.map(f => `${f.toFixed(1)}%`)].forEach(value => {
+                const td = document.createElement('td');
+                td.textContent = value;
+                row.appendChild(td);
+            });
+            table.appendChild(row);
+        };
+
+        report.cards.forEach(card => {
+            const name = card.card.length === 2 ? `${card.card[0]}${this.getSuitSymbol(card.card[1])}` : card.card;
+            if (card.has_strategy) {
+                addRow(name, card.range_combos, card.frequencies);
+            } else {
+                addRow(name, '-', report.actions.map(() => 0));
+            }
+        });
+        addRow('All', '', report.average_frequencies);
+
+        runoutCard.appendChild(table);
+        container.appendChild(runoutCard);
+    },
+
+    // Get symbol for a card suit
+    getSuitSymbol(suit) {
+        const symbols = { c: '♣', d: '♦', h: '♥', s: '♠' };
+        return symbols[suit] || suit;
+    },
+
     // Create a composition label
     createCompositionLabel(text, bold = false) {
         const label = document.createElement(bold ? 'strong' : 'div');
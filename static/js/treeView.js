@@ -6,7 +6,7 @@ const treeView = {
     treeContainer: null,
     loadedNodes: new Set(),
     maxDepth: 50, // Default max depth for full tree
-    actionSequence: [], // Track action sequence for direct node access
+    pageSize: 50, // Children fetched per request when expanding a node
 
     // Render the tree
     renderTree(data, container) {
@@ -193,16 +193,13 @@ const treeView = {
         // Add click event to navigate
         item.addEventListener('click', (e) => {
             e.stopPropagation();
-            // Store action sequence for recovery
-            if (node.type === 'action' && node.name) {
-                this.actionSequence.push(node.name);
-            }
             window.navigateToPath(node.path);
         });
 
-        // Add toggle button if has children
+        // Add toggle button if has children (they may not be loaded yet)
+        const hasChildren = node.has_children || (node.children && node.children.length > 0);
         let toggle = null;
-        if (node.children && node.children.length > 0) {
+        if (hasChildren) {
             toggle = document.createElement('span');
             toggle.classList.add('tree-toggle');
             toggle.innerHTML = '▶';
@@ -244,32 +241,101 @@ const treeView = {
         li.appendChild(item);
 
         // Create children container if needed
-        if (node.children && node.children.length > 0) {
+        if (hasChildren) {
             const childrenContainer = document.createElement('ul');
             childrenContainer.classList.add('tree-children', 'collapsed');
 
-            // Directly add all child nodes without any placeholders
-            node.children.forEach(child => {
-                if (child) { // Only add valid children
-                    const childItem = this.createTreeItem(child);
-                    childrenContainer.appendChild(childItem);
-                }
-            });
+            // Children that came with this node are added now, the rest on expand
+            if (node.children) {
+                this.appendChildren(node, childrenContainer);
+                this.loadedNodes.add(node.path);
+            }
 
-            this.loadedNodes.add(node.path);
             li.appendChild(childrenContainer);
         }
 
         return li;
     },
 
+    // Add a page of child items, plus a "load more" entry if the server has more
+    appendChildren(data, container) {
+        (data.children || []).forEach(child => {
+            if (child) { // Only add valid children
+                container.appendChild(this.createTreeItem(child));
+            }
+        });
+
+        if (data.next_cursor !== null && data.next_cursor !== undefined) {
+            container.appendChild(this.createLoadMoreItem(data, container));
+        }
+    },
+
+    // Create the entry that fetches the next page of children
+    createLoadMoreItem(data, container) {
+        const li = document.createElement('li');
+        li.className = 'tree-load-more';
+        li.dataset.path = data.path;
+        li.dataset.cursor = data.next_cursor;
+
+        const item = document.createElement('div');
+        item.classList.add('tree-item');
+
+        const label = document.createElement('span');
+        label.className = 'load-more-btn';
+        label.textContent = `Load more (${data.next_cursor} of ${data.total_children} shown)`;
+        item.appendChild(label);
+        li.appendChild(item);
+
+        item.addEventListener('click', (e) => {
+            e.stopPropagation();
+            this.loadMore(li, data.path, data.next_cursor, container);
+        });
+
+        return li;
+    },
+
+    // Replace a "load more" entry with the next page of children
+    loadMore(loadMoreItem, path, cursor, container) {
+        if (loadMoreItem.parentNode === container) {
+            container.removeChild(loadMoreItem);
+        }
+        return this.loadChildren(path, container, cursor);
+    },
+
+    // Fetch one level of children for a path from the server
+    async loadChildren(path, container, cursor = 0) {
+        this.loadedNodes.add(path);
+
+        const loadingEl = document.createElement('li');
+        loadingEl.textContent = 'Loading...';
+        loadingEl.style.fontStyle = 'italic';
+        container.appendChild(loadingEl);
+
+        try {
+            const response = await fetchWithEtag(`/api/subtree/${app.sessionId}?path=${encodeURIComponent(path)}&depth=1&cursor=${cursor}&limit=${this.pageSize}`);
+            if (!response.ok) {
+                this.loadedNodes.delete(path);
+                this.handleNodeNotFound(path, container);
+                return;
+            }
+
+            const data = await response.json();
+            this.appendChildren(data, container);
+        } catch (error) {
+            this.loadedNodes.delete(path);
+            this.handleNodeNotFound(path, container);
+        } finally {
+            container.removeChild(loadingEl);
+        }
+    },
+
     // Get the depth of a path
     getDepth(path) {
         if (!path) return 0;
         return path.split('/').filter(p => p).length;
     },
 
-    // Toggle node expansion
+    // Toggle node expansion; resolves once any needed children are loaded
     toggleNode(toggle, isUserAction = true) {
         const item = toggle.parentNode;
         const li = item.parentNode;
@@ -297,7 +363,7 @@ const treeView = {
                 // Load children if needed
                 const path = item.dataset.path;
                 if (!this.loadedNodes.has(path)) {
-                    this.loadChildren(path, childrenContainer);
+                    return this.loadChildren(path, childrenContainer);
                 }
             } else {
                 // Collapse
@@ -311,6 +377,7 @@ const treeView = {
                 }
             }
         }
+        return Promise.resolve();
     },
 
     // Handle node data not found error in client side
@@ -326,34 +393,12 @@ const treeView = {
         retryBtn.textContent = 'Retry';
         retryBtn.className = 'btn btn-sm';
         retryBtn.style.marginLeft = '5px';
-        retryBtn.addEventListener('click', async (e) => {
+        retryBtn.addEventListener('click', (e) => {
             e.stopPropagation();
 
-            // Try direct node access as a fallback
-            try {
-                // Show loading
-                errorDiv.textContent = 'Trying alternative method...';
-                errorDiv.style.color = 'blue';
-
-                // Try to directly load the node via action sequence
-                const response = await fetch(`/api/direct_node/${app.sessionId}?path=${encodeURIComponent(path)}&actions=${this.actionSequence.join(',')}`);
-
-                if (response.ok) {
-                    // If successful, refresh the UI
-                    window.navigateToPath(path);
-                    container.removeChild(errorDiv);
-                } else {
-                    // Show error message
-                    const data = await response.json();
-                    errorDiv.textContent = data.error || 'Failed to load node';
-                    errorDiv.style.color = 'red';
-                    errorDiv.appendChild(retryBtn);
-                }
-            } catch (error) {
-                errorDiv.textContent = 'Error: ' + error.message;
-                errorDiv.style.color = 'red';
-                errorDiv.appendChild(retryBtn);
-            }
+            // Request the same page of children again
+            container.removeChild(errorDiv);
+            this.loadChildren(path, container);
         });
 
         errorDiv.appendChild(retryBtn);
@@ -395,36 +440,62 @@ const treeView = {
         }
     },
 
-    // Expand to find a node that's not currently visible
-    expandToFindNode(path) {
+    // Expand to find a node that's not currently visible, loading branches on the way
+    async expandToFindNode(path) {
         if (!path) return;
 
         // Get the path components
         const parts = path.split('/').filter(p => p);
 
-        // Try to find increasingly longer parent paths
+        // Expand increasingly longer parent paths
         let currentPath = '';
         for (let i = 0; i < parts.length; i++) {
+            const parentPath = currentPath;
             currentPath += '/' + parts[i];
 
-            const parentItem = document.querySelector(`.tree-item[data-path="${currentPath}"]`);
+            let parentItem = this.findTreeItem(currentPath);
+            if (!parentItem) {
+                parentItem = await this.loadUntilFound(parentPath, currentPath);
+            }
             if (parentItem) {
                 const toggle = parentItem.querySelector('.tree-toggle');
-                if (toggle && toggle.innerHTML === '▶') {
+                const children = parentItem.parentNode.querySelector(':scope > .tree-children');
+                if (toggle && children && children.classList.contains('collapsed')) {
                     // Expand this node
-                    this.toggleNode(toggle);
+                    await this.toggleNode(toggle, false);
                 }
             }
         }
 
         // After expanding all available nodes in the path, check again for our target
-        setTimeout(() => {
-            const item = document.querySelector(`.tree-item[data-path="${path}"]`);
-            if (item) {
-                item.classList.add('selected');
-                item.scrollIntoView({ behavior: 'smooth', block: 'center' });
-            }
-        }, 100);
+        const item = this.findTreeItem(path);
+        if (item) {
+            item.classList.add('selected');
+            item.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        }
+    },
+
+    // Find a tree item element by path
+    findTreeItem(path) {
+        return Array.from(document.querySelectorAll('.tree-item'))
+            .find(item => item.dataset.path === path) || null;
+    },
+
+    // Page through a parent's children until the item for path appears
+    async loadUntilFound(parentPath, path) {
+        const parentItem = this.findTreeItem(parentPath);
+        const container = parentItem?.parentNode.querySelector(':scope > .tree-children');
+        if (!container) return null;
+
+        let loadMore = container.querySelector(':scope > .tree-load-more');
+        while (loadMore) {
+            await this.loadMore(loadMore, loadMore.dataset.path, Number(loadMore.dataset.cursor), container);
+
+            const found = this.findTreeItem(path);
+            if (found) return found;
+            loadMore = container.querySelector(':scope > .tree-load-more');
+        }
+        return this.findTreeItem(path);
     },
 
     // Expand the path to a node
@@ -174,4 +174,37 @@ class SimpleCache {
         this.cache = {};
         this.keys = [];
     }
-}
\ No newline at end of file
+}
+// Responses kept for revalidation with If-None-Match, keyed by URL
+const etagCache = new SimpleCache(200);
+
+// Fetch a GET endpoint, reusing the cached body when the server answers 304 Not Modified
+async function fetchWithEtag(url) {
+    const cached = etagCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store' });
+
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': cached.type, 'ETag': cached.etag }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        const type = response.headers.get('Content-Type');
+        etagCache.set(url, { etag, type, body: await response.clone().arrayBuffer() });
+    }
+    return response;
+}
+
+// Decode a base64 string (as used for packed payloads inside JSON) into an ArrayBuffer
+function base64ToArrayBuffer(data) {
+    const binary = atob(data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return bytes.buffer;
+}
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# The server reads its configuration on import
+os.environ.setdefault("GTO_SESSION_FOLDER", tempfile.mkdtemp(prefix="gto_test_sessions_"))
+os.environ.setdefault("GTO_INGEST_WORKERS", "1")
+
+from generate_tree import TreeGenerator  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def tree_file(tmp_path_factory):
+    """A small generated solver tree with strategies, chance nodes and two streets"""
+    file_path = str(tmp_path_factory.mktemp("trees") / "tree.json")
+    TreeGenerator(dealcards=2, combos=40, streets=1).write(file_path)
+    return file_path
+
+
+def upload_tree(client, file_path, filename="tree.json"):
+    """Upload a tree file and wait for its conversion; returns the upload response body"""
+    with open(file_path, "rb") as f:
+        body = client.post(f"/api/upload?filename={filename}", data=f.read()).get_json()
+    assert "session_id" in body, body
+    deadline = time.monotonic() + 60
+    while "job_id" in body and time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{body['job_id']}").get_json()
+        if job["stage"] in ("done", "failed"):
+            body["job"] = job
+            break
+        time.sleep(0.05)
+    return body
+
+
+def add_tree(manager, file_path):
+    """Convert a tree file into a session manager's folder, as an upload would, returning its content hash"""
+    from tree_processor import GameTreeProcessor
+
+    with open(file_path, "rb") as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+    GameTreeProcessor(file_path).save_session(manager.tree_file_path(content_hash))
+    return content_hash
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server
+    return server
+
+
+@pytest.fixture(scope="session")
+def client(server):
+    return server.app.test_client()
+
+
+@pytest.fixture(scope="session")
+def session_id(client, tree_file):
+    """A session on the generated tree, converted and ready"""
+    return upload_tree(client, tree_file)["session_id"]
@@ -0,0 +1,120 @@
+import hashlib
+import time
+import zlib
+
+import pytest
+
+from chunked_upload import ChunkedUploads, MIN_CHUNK_SIZE, UploadError
+from generate_tree import TreeGenerator
+
+
+@pytest.fixture(scope="module")
+def tree_bytes(tmp_path_factory):
+    """A tree larger than one chunk of the smallest size"""
+    file_path = str(tmp_path_factory.mktemp("trees") / "large.json")
+    TreeGenerator(dealcards=4, combos=80, streets=1).write(file_path)
+    with open(file_path, "rb") as f:
+        data = f.read()
+    assert len(data) > MIN_CHUNK_SIZE
+    return data
+
+
+def chunk(data, index):
+    return data[index * MIN_CHUNK_SIZE:(index + 1) * MIN_CHUNK_SIZE]
+
+
+def put_chunk(client, upload_id, data, index):
+    return client.put(f"/api/uploads/{upload_id}/chunks/{index}", data=chunk(data, index),
+                      headers={"X-Chunk-SHA256": hashlib.sha256(chunk(data, index)).hexdigest()})
+
+
+def test_interrupted_upload_resumes_with_missing_chunks(client, tree_bytes):
+    created = client.post("/api/uploads", json={
+        "filename": "large.json",
+        "size": len(tree_bytes),
+        "chunk_size": MIN_CHUNK_SIZE,
+        "sha256": hashlib.sha256(tree_bytes).hexdigest()
+    })
+    assert created.status_code == 201
+    upload_id = created.get_json()["upload_id"]
+    chunk_count = created.get_json()["chunk_count"]
+    assert chunk_count > 1
+
+    # Only the last chunk arrives before the client is interrupted
+    assert put_chunk(client, upload_id, tree_bytes, chunk_count - 1).status_code == 200
+    status = client.get(f"/api/uploads/{upload_id}").get_json()
+    assert status["missing"] == list(range(chunk_count - 1))
+    assert status["offset"] == 0
+
+    response = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert response.status_code == 409
+
+    # Resending a stored chunk is harmless; the client sends what is missing
+    assert put_chunk(client, upload_id, tree_bytes, chunk_count - 1).status_code == 200
+    for index in status["missing"]:
+        assert put_chunk(client, upload_id, tree_bytes, index).status_code == 200
+    status = client.get(f"/api/uploads/{upload_id}").get_json()
+    assert status["missing"] == []
+    assert status["offset"] == len(tree_bytes)
+
+    response = client.post(f"/api/uploads/{upload_id}/finalize")
+    assert response.status_code in (200, 202)
+    result = response.get_json()
+    assert client.post(f"/api/uploads/{upload_id}/finalize").get_json() == result
+
+    deadline = time.monotonic() + 60
+    while "job_id" in result:
+        stage = client.get(f"/api/jobs/{result['job_id']}").get_json()["stage"]
+        if stage in ("done", "failed"):
+            assert stage == "done"
+            break
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert client.get(f"/api/node/{result['session_id']}?path=").status_code == 200
+
+
+def test_chunk_checks(client, tree_bytes):
+    upload_id = client.post("/api/uploads", json={
+        "filename": "large.json", "size": len(tree_bytes), "chunk_size": MIN_CHUNK_SIZE
+    }).get_json()["upload_id"]
+
+    response = client.put(f"/api/uploads/{upload_id}/chunks/0", data=chunk(tree_bytes, 0),
+                          headers={"X-Chunk-SHA256": "0" * 64})
+    assert response.status_code == 400
+    response = client.put(f"/api/uploads/{upload_id}/chunks/0", data=chunk(tree_bytes, 0))
+    assert response.status_code == 400
+    response = client.put(f"/api/uploads/{upload_id}/chunks/0", data=chunk(tree_bytes, 0)[1:],
+                          headers={"X-Chunk-SHA256": hashlib.sha256(chunk(tree_bytes, 0)[1:]).hexdigest()})
+    assert response.status_code == 400
+
+    assert put_chunk(client, upload_id, tree_bytes, 0).status_code == 200
+    other = bytes(reversed(chunk(tree_bytes, 0)))
+    response = client.put(f"/api/uploads/{upload_id}/chunks/0", data=other,
+                          headers={"X-Chunk-SHA256": hashlib.sha256(other).hexdigest()})
+    assert response.status_code == 409
+
+    assert client.delete(f"/api/uploads/{upload_id}").status_code == 200
+    assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+
+
+def test_upload_survives_a_restart(tmp_path, tree_bytes):
+    folder = str(tmp_path / "uploads")
+
+    def restart():
+        return ChunkedUploads(folder, None, None, max_size=len(tree_bytes), max_chunk_size=MIN_CHUNK_SIZE)
+
+    upload = restart().create("large.json", len(tree_bytes), MIN_CHUNK_SIZE, stream=False)
+    upload.put_chunk(0, chunk(tree_bytes, 0), "sha256", hashlib.sha256(chunk(tree_bytes, 0)).hexdigest())
+
+    restored = restart().get(upload.upload_id, stream=False)
+    assert restored is not upload
+    status = restored.status()
+    assert status["missing"] == list(range(1, status["chunk_count"]))
+    assert status["offset"] == MIN_CHUNK_SIZE
+    with pytest.raises(UploadError):
+        restored.wait_hashed()
+
+    for index in status["missing"]:
+        data = chunk(tree_bytes, index)
+        restored.put_chunk(index, data, "crc32", f"{zlib.crc32(data):08x}")
+    assert restored.wait_hashed() == hashlib.sha256(tree_bytes).hexdigest()
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from combos import (CARD_COUNT, CELL_COUNT, CELL_HANDS, CELL_TYPES, COMBO_CARDS, COMBO_CELLS, COMBO_COUNT,
+                    COMBO_NAMES, COMBO_OFFSUIT, COMBO_PAIR, COMBO_SUITED, COMBO_TYPES, card_id, card_name,
+                    cell_averages, cell_combos, cell_weighted_averages, combo_index, hand_cell, hand_index)
+
+
+def test_card_ids_round_trip():
+    assert [card_name(card) for card in range(CARD_COUNT)][:4] == ["2c", "2d", "2h", "2s"]
+    assert all(card_id(card_name(card)) == card for card in range(CARD_COUNT))
+    assert card_id("As") == CARD_COUNT - 1
+    for bad in ("", "A", "Ax", "1c", "Ahh"):
+        assert card_id(bad) == -1
+
+
+def test_combo_index_covers_every_pair_once():
+    indexes = {combo_index(a, b) for a in range(CARD_COUNT) for b in range(a)}
+    assert indexes == set(range(COMBO_COUNT))
+    assert combo_index(5, 9) == combo_index(9, 5)
+
+
+def test_combo_cards_match_their_index():
+    for index, (high, low) in enumerate(COMBO_CARDS):
+        assert high > low
+        assert combo_index(int(high), int(low)) == index
+        assert COMBO_NAMES[index] == card_name(int(high)) + card_name(int(low))
+
+
+def test_hand_index_accepts_either_card_order():
+    assert hand_index("AhKd") == hand_index("KdAh") == COMBO_NAMES.index("AhKd")
+    for bad in ("AhAh", "AhK", "XxKd", ""):
+        assert hand_index(bad) == -1
+
+
+def test_combo_types():
+    counts = np.bincount(COMBO_TYPES, minlength=3)
+    assert counts[COMBO_PAIR] == 78
+    assert counts[COMBO_SUITED] == 312
+    assert counts[COMBO_OFFSUIT] == 936
+    assert COMBO_TYPES[hand_index("AhAs")] == COMBO_PAIR
+    assert COMBO_TYPES[hand_index("AhKh")] == COMBO_SUITED
+    assert COMBO_TYPES[hand_index("AhKs")] == COMBO_OFFSUIT
+
+
+def test_cell_layout():
+    assert CELL_COUNT == len(CELL_HANDS) == len(CELL_TYPES) == 169
+    # Offsuit cells are named by their row rank first, as the original matrix was
+    assert CELL_HANDS[0] == "AA" and CELL_HANDS[1] == "AKs" and CELL_HANDS[13] == "KAo"
+    assert CELL_HANDS[168] == "22"
+    assert [CELL_TYPES.count(kind) for kind in ("pair", "suited", "offsuit")] == [13, 78, 78]
+
+
+@pytest.mark.parametrize("hand, expected", [("AA", "AA"), ("AKs", "AKs"), ("KAs", "AKs"), ("AKo", "KAo"),
+                                            ("KAo", "KAo"), ("72o", "27o")])
+def test_hand_cell(hand, expected):
+    assert CELL_HANDS[hand_cell(hand)] == expected
+
+
+@pytest.mark.parametrize("hand", ["", "A", "AK", "AAs", "AKx", "1Ks", "AKso"])
+def test_hand_cell_rejects_invalid_hands(hand):
+    assert hand_cell(hand) == -1
+
+
+def test_cell_combos_partition_the_combos():
+    seen = np.concatenate([cell_combos(cell) for cell in range(CELL_COUNT)])
+    assert sorted(seen.tolist()) == list(range(COMBO_COUNT))
+
+    sizes = {"pair": 6, "suited": 4, "offsuit": 12}
+    for cell in range(CELL_COUNT):
+        combos = cell_combos(cell)
+        assert len(combos) == sizes[CELL_TYPES[cell]]
+        assert (COMBO_CELLS[combos] == cell).all()
+    assert hand_index("AhKh") in cell_combos(hand_cell("AKs"))
+
+
+def test_cell_averages_match_a_plain_loop():
+    rng = np.random.default_rng(0)
+    probabilities = rng.random((COMBO_COUNT, 3)).astype(np.float32)
+    mask = rng.random(COMBO_COUNT) < 0.5
+    mask[cell_combos(hand_cell("AA"))] = False
+
+    averages, counts = cell_averages(probabilities, mask)
+    for cell in range(CELL_COUNT):
+        combos = [c for c in cell_combos(cell) if mask[c]]
+        assert counts[cell] == len(combos)
+        if combos:
+            np.testing.assert_allclose(averages[cell], probabilities[combos].mean(axis=0), rtol=1e-5)
+    assert np.isnan(averages[hand_cell("AA")]).all()
+
+
+def test_cell_weighted_averages_batches():
+    rng = np.random.default_rng(1)
+    probabilities = rng.random((2, COMBO_COUNT, 2))
+    weights = rng.random((2, COMBO_COUNT))
+
+    averages, totals = cell_weighted_averages(probabilities, weights)
+    assert averages.shape == (2, CELL_COUNT, 2) and totals.shape == (2, CELL_COUNT)
+    combos = cell_combos(hand_cell("T9s"))
+    for batch in range(2):
+        expected = np.average(probabilities[batch, combos], axis=0, weights=weights[batch, combos])
+        np.testing.assert_allclose(averages[batch, hand_cell("T9s")], expected)
+        np.testing.assert_allclose(totals[batch, hand_cell("T9s")], weights[batch, combos].sum())
@@ -0,0 +1,113 @@
+import gzip
+import io
+import lzma
+
+import pytest
+
+import compressed_input
+from compressed_input import CountingReader, ZSTD_MAGIC, detect_compression, open_input
+from tree_processor import GameTreeProcessor
+
+
+DOCUMENT = b'{"node_type": "action_node", "childrens": {}}' * 50
+
+
+class Trickle(io.RawIOBase):
+    """A non-seekable input returning at most one byte per read, like an upload still arriving"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data, self.data = self.data[:1], self.data[1:]
+        return data
+
+
+@pytest.mark.parametrize("data, expected", [
+    (gzip.compress(DOCUMENT), "gzip"),
+    (lzma.compress(DOCUMENT), "xz"),
+    (ZSTD_MAGIC + b"\x00\x00", "zstd"),
+    (DOCUMENT, None),
+    (b"", None),
+    (b"\x1f", None),
+])
+def test_detect_compression(data, expected):
+    assert detect_compression(data[:8]) == expected
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, lzma.compress, lambda data: data])
+def test_open_input_inflates_and_counts_raw_bytes(compress):
+    raw = compress(DOCUMENT)
+    reader, counter = open_input(io.BytesIO(raw))
+    assert reader.read() == DOCUMENT
+    assert counter.bytes_read == len(raw)
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, lzma.compress, lambda data: data])
+def test_open_input_handles_short_reads(compress):
+    reader, _ = open_input(Trickle(compress(DOCUMENT)))
+    data = b""
+    while True:
+        chunk = reader.read(64)
+        if not chunk:
+            break
+        data += chunk
+    assert data == DOCUMENT
+
+
+def test_short_plain_input():
+    reader, _ = open_input(io.BytesIO(b"[]"))
+    assert reader.read() == b"[]"
+
+
+def test_zstd_without_the_package(monkeypatch):
+    monkeypatch.setattr(compressed_input, "zstandard", None)
+    with pytest.raises(ValueError, match="zstandard"):
+        open_input(io.BytesIO(ZSTD_MAGIC + b"\x00" * 8))
+
+
+def test_zstd_round_trip():
+    zstandard = pytest.importorskip("zstandard")
+    raw = zstandard.ZstdCompressor().compress(DOCUMENT)
+    reader, counter = open_input(io.BytesIO(raw))
+    assert reader.read() == DOCUMENT
+    assert counter.bytes_read == len(raw)
+
+
+def test_counting_reader_replays_its_head():
+    reader = CountingReader(io.BytesIO(b"cdef"), head=b"ab")
+    assert reader.read(1) == b"a"
+    assert reader.read(3) == b"bcd"
+    target = bytearray(4)
+    assert reader.readinto(target) == 2
+    assert target[:2] == b"ef"
+    assert reader.read() == b""
+    assert reader.bytes_read == 6
+
+
+@pytest.mark.parametrize("suffix, compress", [(".json.gz", gzip.compress), (".json.xz", lzma.compress)])
+def test_compressed_tree_parses_like_the_plain_one(tree_file, tmp_path, suffix, compress):
+    with open(tree_file, "rb") as f:
+        data = f.read()
+    file_path = tmp_path / f"tree{suffix}"
+    file_path.write_bytes(compress(data))
+
+    plain = GameTreeProcessor(tree_file).get_game_info()
+    assert GameTreeProcessor(str(file_path)).get_game_info() == plain
+
+
+def test_gzip_upload_is_inflated_while_streamed(client, tree_file, tmp_path):
+    from conftest import upload_tree
+
+    with open(tree_file, "rb") as f:
+        data = f.read()
+    file_path = tmp_path / "upload.json.gz"
+    file_path.write_bytes(gzip.compress(data))
+
+    body = upload_tree(client, str(file_path), "upload.json.gz")
+    assert body["job"]["stage"] == "done"
+    assert body["job"]["total_bytes"] == file_path.stat().st_size
+    assert client.get(f"/api/node/{body['session_id']}?path=").status_code == 200
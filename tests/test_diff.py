@@ -0,0 +1,121 @@
+import json
+
+import numpy as np
+import pytest
+
+from tree_diff import align_trees
+from tree_processor import GameTreeProcessor
+
+
+def action_node(player, strategy, childrens=None):
+    actions = ["CHECK", "BET 5"]
+    node = {"node_type": "action_node", "player": player, "actions": actions,
+            "strategy": {"actions": actions, "strategy": strategy}}
+    if childrens:
+        node["childrens"] = childrens
+    return node
+
+
+def tree(root_strategy, check_strategy, extra_child=False):
+    childrens = {"CHECK": action_node(0, check_strategy)}
+    if extra_child:
+        childrens["BET 5"] = action_node(0, {"AhAs": [1.0, 0.0]})
+    return action_node(1, root_strategy, childrens)
+
+
+BASE = tree({"AhAs": [1.0, 0.0], "KhKs": [0.5, 0.5]}, {"QhQs": [0.2, 0.8]})
+CHANGED = tree({"AhAs": [0.0, 1.0], "KhKs": [0.5, 0.5], "JhJs": [1.0, 0.0]}, {"QhQs": [0.2, 0.8]},
+               extra_child=True)
+
+
+@pytest.fixture
+def load(tmp_path):
+    def load(data, name):
+        file_path = tmp_path / f"{name}.json"
+        file_path.write_text(json.dumps(data))
+        return GameTreeProcessor(str(file_path))
+    return load
+
+
+def test_tree_against_itself(load):
+    processor = load(BASE, "base")
+    diff = processor.diff_with(processor)
+    assert diff["aligned_nodes"] == processor.store.node_count
+    assert diff["compared_nodes"] == 2
+    assert diff["only_in_this"] == diff["only_in_other"] == 0
+    assert diff["mean_divergence"] == 0
+    assert diff["combos"] == []
+    assert all(node["divergence"] == 0 for node in diff["nodes"])
+
+
+def test_align_trees_by_action(load):
+    base, changed = load(BASE, "base"), load(CHANGED, "changed")
+    mapping = align_trees(base.store, changed.store)
+    assert mapping[0] == 0
+    check = base.find_node_by_path("/childrens/CHECK")
+    assert mapping[check] == changed.find_node_by_path("/childrens/CHECK")
+
+    reverse = align_trees(changed.store, base.store)
+    assert reverse[changed.find_node_by_path("/childrens/BET 5")] == -1
+
+
+def test_divergence_over_common_combos(load):
+    base, changed = load(BASE, "base"), load(CHANGED, "changed")
+    diff = base.diff_with(changed)
+    assert diff["aligned_nodes"] == 2
+    assert diff["only_in_this"] == 0
+    assert diff["only_in_other"] == 1
+
+    # AhAs flips from always checking to always betting; KhKs is unchanged and JhJs is only in one tree
+    root = next(node for node in diff["nodes"] if node["path"] == "")
+    assert root["combos"] == 2
+    assert root["divergence"] == 50.0
+    assert root["max_combo_divergence"] == 100.0
+    assert root["frequency_delta"]["BET 5"] > 0
+
+    top = diff["combos"][0]
+    assert top["path"] == "" and top["divergence"] == 100.0
+    assert top["hand"] == "AA"
+    assert top["probabilities"] == [100.0, 0.0] and top["other_probabilities"] == [0.0, 100.0]
+    assert len(diff["combos"]) == 1
+
+    # Mean over every common combo of every compared node: 1 of 3 combos diverges fully
+    assert diff["mean_divergence"] == pytest.approx(100 / 3, abs=0.01)
+
+
+def test_diff_below_a_node(load):
+    base, changed = load(BASE, "base"), load(CHANGED, "changed")
+    diff = base.diff_with(changed, "/childrens/CHECK")
+    assert diff["aligned_nodes"] == 1
+    assert diff["mean_divergence"] == 0
+    with pytest.raises(ValueError):
+        base.diff_with(changed, "/childrens/RAISE")
+
+
+def test_union_of_action_labels(load):
+    other = tree({"AhAs": [0.5, 0.5]}, {"QhQs": [0.2, 0.8]})
+    other["strategy"]["actions"] = other["actions"] = ["CHECK", "BET 10"]
+    base, relabeled = load(BASE, "base"), load(other, "relabeled")
+    root = next(node for node in base.diff_with(relabeled)["nodes"] if node["path"] == "")
+    # An action missing on one side counts as never taken
+    assert root["actions"] == ["CHECK", "BET 5", "BET 10"]
+    assert root["divergence"] == 50.0
+
+
+def test_diff_endpoint(client, tmp_path):
+    from conftest import upload_tree
+    ids = []
+    for name, data in (("base", BASE), ("changed", CHANGED)):
+        file_path = tmp_path / f"{name}.json"
+        file_path.write_text(json.dumps(data))
+        ids.append(upload_tree(client, str(file_path), f"{name}.json")["session_id"])
+
+    response = client.get(f"/api/diff/{ids[0]}?other={ids[1]}&top=1")
+    assert response.status_code == 200
+    diff = response.get_json()
+    assert len(diff["nodes"]) == 1 and len(diff["combos"]) == 1
+    assert np.isclose(diff["mean_divergence"], 100 / 3, atol=0.01)
+
+    missing = client.get(f"/api/diff/{ids[0]}?other=00000000-0000-0000-0000-000000000000")
+    assert missing.status_code == 404
+    assert missing.get_json() == {"error": "Session not found"}
@@ -0,0 +1,63 @@
+import pytest
+
+
+NODE_ENDPOINTS = ["node", "strategy", "hand_matrix", "ev_analysis", "subtree"]
+
+
+@pytest.mark.parametrize("endpoint", NODE_ENDPOINTS)
+def test_unchanged_node_answers_304(client, session_id, endpoint):
+    url = f"/api/{endpoint}/{session_id}?path="
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_etag_is_stable_and_differs_per_node(client, session_id):
+    root = client.get(f"/api/strategy/{session_id}?path=").headers["ETag"]
+    assert client.get(f"/api/strategy/{session_id}?path=").headers["ETag"] == root
+    assert client.get(f"/api/strategy/{session_id}?node=0").headers["ETag"] == root
+    assert client.get(f"/api/strategy/{session_id}?node=1").headers["ETag"] != root
+
+
+def test_stale_etag_gets_the_body(client, session_id):
+    response = client.get(f"/api/node/{session_id}?path=", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.get_json()["node_type"]
+
+
+def test_compressed_etag_matches_its_plain_body(client, session_id):
+    url = f"/api/hand_matrix/{session_id}?path="
+    plain = client.get(url)
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    # Either validator matches, whatever encoding the cached copy had
+    for etag in (plain.headers["ETag"], compressed.headers["ETag"]):
+        response = client.get(url, headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+        assert response.status_code == 304
+
+
+def test_unknown_session(client):
+    response = client.get("/api/node/00000000-0000-0000-0000-000000000000?path=")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Session not found"}
+
+
+def test_bundle_revisit_answers_304(client, session_id):
+    # The URL the tree view requests for a node, whichever way it was reached
+    url = f"/api/bundle/{session_id}?path=&views=node,strategy"
+    first = client.get(url)
+    assert first.status_code == 200
+    again = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_direct_node_endpoint_is_gone(client, session_id):
+    assert client.get(f"/api/direct_node/{session_id}?path=").status_code == 404
@@ -0,0 +1,126 @@
+import csv
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from combos import CELL_HANDS, COMBO_CELLS, COMBO_NAMES
+from generate_tree import TreeGenerator
+from tree_export import EXPORT_COLUMNS, export_strategies
+from tree_processor import GameTreeProcessor
+from tree_stats import STREETS
+
+
+# Small enough to compare every row, and split into several batches
+BATCH_ROWS = 500
+
+
+@pytest.fixture(scope="module")
+def processor(tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp("trees") / "small.json")
+    TreeGenerator(dealcards=1, combos=20, streets=1).write(file_path)
+    return GameTreeProcessor(file_path)
+
+
+def expected_rows(processor):
+    """(node id, combo index) -> {action: frequency} for every exported strategy, read node by node"""
+    rows = {}
+    for node_id in range(processor.store.node_count):
+        strategy = processor.store.strategy(node_id)
+        if strategy is None or not strategy.actions or strategy.probabilities is None:
+            continue
+        for combo in np.flatnonzero(strategy.mask):
+            rows[node_id, int(combo)] = dict(zip(strategy.actions, strategy.probabilities[combo].tolist()))
+    return rows
+
+
+def read_csv(processor):
+    data = b"".join(export_strategies(processor.store, processor.stats, "csv", BATCH_ROWS))
+    reader = csv.reader(io.StringIO(data.decode("utf-8")))
+    assert tuple(next(reader)) == EXPORT_COLUMNS
+    return list(reader)
+
+
+def test_csv_lists_every_strategy_row(processor):
+    expected = expected_rows(processor)
+    rows = read_csv(processor)
+    assert len(rows) == sum(len(actions) for actions in expected.values())
+
+    combo_index = {name: index for index, name in enumerate(COMBO_NAMES)}
+    for node_id, history, street, player, combo, action, frequency in rows:
+        node_id = int(node_id)
+        labels = processor.node_path(node_id).split("/")[2::2]
+        assert history == ",".join(labels)
+        assert street in STREETS
+        assert int(player) == processor.store.player[node_id]
+        assert float(frequency) == pytest.approx(expected[node_id, combo_index[combo]][action], abs=1e-6)
+
+
+def test_frequencies_match_hand_details(processor):
+    rows = read_csv(processor)
+    checked = set()
+    for node_id, _, _, _, combo, action, frequency in rows[::7]:
+        node_id = int(node_id)
+        index = COMBO_NAMES.index(combo)
+        details = processor.get_hand_details("", CELL_HANDS[COMBO_CELLS[index]], node_id)
+        shown = processor.format_specific_hand(combo)
+        entry = next(c for c in details["combinations"] if c["hand"] == shown)
+        assert entry["probabilities"][details["actions"].index(action)] == round(float(frequency) * 100, 1)
+        checked.add(node_id)
+    assert len(checked) > 1
+
+
+def test_npz_matches_csv(processor):
+    data = b"".join(export_strategies(processor.store, processor.stats, "npz", BATCH_ROWS))
+    arrays = np.load(io.BytesIO(data))
+    rows = read_csv(processor)
+
+    assert len(arrays["node_id"]) == len(rows)
+    assert [int(row[0]) for row in rows] == arrays["node_id"].tolist()
+    assert [row[4] for row in rows] == arrays["combos"][arrays["combo"]].tolist()
+    assert [row[5] for row in rows] == arrays["actions"][arrays["action"]].tolist()
+    np.testing.assert_allclose(arrays["frequency"], [float(row[6]) for row in rows], atol=1e-6)
+
+    # Histories are stored once per node, in the order of nodes
+    histories = dict(zip(arrays["nodes"].tolist(), arrays["history"].tolist()))
+    assert all(histories[int(row[0])] == row[1] for row in rows)
+    assert zipfile.ZipFile(io.BytesIO(data)).testzip() is None
+
+
+def test_parquet_matches_csv(processor):
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = b"".join(export_strategies(processor.store, processor.stats, "parquet", BATCH_ROWS))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    rows = read_csv(processor)
+
+    assert parquet.metadata.num_rows == len(rows)
+    assert parquet.metadata.num_row_groups > 1
+    table = parquet.read().to_pydict()
+    assert table["combo"] == [row[4] for row in rows]
+    assert table["action"] == [row[5] for row in rows]
+    np.testing.assert_allclose(table["frequency"], [float(row[6]) for row in rows], atol=1e-6)
+
+
+def test_export_endpoint(client, session_id):
+    response = client.get(f"/api/export/{session_id}?format=npz")
+    assert response.status_code == 200
+    assert f"strategies-{session_id}.npz" in response.headers["Content-Disposition"]
+    arrays = np.load(io.BytesIO(response.data))
+    assert len(arrays["node_id"]) == len(arrays["frequency"]) > 0
+
+
+def test_export_endpoint_rejects_unknown_formats(client, session_id):
+    response = client.get(f"/api/export/{session_id}?format=xlsx")
+    assert response.status_code == 400
+    assert "Unknown export format" in response.get_json()["error"]
+    assert client.get("/api/export/unknown?format=csv").status_code == 404
+
+
+def test_parquet_without_pyarrow_is_a_json_error(client, session_id, monkeypatch):
+    import tree_export
+
+    monkeypatch.setattr(tree_export, "pa", None)
+    response = client.get(f"/api/export/{session_id}?format=parquet")
+    assert response.status_code == 500
+    assert "pyarrow" in response.get_json()["error"]
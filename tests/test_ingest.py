@@ -0,0 +1,185 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from chunked_upload import ChunkedUploads, MIN_CHUNK_SIZE
+from ingest import IngestQueue, StreamNotReady
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = IngestQueue(str(tmp_path / "jobs"), max_workers=1, max_streams=2)
+    yield queue
+    if queue.executor is not None:
+        queue.executor.shutdown(cancel_futures=True)
+
+
+def job_stage(queue, job_id):
+    return queue.status(job_id)["stage"]
+
+
+def test_streams_are_capped_below_the_workers(tmp_path):
+    queue = IngestQueue(str(tmp_path / "jobs"), max_workers=3)
+    assert queue.max_streams == 2
+    assert IngestQueue(str(tmp_path / "jobs"), max_workers=1).max_streams == 1
+
+    queue.max_streams = 1
+    first = queue.open_stream("a.json")
+    assert queue.open_stream("b.json") is None
+    first.abort()
+    wait_for(lambda: queue.streams == 0)
+    queue.open_stream("c.json").abort()
+    queue.executor.shutdown(cancel_futures=True)
+
+
+def test_stream_gives_up_when_no_worker_is_free(queue):
+    first = queue.open_stream("a.json")
+    first.write(b"{")
+
+    queue.ready_timeout = 0.2
+    second = queue.open_stream("b.json")
+    with pytest.raises(StreamNotReady):
+        second.write(b"{}")
+
+    first.abort()
+    wait_for(lambda: queue.streams == 0)
+
+
+def test_spooled_upload_is_parsed_on_commit(queue, tree_file, tmp_path):
+    with open(tree_file, "rb") as f:
+        data = f.read()
+    upload = queue.spool("tree.json")
+    upload.write(data)
+    tree_path = str(tmp_path / "tree.gtree")
+    job_id = upload.commit(hashlib.sha256(data).hexdigest(), tree_path)
+
+    wait_for(lambda: job_stage(queue, job_id) in ("done", "failed"))
+    assert job_stage(queue, job_id) == "done"
+    assert os.path.exists(tree_path)
+    assert not os.path.exists(upload.file_path)
+
+
+def test_idle_chunked_upload_releases_its_worker(queue, tree_file, tmp_path):
+    with open(tree_file, "rb") as f:
+        data = f.read()
+    uploads = ChunkedUploads(str(tmp_path / "uploads"), queue, None, max_size=len(data),
+                             max_chunk_size=MIN_CHUNK_SIZE, idle_timeout=0.3)
+    upload = uploads.create("tree.json", len(data), MIN_CHUNK_SIZE)
+    upload.put_chunk(0, data, "sha256", hashlib.sha256(data).hexdigest())
+
+    # Nobody finalizes, so the stream is dropped while waiting for the decision
+    wait_for(lambda: upload.status()["error"] is not None)
+    wait_for(lambda: queue.streams == 0)
+    assert "No data" in upload.status()["error"]
+
+    tree_path = str(tmp_path / "tree.gtree")
+    job_id = upload.commit(upload.wait_hashed(), tree_path)
+    assert job_id != upload.stream.job_id
+    wait_for(lambda: job_stage(queue, job_id) in ("done", "failed"))
+    assert job_stage(queue, job_id) == "done"
+    assert os.path.exists(tree_path)
+
+
+def watch_stages(queue, job_id, timeout=60):
+    """Poll a job until it finishes, returning each stage seen"""
+    stages = [job_stage(queue, job_id)]
+    deadline = time.monotonic() + timeout
+    while stages[-1] not in ("done", "failed"):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+        stages.append(job_stage(queue, job_id))
+    return stages
+
+
+def test_job_moves_from_queued_to_done(tmp_path, tree_file):
+    finished = []
+    queue = IngestQueue(str(tmp_path / "jobs"), max_workers=1, on_finish=finished.append)
+    try:
+        # A stream holds the only worker, so the submitted file waits in the queue
+        stream = queue.open_stream("held.json")
+        stream.write(b"{")
+        file_path = str(tmp_path / "tree.json")
+        with open(tree_file, "rb") as f, open(file_path, "wb") as out:
+            out.write(f.read())
+        job_id = queue.submit("a" * 64, file_path, str(tmp_path / "tree.gtree"), "tree.json")
+
+        status = queue.status(job_id)
+        assert status["stage"] == "queued"
+        assert status["queue_length"] == 1
+        assert status["progress"] == 0.0
+        assert queue.pending_job("a" * 64) == job_id
+
+        stream.abort()
+        stages = watch_stages(queue, job_id)
+    finally:
+        queue.executor.shutdown(wait=True)
+
+    # Stages only move forward
+    assert stages[0] == "queued"
+    order = ["queued", "parsing", "converting", "done"]
+    assert [order.index(stage) for stage in stages] == sorted(order.index(stage) for stage in stages)
+    status = queue.status(job_id)
+    assert status["stage"] == "done"
+    assert status["error"] is None
+    assert status["progress"] == 100.0
+    assert status["game_info"]["game_type"] == "No Limit Hold'em"
+    assert status["queued_at"] <= status["started_at"] <= status["parsed_at"] <= status["finished_at"]
+    assert queue.pending_job("a" * 64) is None
+    assert not os.path.exists(file_path)
+    assert [job["job_id"] for job in finished if job["stage"] == "done"] == [job_id]
+
+
+def test_bad_json_job_reports_its_error(queue, tmp_path):
+    upload = queue.spool("bad.json")
+    upload.write(b'{"node_type": "action_node", "childrens": {')
+    tree_path = str(tmp_path / "bad.gtree")
+    job_id = upload.commit("b" * 64, tree_path)
+
+    wait_for(lambda: job_stage(queue, job_id) in ("done", "failed"))
+    status = queue.status(job_id)
+    assert status["stage"] == "failed"
+    assert status["error"].startswith("Invalid JSON")
+    assert status["finished_at"] >= status["started_at"]
+    assert status["parsed_at"] is None and status["game_info"] is None
+    assert queue.failure(job_id) == status["error"]
+    assert not os.path.exists(tree_path)
+    # The spooled body is deleted whether parsing worked or not
+    assert not os.path.exists(upload.file_path)
+
+
+def test_aborted_spool_leaves_no_file(queue):
+    upload = queue.spool("tree.json")
+    upload.write(b"{}")
+    assert os.path.exists(upload.file_path)
+    upload.discard()
+    assert not os.path.exists(upload.file_path)
+    upload.abort()
+    assert os.listdir(queue.job_folder) == []
+
+
+def test_unknown_job(queue, client):
+    assert queue.status("not-a-uuid") is None
+    assert queue.status("00000000-0000-0000-0000-000000000000") is None
+    response = client.get("/api/jobs/00000000-0000-0000-0000-000000000000")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Job not found"}
+
+
+def test_bad_json_upload_is_reported_by_its_job(client, tmp_path):
+    from conftest import upload_tree
+
+    file_path = tmp_path / "bad.json"
+    file_path.write_bytes(b'{"node_type": "action_node", "childrens": {')
+    body = upload_tree(client, str(file_path), "bad.json")
+    assert body["job"]["stage"] == "failed"
+    assert "Invalid JSON" in body["job"]["error"]
+    assert body["job"]["filename"] == "bad.json"
@@ -0,0 +1,110 @@
+import io
+import json
+
+import pytest
+
+from json_stream import JsonStreamReader
+
+
+def reader_for(text, chunk_size=3):
+    return JsonStreamReader(io.BytesIO(text.encode("utf-8")), chunk_size=chunk_size)
+
+
+def test_walks_object_keys_across_chunks():
+    reader = reader_for('{"a": 1, "b": {"c": [1, 2.5e3]}, "d": "x"}')
+    reader.begin_object()
+    assert reader.next_key() == "a"
+    assert reader.read_value() == 1
+    assert reader.next_key() == "b"
+    assert reader.read_value() == {"c": [1, 2500.0]}
+    assert reader.next_key() == "d"
+    assert reader.read_value() == "x"
+    assert reader.next_key() is None
+    assert reader.peek() == ""
+
+
+def test_number_at_chunk_boundary_is_not_cut():
+    reader = reader_for('{"n": 123456789}', chunk_size=8)
+    reader.begin_object()
+    reader.next_key()
+    assert reader.read_value() == 123456789
+
+
+def test_multibyte_characters_split_across_chunks():
+    reader = reader_for('{"é": "ünïcödé"}', chunk_size=1)
+    reader.begin_object()
+    assert reader.next_key() == "é"
+    assert reader.read_value() == "ünïcödé"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64])
+def test_skip_value_ignores_brackets_in_strings(chunk_size):
+    skipped = [1, "x]\"}", {"b": [[], {}]}, "\\", None, True]
+    reader = reader_for(json.dumps({"a": skipped, "b": {"k": "v"}}), chunk_size)
+    reader.begin_object()
+    assert reader.next_key() == "a"
+    reader.skip_value()
+    assert reader.next_key() == "b"
+    assert reader.read_value() == {"k": "v"}
+    assert reader.next_key() is None
+
+
+def test_skip_value_does_not_decode_containers(monkeypatch):
+    reader = reader_for('{"skip": [[1, 2], [3, 4]], "keep": 5}')
+    reader.begin_object()
+    reader.next_key()
+    monkeypatch.setattr(reader._json, "raw_decode", None)
+    reader.skip_value()
+    monkeypatch.undo()
+    assert reader.next_key() == "keep"
+    assert reader.read_value() == 5
+
+
+def test_skip_value_scalars():
+    reader = reader_for('{"a": "text", "b": 12, "c": null}')
+    reader.begin_object()
+    for key in ("a", "b", "c"):
+        assert reader.next_key() == key
+        reader.skip_value()
+    assert reader.next_key() is None
+
+
+def test_unterminated_container_is_an_error():
+    reader = reader_for('{"a": [1, [2, 3]')
+    reader.begin_object()
+    reader.next_key()
+    with pytest.raises(ValueError, match="unterminated"):
+        reader.skip_value()
+
+
+def test_errors_report_the_parser_offset():
+    text = '{"a": 1, "b" 2}'
+    # Read ahead well past the bad token before the parser reaches it
+    reader = reader_for(text, chunk_size=64)
+    reader.begin_object()
+    reader.next_key()
+    reader.read_value()
+    with pytest.raises(ValueError, match=f"offset {text.index('2')}$"):
+        reader.next_key()
+
+
+def test_errors_report_offset_after_buffer_refills():
+    text = '{"padding": "' + "x" * 50 + '", "bad": tru}'
+    reader = reader_for(text, chunk_size=4)
+    reader.begin_object()
+    reader.next_key()
+    reader.read_value()
+    reader.next_key()
+    with pytest.raises(ValueError, match=f"offset {text.index('tru')}$"):
+        reader.read_value()
+
+
+def test_progress_callback_reports_bytes():
+    data = b'{"a": [1, 2, 3]}'
+    seen = []
+    reader = JsonStreamReader(io.BytesIO(data), chunk_size=4, total_size=len(data),
+                              progress_callback=lambda done, total: seen.append((done, total)))
+    reader.begin_object()
+    reader.next_key()
+    reader.read_value()
+    assert seen[-1] == (len(data), len(data))
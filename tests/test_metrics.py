@@ -0,0 +1,132 @@
+import os
+import re
+import time
+
+import pytest
+
+from metrics import Histogram, SlowRequestProfiler, finish_request, phase, start_request, timed
+
+
+SERVER_TIMING = re.compile(r"^(\w+;dur=\d+\.\d{2}, )*total;dur=\d+\.\d{2}$")
+
+
+def parse_server_timing(header):
+    return {name: float(duration) for name, duration in re.findall(r"(\w+);dur=([\d.]+)", header)}
+
+
+@timed("inner")
+def inner_work():
+    time.sleep(0.02)
+
+
+@timed("outer")
+def outer_work():
+    time.sleep(0.02)
+    inner_work()
+
+
+def test_nested_phases_count_only_their_own_time():
+    timings = start_request()
+    outer_work()
+    with phase("serialize"):
+        inner_work()
+    assert finish_request() is timings
+
+    total = timings.elapsed()
+    assert set(timings.phases) == {"outer", "inner", "serialize"}
+    assert timings.phases["outer"] == pytest.approx(0.02, abs=0.015)
+    assert timings.phases["inner"] == pytest.approx(0.04, abs=0.015)
+    assert timings.phases["serialize"] < 0.005
+    assert sum(timings.phases.values()) <= total
+
+
+def test_phases_are_free_outside_requests():
+    assert finish_request() is None
+    outer_work()
+    with phase("serialize"):
+        pass
+    assert finish_request() is None
+
+
+def test_server_timing_header(client, session_id):
+    response = client.get(f"/api/hand_details/{session_id}?path=&hand=AA")
+    header = response.headers["Server-Timing"]
+    assert SERVER_TIMING.match(header), header
+
+    durations = parse_server_timing(header)
+    assert {"resolve", "hand_details", "total"} <= set(durations)
+    # Two decimals per entry, so allow for rounding
+    assert sum(d for name, d in durations.items() if name != "total") <= durations["total"] + 0.01 * len(durations)
+    assert "Server-Timing" not in client.get("/").headers
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("endpoint",), (0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(("/api/node",), value)
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{endpoint="/api/node",le="0.1"} 1',
+        'latency_seconds_bucket{endpoint="/api/node",le="1.0"} 2',
+        'latency_seconds_bucket{endpoint="/api/node",le="+Inf"} 3',
+        'latency_seconds_sum{endpoint="/api/node"} 5.550000',
+        'latency_seconds_count{endpoint="/api/node"} 3',
+    ]
+
+
+def test_metrics_exposition(client, session_id):
+    client.get(f"/api/node/{session_id}?path=")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+
+    families = re.findall(r"^# TYPE (\w+) (\w+)$", text, re.M)
+    assert ("gto_request_duration_seconds", "histogram") in families
+    assert ("gto_result_cache_hits_total", "counter") in families
+    assert len({name for name, _ in families}) == len(families)
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            assert re.match(r'^\w+(\{(\w+="[^"]*",?)*\})? [\d.e+-]+$', line), line
+
+    # Requests are labelled by route, not by session id
+    assert 'endpoint="/api/node/<session_id>",method="GET",status="200"' in text
+    assert session_id not in text
+    assert re.search(r'gto_request_phase_seconds_count\{endpoint="/api/node/<session_id>",phase="resolve"\} \d+', text)
+
+
+def test_metrics_are_local_only(client):
+    response = client.get("/metrics", environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert response.status_code == 403
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiler_writes_slow_requests_only(tmp_path):
+    profiler = SlowRequestProfiler(str(tmp_path), threshold=0.03, interval=0.001, max_profiles=2)
+
+    profiler.start()
+    busy(0.005)
+    assert profiler.stop("GET /api/node", 0.005) is None
+
+    profiler.start()
+    busy(0.05)
+    file_path = profiler.stop("GET /api/hand_details/<session_id>", 0.05)
+    assert file_path.endswith("-50ms-GET__api_hand_details__session_id.folded")
+    with open(file_path) as f:
+        lines = f.read().splitlines()
+    assert lines
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    assert any(re.search(r";busy \(test_metrics\.py:\d+\)$", line.rsplit(" ", 1)[0]) for line in lines)
+
+    # Only the newest max_profiles are kept
+    for milliseconds in (60, 70):
+        profiler.start()
+        busy(0.04)
+        assert profiler.stop(f"GET /api/slow{milliseconds}", milliseconds / 1000)
+    assert len(os.listdir(tmp_path)) == 2
+    assert profiler.written == 3
@@ -0,0 +1,68 @@
+import pytest
+
+from node_store import FLAG_DEALCARDS
+
+
+NODE_ENDPOINTS = ["node", "strategy", "hand_matrix", "ev_analysis", "subtree", "summary", "stats"]
+
+
+@pytest.fixture(scope="module")
+def processor(server, session_id):
+    return server.get_processor(session_id)
+
+
+def decision_nodes(processor):
+    """Every seventh node with a strategy below the root, whose path is empty"""
+    store = processor.store
+    return [n for n in range(1, store.node_count) if store.strategy_index[n] >= 0][::7]
+
+
+@pytest.mark.parametrize("endpoint", NODE_ENDPOINTS)
+def test_node_id_matches_its_path(client, session_id, processor, endpoint):
+    for node_id in decision_nodes(processor):
+        path = processor.node_path(node_id)
+        by_id = client.get(f"/api/{endpoint}/{session_id}?node={node_id}")
+        by_path = client.get(f"/api/{endpoint}/{session_id}?path={path}")
+        assert by_id.status_code == by_path.status_code == 200
+        assert by_id.get_json() == by_path.get_json()
+
+
+def test_hand_details_and_runout_by_node_id(client, session_id, processor):
+    store = processor.store
+    node_id = decision_nodes(processor)[1]
+    path = processor.node_path(node_id)
+    by_id = client.get(f"/api/hand_details/{session_id}?node={node_id}&hand=AA").get_json()
+    assert by_id == client.get(f"/api/hand_details/{session_id}?path={path}&hand=AA").get_json()
+
+    chance_id = next(n for n in range(store.node_count) if store.flags[n] & FLAG_DEALCARDS)
+    path = processor.node_path(chance_id)
+    by_id = client.get(f"/api/runout/{session_id}?node={chance_id}").get_json()
+    assert by_id == client.get(f"/api/runout/{session_id}?path={path}").get_json()
+
+
+def test_node_id_overrides_the_path(client, session_id, processor):
+    node_id = decision_nodes(processor)[1]
+    by_id = client.get(f"/api/strategy/{session_id}?node={node_id}&path=/childrens/NOPE").get_json()
+    assert by_id == client.get(f"/api/strategy/{session_id}?node={node_id}").get_json()
+
+
+@pytest.mark.parametrize("endpoint, query", [(endpoint, "") for endpoint in NODE_ENDPOINTS] + [
+    ("runout", ""),
+    ("hand_details", "hand=AA&"),
+    ("hand_details", "hand=AA&format=binary&"),
+    ("hand_matrix", "format=binary&"),
+    ("diff", "other={session_id}&"),
+])
+def test_out_of_range_node_id_is_not_found(client, session_id, processor, endpoint, query):
+    query = query.format(session_id=session_id)
+    for node_id in (-1, processor.store.node_count):
+        response = client.get(f"/api/{endpoint}/{session_id}?{query}node={node_id}")
+        assert response.status_code == 404
+        assert response.get_json() == {"error": f"Node not found: {node_id}"}
+
+
+def test_bundle_reports_unknown_ids_per_node(client, session_id, processor):
+    node_count = processor.store.node_count
+    body = client.get(f"/api/bundle/{session_id}?node=0&node={node_count}&views=node").get_json()
+    assert body["nodes"][0]["node_id"] == 0
+    assert body["nodes"][1] == {"error": f"Node not found: {node_count}"}
@@ -0,0 +1,138 @@
+import gzip
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from combos import CELL_COUNT, CELL_HANDS
+from payload_format import (DETAILS_MAGIC, DTYPE_FLOAT32, DTYPE_UINT8, MATRIX_MAGIC, PAYLOAD_VERSION,
+                            encode_hand_details, encode_hand_matrix)
+from tree_processor import GameTreeProcessor
+
+
+def decode(data):
+    """Read a payload back the way the browser does: (magic, header, counts or None, probabilities)"""
+    magic, version, dtype, n_actions, header_length = struct.unpack_from("<4sBBHI", data)
+    assert version == PAYLOAD_VERSION
+    offset = 12
+    header = json.loads(data[offset:offset + header_length])
+    offset += header_length + (-header_length % 4)
+    assert offset % 4 == 0
+
+    counts = None
+    if magic == MATRIX_MAGIC:
+        counts = np.frombuffer(data, np.uint8, CELL_COUNT, offset)
+        offset += CELL_COUNT + (-CELL_COUNT % 4)
+        rows = CELL_COUNT
+    else:
+        assert magic == DETAILS_MAGIC
+        rows = len(header["combinations"])
+
+    # Quantized columns are padded to 4 bytes, so the row count comes from the header
+    if dtype == DTYPE_UINT8:
+        values = np.frombuffer(data, np.uint8, rows * n_actions, offset).astype(np.float32) / 255
+    else:
+        assert dtype == DTYPE_FLOAT32
+        values = np.frombuffer(data, "<f4", rows * n_actions, offset)
+    assert 0 <= len(data) - offset - values.size * (1 if dtype == DTYPE_UINT8 else 4) < 4
+    return magic, header, counts, values.reshape(rows, n_actions)
+
+
+@pytest.fixture(scope="module")
+def processor(tree_file):
+    return GameTreeProcessor(tree_file)
+
+
+@pytest.mark.parametrize("quantize, tolerance", [(False, 1e-7), (True, 0.5 / 255)])
+def test_hand_matrix_round_trip(quantize, tolerance):
+    rng = np.random.default_rng(0)
+    averages = rng.dirichlet(np.ones(3), CELL_COUNT).astype(np.float32)
+    averages[5] = np.nan
+    counts = rng.integers(0, 300, CELL_COUNT)
+
+    data = encode_hand_matrix(["CHECK", "BET 5", "BET 10"], ["A", "K"], counts, averages, quantize)
+    assert len(data) % 4 == 0
+    magic, header, decoded_counts, probabilities = decode(data)
+
+    assert magic == MATRIX_MAGIC
+    assert header == {"actions": ["CHECK", "BET 5", "BET 10"], "ranks": ["A", "K"]}
+    assert decoded_counts.tolist() == np.minimum(counts, 255).tolist()
+    np.testing.assert_allclose(probabilities, np.nan_to_num(averages), atol=tolerance)
+
+
+@pytest.mark.parametrize("quantize, tolerance", [(False, 1e-7), (True, 0.5 / 255)])
+def test_hand_details_round_trip(quantize, tolerance):
+    probabilities = np.array([[0.25, 0.75], [1.0, 0.0], [0.6, 0.4]], dtype=np.float32)
+    data = encode_hand_details("AKs", ["CHECK", "BET 5"], ["A♠K♠", "A♥K♥", "A♦K♦"], probabilities, 4, quantize)
+    magic, header, counts, decoded = decode(data)
+
+    assert magic == DETAILS_MAGIC
+    assert counts is None
+    assert header == {"hand": "AKs", "actions": ["CHECK", "BET 5"],
+                      "combinations": ["A♠K♠", "A♥K♥", "A♦K♦"], "expected_combos": 4}
+    np.testing.assert_allclose(decoded, probabilities, atol=tolerance)
+
+
+def test_packed_matrix_matches_the_json_one(processor):
+    matrix = processor.get_hand_matrix_data("")
+    _, header, counts, probabilities = decode(processor.get_hand_matrix_packed(""))
+    assert header["actions"] == matrix["actions"]
+    for cell in matrix["cells"]:
+        index = cell["row"] * 13 + cell["col"]
+        assert bool(counts[index]) == bool(cell["probabilities"])
+        if cell["probabilities"]:
+            np.testing.assert_allclose(probabilities[index] * 100, cell["probabilities"], atol=0.051)
+
+
+def test_packed_details_match_the_json_ones(processor):
+    hand = next(cell["hand"] for cell in processor.get_hand_matrix_data("")["cells"] if cell["probabilities"])
+    details = processor.get_hand_details("", hand)
+    _, header, _, probabilities = decode(processor.get_hand_details_packed("", hand))
+    assert header["combinations"] == [combo["hand"] for combo in details["combinations"]]
+    assert header["expected_combos"] == details["expected_combos"]
+    for row, combo in zip(probabilities, details["combinations"]):
+        np.testing.assert_allclose(row * 100, combo["probabilities"], atol=0.051)
+
+
+def test_binary_endpoints(client, session_id, processor):
+    response = client.get(f"/api/hand_matrix/{session_id}?path=&format=binary&precision=u8")
+    assert response.status_code == 200
+    assert response.mimetype == "application/octet-stream"
+    assert decode(response.data)[0] == MATRIX_MAGIC
+    assert response.data == processor.get_hand_matrix_packed("", quantize=True)
+
+    hand = next(cell for cell in CELL_HANDS if "error" not in processor.get_hand_details("", cell))
+    response = client.get(f"/api/hand_details/{session_id}?path=&hand={hand}&format=binary")
+    assert decode(response.data)[1]["hand"] == hand
+
+
+def test_identity_is_sent_uncompressed(client, session_id):
+    url = f"/api/hand_matrix/{session_id}?path="
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert not response.headers["ETag"].endswith('-gzip"')
+    assert response.get_json()["has_strategy"]
+
+
+def test_gzip_is_chosen_without_brotli(client, session_id, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "brotli", None)
+    url = f"/api/hand_matrix/{session_id}?path=&format=binary"
+    plain = client.get(url)
+    response = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_brotli_is_preferred(client, session_id):
+    brotli = pytest.importorskip("brotli")
+    url = f"/api/hand_matrix/{session_id}?path="
+    plain = client.get(url)
+    response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-br"'
+    assert brotli.decompress(response.data) == plain.data
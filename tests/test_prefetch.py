@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import add_tree
+from prefetch import Prefetcher
+from session_manager import SessionManager
+
+
+@pytest.fixture
+def prefetcher():
+    prefetcher = Prefetcher(max_workers=2)
+    yield prefetcher
+    prefetcher.executor.shutdown(wait=True)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_newer_generation_cancels_stale_work(prefetcher):
+    ran = []
+    # A request in flight holds the first task in its wait, past the point where it could still be cancelled
+    prefetcher.request_started()
+    prefetcher.schedule("a", [lambda: ran.append("old")])
+    old = prefetcher.futures["a"][0]
+    wait_until(old.running)
+
+    prefetcher.schedule("a", [lambda: ran.append("new")])
+    prefetcher.request_finished()
+    new = prefetcher.futures["a"][0]
+    new.result(timeout=5)
+    old.result(timeout=5)
+
+    assert ran == ["new"]
+    assert prefetcher.usage()["completed"] == 1
+    assert prefetcher.usage()["cancelled"] == 1
+
+
+def test_queued_work_is_cancelled_before_it_starts(prefetcher):
+    release = threading.Event()
+    ran = []
+    prefetcher.schedule("busy", [release.wait, release.wait])
+    prefetcher.schedule("a", [lambda: ran.append("old")])
+    prefetcher.schedule("a", [lambda: ran.append("new")])
+    release.set()
+    wait_until(lambda: prefetcher.usage()["queued"] == 0)
+
+    assert ran == ["new"]
+    assert prefetcher.usage()["cancelled"] == 1
+
+
+def test_other_sessions_are_left_alone(prefetcher):
+    ran = []
+    prefetcher.schedule("a", [lambda: ran.append("a")])
+    prefetcher.schedule("b", [lambda: ran.append("b")])
+    wait_until(lambda: prefetcher.usage()["completed"] == 2)
+    assert sorted(ran) == ["a", "b"]
+
+
+def test_failed_task_does_not_stop_the_pool(prefetcher):
+    ran = []
+    prefetcher.schedule("a", [lambda: 1 / 0])
+    wait_until(lambda: prefetcher.usage()["queued"] == 0)
+    prefetcher.schedule("a", [lambda: ran.append("a")])
+    wait_until(lambda: ran == ["a"])
+
+
+def test_removed_session_cancels_its_work(tmp_path, tree_file, prefetcher):
+    manager = SessionManager(str(tmp_path), memory_budget=1 << 30, idle_ttl=3600, on_forget=prefetcher.cancel)
+    session_id = manager.open_session(add_tree(manager, tree_file))
+    ran = []
+
+    prefetcher.request_started()
+    prefetcher.schedule(session_id, [lambda: ran.append(session_id)])
+    future = prefetcher.futures[session_id][0]
+    wait_until(future.running)
+    assert manager.remove(session_id)
+    prefetcher.request_finished()
+    future.result(timeout=5)
+
+    assert ran == []
+    assert session_id not in prefetcher.generations
+    assert prefetcher.usage()["sessions"] == 0
+
+
+def test_expired_session_cancels_its_work(tmp_path, tree_file, prefetcher):
+    manager = SessionManager(str(tmp_path), memory_budget=1 << 30, idle_ttl=3600, session_ttl=60,
+                             on_forget=prefetcher.cancel)
+    session_id = manager.open_session(add_tree(manager, tree_file))
+    ran = []
+
+    prefetcher.request_started()
+    prefetcher.schedule(session_id, [lambda: ran.append(session_id)])
+    future = prefetcher.futures[session_id][0]
+    wait_until(future.running)
+    expired = time.time() - 120
+    os.utime(manager.link_file_path(session_id), (expired, expired))
+    manager.sweep()
+    prefetcher.request_finished()
+    future.result(timeout=5)
+
+    assert manager.get(session_id) is None
+    assert ran == []
+    assert prefetcher.usage()["cancelled"] == 1
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+
+def query(client, session_id, query_string):
+    response = client.get(f"/api/query/{session_id}?{query_string}")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    return lines[:-1], lines[-1]
+
+
+def test_streams_every_match_under_the_limit(client, session_id):
+    matches, done = query(client, session_id, "player=1")
+    assert done == {"done": True, "matched": len(matches), "truncated": False}
+    assert len(matches) > 3
+    assert all(match["player"] == 1 for match in matches)
+    assert [match["node_id"] for match in matches] == sorted(match["node_id"] for match in matches)
+
+
+def test_limit_truncates(client, session_id):
+    matches, done = query(client, session_id, "player=1&limit=3")
+    assert len(matches) == 3
+    assert done == {"done": True, "matched": 3, "truncated": True}
+
+    everything, _ = query(client, session_id, "player=1")
+    assert matches == everything[:3]
+
+
+def test_limit_equal_to_the_matches_is_not_truncated(client, session_id):
+    everything, _ = query(client, session_id, "player=1")
+    matches, done = query(client, session_id, f"player=1&limit={len(everything)}")
+    assert matches == everything
+    assert done == {"done": True, "matched": len(everything), "truncated": False}
+
+    matches, done = query(client, session_id, f"player=1&limit={len(everything) - 1}")
+    assert matches == everything[:-1]
+    assert done["truncated"]
+
+
+@pytest.mark.parametrize("limit", ["0", "-5", "-100000"])
+def test_limit_below_one_is_clamped(client, session_id, limit):
+    matches, done = query(client, session_id, f"player=1&limit={limit}")
+    assert len(matches) == 1
+    assert done["matched"] == 1
+
+
+def test_limit_is_capped(client, session_id, server, monkeypatch):
+    monkeypatch.setattr(server, "MAX_QUERY_LIMIT", 2)
+    matches, done = query(client, session_id, "player=1&limit=1000")
+    assert len(matches) == 2
+    assert done["truncated"]
+
+
+def test_frequency_threshold(client, session_id):
+    everything, _ = query(client, session_id, "frequency_action=CHECK")
+    matches, _ = query(client, session_id, "frequency_action=CHECK&min_frequency=30")
+    assert [m for m in everything if m["frequency"] is not None and m["frequency"] >= 30] == matches
+    assert 0 < len(matches) < len(everything)
+
+
+@pytest.mark.parametrize("query_string, message", [
+    ("hand=AKs", "frequency_action"),
+    ("frequency_action=CHECK&min_frequency=lots", "could not convert"),
+    ("street=showdown", "Unknown street"),
+    ("frequency_action=CHECK&hand=AK9", "Invalid hand"),
+])
+def test_invalid_criteria_are_a_bad_request(client, session_id, query_string, message):
+    response = client.get(f"/api/query/{session_id}?{query_string}")
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
@@ -0,0 +1,37 @@
+from result_cache import ResultCache
+
+
+def test_evicts_least_recently_used_within_budget():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a").body == b"aaaa"
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.nbytes == 8
+
+
+def test_oversized_bodies_are_not_kept():
+    cache = ResultCache(max_bytes=4)
+    entry = cache.put("a", b"too large")
+    assert entry.body == b"too large" and entry.etag
+    assert cache.get("a") is None
+
+
+def test_etag_follows_the_body():
+    cache = ResultCache(max_bytes=100)
+    assert cache.put("a", b"same").etag == cache.put("b", b"same").etag
+    assert cache.put("c", b"other").etag != cache.get("a").etag
+
+
+def test_clear_keeps_counts():
+    cache = ResultCache(max_bytes=100)
+    cache.put("a", b"aaaa")
+    cache.get("a")
+    cache.get("missing")
+    cache.clear()
+    usage = cache.usage()
+    assert usage["entries"] == 0 and usage["nbytes"] == 0
+    assert usage["hits"] == 1 and usage["misses"] == 1
+    assert cache.get("a") is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from node_store import FLAG_DEALCARDS
+from tree_processor import GameTreeProcessor
+from tree_stats import range_reach
+
+
+CHANCE_PATH = "/childrens/CHECK/childrens/CHECK"
+
+
+@pytest.fixture(scope="module")
+def processor(tree_file):
+    return GameTreeProcessor(tree_file)
+
+
+def per_card_frequencies(store, chance_id):
+    """The runout report computed card by card, as it was before it was vectorized"""
+    result = {}
+    for card, child_id in store.dealcards(chance_id):
+        strategy = store.strategy(child_id)
+        reach = range_reach(store, chance_id, int(store.player[child_id])).astype(np.float64) * strategy.mask
+        # Cards the range never reaches report zeros
+        averaged = reach @ strategy.probabilities / reach.sum() if reach.sum() > 0 else np.zeros(len(strategy.actions))
+        result[card] = dict(zip(strategy.actions, averaged.tolist()))
+    return result
+
+
+def test_runout_frequencies_of_the_flop_check_through(processor):
+    report = processor.get_runout_report(CHANCE_PATH)
+    assert report["actions"] == ["CHECK", "BET 5.000000", "BET 10.000000"]
+    assert report["average_frequencies"] == [21.07, 39.84, 39.09]
+    assert [card["card"] for card in report["cards"]] == ["As", "Ad"]
+    assert report["cards"][0]["frequencies"] == [12.64, 42.64, 44.72]
+    assert report["cards"][1]["frequencies"] == [29.62, 37.01, 33.38]
+    assert report["cards"][0]["range_combos"] == 0.3
+
+
+def test_runout_matches_a_per_card_loop(processor):
+    store = processor.store
+    chance_nodes = np.flatnonzero(store.flags & FLAG_DEALCARDS)
+    assert len(chance_nodes) > 1
+    for chance_id in chance_nodes.tolist():
+        report = processor.get_runout_report("", chance_id)
+        expected = per_card_frequencies(store, chance_id)
+        for row in report["cards"]:
+            for action, frequency in zip(report["actions"], row["frequencies"]):
+                assert frequency == pytest.approx(expected[row["card"]].get(action, 0.0) * 100, abs=0.01)
+
+
+def test_runout_heatmap_cells(processor):
+    report = processor.get_runout_report(CHANCE_PATH, heatmap=True)
+    heatmap = report["heatmap"]
+    assert len(heatmap["frequencies"]) == len(report["cards"])
+    assert all(len(cells) == len(heatmap["hands"]) == 169 for cells in heatmap["frequencies"])
+    reported = [cell for cells in heatmap["frequencies"] for cell in cells if cell is not None]
+    assert reported
+    assert all(sum(cell) == pytest.approx(100, abs=0.5) for cell in reported)
+
+
+def test_runout_needs_a_chance_node(client, session_id):
+    response = client.get(f"/api/runout/{session_id}?path=")
+    assert response.status_code == 500
+    assert "no dealt cards" in response.get_json()["error"]
+    response = client.get(f"/api/runout/{session_id}?path={CHANCE_PATH}")
+    assert response.get_json()["average_frequencies"] == [21.07, 39.84, 39.09]
@@ -0,0 +1,122 @@
+import struct
+
+import numpy as np
+import pytest
+
+from session_format import MAGIC, SessionFormatError, load_store, read_header, save_store
+from session_manager import SessionManager
+from tree_processor import GameTreeProcessor
+
+
+@pytest.fixture(scope="module")
+def processor(tree_file):
+    return GameTreeProcessor(tree_file)
+
+
+@pytest.fixture(scope="module")
+def reopened(processor, tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp("sessions") / "tree.gtree")
+    processor.save_session(file_path)
+    return GameTreeProcessor.open_session(file_path)
+
+
+def test_store_round_trip(processor, tmp_path):
+    file_path = str(tmp_path / "store.gtree")
+    extra = {"scores": np.arange(5, dtype=np.float64)}
+    save_store(processor.store, file_path, metadata={"name": "tree"}, extra_arrays=extra)
+
+    store, metadata, arrays = load_store(file_path)
+    original = processor.store
+    assert metadata["name"] == "tree"
+    np.testing.assert_array_equal(arrays["scores"], extra["scores"])
+    for name in ("parent", "depth", "flags", "player", "pot", "board", "edge_start", "edge_count",
+                 "strategy_index", "edge_kind", "edge_label", "edge_child", "strategy_flags",
+                 "strategy_action_start", "strategy_action_count", "strategy_actions", "strategy_mask_bits"):
+        loaded = getattr(store, name)
+        np.testing.assert_array_equal(loaded, getattr(original, name), err_msg=name)
+        assert isinstance(loaded, np.memmap) or isinstance(loaded.base, np.memmap)
+    assert store.strings.strings == original.strings.strings
+
+    assert len(store.strategy_blocks) == len(original.strategy_blocks)
+    for index in (0, len(original.strategy_blocks) // 2, len(original.strategy_blocks) - 1):
+        np.testing.assert_array_equal(store.strategy_blocks[index], original.strategy_blocks[index])
+
+
+def test_reopened_session_answers_like_the_original(processor, reopened):
+    assert reopened.session_id == processor.session_id
+    assert reopened.tree_summary == processor.tree_summary
+    for name, values in processor.stats.arrays().items():
+        np.testing.assert_array_equal(getattr(reopened.stats, name), values, err_msg=name)
+
+    for node_id in range(0, processor.store.node_count, 7):
+        path = processor.node_path(node_id)
+        assert reopened.get_node_info(path) == processor.get_node_info(path)
+        assert reopened.get_strategy_info(path) == processor.get_strategy_info(path)
+
+
+def test_stored_arrays_are_read_only(reopened):
+    with pytest.raises(ValueError):
+        reopened.store.parent[0] = 5
+
+
+def test_rejects_files_that_are_not_sessions(tmp_path):
+    file_path = tmp_path / "tree.json"
+    file_path.write_bytes(b'{"node_type": "action_node"}' + b" " * 64)
+    with pytest.raises(SessionFormatError, match="Not a session file"):
+        read_header(str(file_path))
+
+
+def test_rejects_truncated_files(processor, tmp_path):
+    file_path = tmp_path / "tree.gtree"
+    save_store(processor.store, str(file_path))
+    data = file_path.read_bytes()
+    assert data.startswith(MAGIC)
+
+    file_path.write_bytes(data[:10])
+    with pytest.raises(SessionFormatError, match="Truncated"):
+        load_store(str(file_path))
+
+    file_path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(SessionFormatError, match="Truncated"):
+        load_store(str(file_path))
+
+
+def test_rejects_other_format_versions(processor, tmp_path):
+    file_path = tmp_path / "tree.gtree"
+    save_store(processor.store, str(file_path))
+    data = bytearray(file_path.read_bytes())
+    data[len(MAGIC)] += 1
+    file_path.write_bytes(bytes(data))
+    with pytest.raises(SessionFormatError, match="version"):
+        load_store(str(file_path))
+
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda header: b"\xff" * len(header),
+    lambda header: b"{" + b" " * (len(header) - 1),
+    lambda header: b"[]" + b" " * (len(header) - 2),
+])
+def test_rejects_corrupt_headers(processor, tmp_path, corrupt):
+    file_path = tmp_path / "tree.gtree"
+    save_store(processor.store, str(file_path))
+    data = file_path.read_bytes()
+    header_length = struct.unpack_from("<I", data, len(MAGIC) + 4)[0]
+    start = len(MAGIC) + 8
+    file_path.write_bytes(data[:start] + corrupt(data[start:start + header_length]) + data[start + header_length:])
+
+    with pytest.raises(SessionFormatError, match="Corrupt"):
+        load_store(str(file_path))
+
+
+def test_damaged_tree_is_unavailable_rather_than_an_error(processor, tmp_path):
+    manager = SessionManager(str(tmp_path), memory_budget=1 << 30, idle_ttl=3600)
+    content_hash = "0" * 64
+    file_path = manager.tree_file_path(content_hash)
+    save_store(processor.store, file_path)
+    data = bytearray(open(file_path, "rb").read())
+    data[len(MAGIC) + 8] = 0xff
+    open(file_path, "wb").write(bytes(data))
+
+    session_id = manager.open_session(content_hash)
+    assert manager.get(session_id) is None
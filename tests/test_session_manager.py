@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+from conftest import add_tree
+from generate_tree import TreeGenerator
+from session_manager import SessionManager
+from tree_processor import GameTreeProcessor
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return SessionManager(str(tmp_path), memory_budget=1 << 30, idle_ttl=3600)
+
+
+def test_tree_is_deleted_with_its_last_session(manager, tree_file):
+    content_hash = add_tree(manager, tree_file)
+    first = manager.open_session(content_hash)
+    second = manager.open_session(content_hash)
+
+    assert manager.remove(first)
+    assert manager.get(first) is None
+    assert os.path.exists(manager.tree_file_path(content_hash))
+    assert manager.get(second) is not None
+
+    assert manager.remove(second)
+    assert not os.path.exists(manager.tree_file_path(content_hash))
+    assert not manager.remove(second)
+
+
+def test_remove_waits_for_an_upload_linking_the_tree(manager, tree_file):
+    content_hash = add_tree(manager, tree_file)
+    old = manager.open_session(content_hash)
+
+    # An upload found the tree and is about to link a new session to it
+    with manager.ingest_lock(content_hash):
+        assert manager.has_tree(content_hash)
+        remover = threading.Thread(target=manager.remove, args=(old,))
+        remover.start()
+        remover.join(0.2)
+        assert remover.is_alive()
+        new = manager.open_session(content_hash)
+    remover.join()
+
+    assert os.path.exists(manager.tree_file_path(content_hash))
+    assert manager.get(new) is not None
+
+
+@pytest.fixture(scope="module")
+def other_tree_file(tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp("trees") / "other.json")
+    TreeGenerator(dealcards=1, combos=20, streets=1, seed=3).write(file_path)
+    return file_path
+
+
+def test_budget_evicts_the_least_recently_used_tree(tmp_path, tree_file, other_tree_file):
+    first_tree = GameTreeProcessor(tree_file)
+    second_tree = GameTreeProcessor(other_tree_file)
+    # Room for either tree alone, not for both
+    budget = max(first_tree.nbytes, second_tree.nbytes) + min(first_tree.nbytes, second_tree.nbytes) // 2
+    manager = SessionManager(str(tmp_path), memory_budget=budget, idle_ttl=3600)
+    first = manager.open_session(add_tree(manager, tree_file))
+    second = manager.open_session(add_tree(manager, other_tree_file))
+
+    manager.get(first)
+    assert manager.usage()["tree_count"] == 1
+    assert manager.usage()["reloads"] == 1
+
+    manager.get(second)
+    usage = manager.usage()
+    assert usage["tree_count"] == 1
+    assert usage["evictions"] == 1
+    assert usage["reloads"] == 2
+    assert usage["trees"][0]["content_hash"] == manager.content_hash(second)
+    assert usage["memory_used"] <= budget
+
+    # Reopened from disk, the evicted tree answers as before
+    reloaded = manager.get(first)
+    assert manager.usage()["reloads"] == 3
+    assert manager.usage()["evictions"] == 2
+    for node_id in range(0, first_tree.store.node_count, 5):
+        path = first_tree.node_path(node_id)
+        assert reloaded.get_node_info(path) == first_tree.get_node_info(path)
+        assert reloaded.get_strategy_info(path) == first_tree.get_strategy_info(path)
+
+
+def test_recently_used_tree_survives(tmp_path, tree_file, other_tree_file):
+    third_tree_file = str(tmp_path / "third.json")
+    TreeGenerator(dealcards=1, combos=20, streets=1, seed=4).write(third_tree_file)
+    sizes = [GameTreeProcessor(file_path).nbytes for file_path in (tree_file, other_tree_file, third_tree_file)]
+    # Room for any two trees, not for all three
+    manager = SessionManager(str(tmp_path), memory_budget=sum(sizes) - min(sizes) // 2, idle_ttl=3600)
+    first = manager.open_session(add_tree(manager, tree_file))
+    second = manager.open_session(add_tree(manager, other_tree_file))
+    third = manager.open_session(add_tree(manager, third_tree_file))
+
+    manager.get(first)
+    manager.get(second)
+    manager.get(first)
+    manager.get(third)
+    assert [tree["content_hash"] for tree in manager.usage()["trees"]] == [manager.content_hash(third),
+                                                                           manager.content_hash(first)]
+    assert manager.usage()["evictions"] == 1
+    assert manager.usage()["reloads"] == 3
+
+
+def test_idle_trees_are_dropped(tmp_path, tree_file):
+    manager = SessionManager(str(tmp_path), memory_budget=1 << 30, idle_ttl=0)
+    session_id = manager.open_session(add_tree(manager, tree_file))
+    assert manager.get(session_id) is not None
+    assert manager.usage()["tree_count"] == 0
+    assert manager.usage()["evictions"] == 1
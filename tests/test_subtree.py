@@ -0,0 +1,86 @@
+import pytest
+
+from generate_tree import TreeGenerator
+from node_store import FLAG_DEALCARDS
+from tree_processor import GameTreeProcessor
+
+
+@pytest.fixture(scope="module")
+def processor(tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp("trees") / "wide.json")
+    TreeGenerator(dealcards=12, combos=10, streets=1).write(file_path)
+    return GameTreeProcessor(file_path)
+
+
+def chance_path(processor):
+    """Path of the first chance node, whose cards are more than one page"""
+    store = processor.store
+    node_id = next(n for n in range(store.node_count) if store.flags[n] & FLAG_DEALCARDS)
+    return processor.node_path(node_id)
+
+
+def test_depth_limits_the_levels_returned(processor):
+    item = processor.get_subtree("", depth=1)
+    assert item["node_id"] == 0
+    assert item["children"]
+    assert all("children" not in child for child in item["children"])
+
+    item = processor.get_subtree("", depth=2)
+    assert any(child.get("children") for child in item["children"])
+    assert all("children" not in grandchild
+               for child in item["children"] for grandchild in child.get("children", []))
+
+
+def test_cards_are_paged_with_a_cursor(processor):
+    cards_path = chance_path(processor) + "/dealcards"
+    pages, cursor = [], 0
+    while cursor is not None:
+        page = processor.get_subtree(cards_path, depth=1, cursor=cursor, limit=5)
+        assert page["type"] == "cards"
+        assert page["total_children"] == 12
+        assert len(page["children"]) <= 5
+        pages.append(page)
+        cursor = page["next_cursor"]
+
+    assert [len(page["children"]) for page in pages] == [5, 5, 2]
+    paths = [child["path"] for page in pages for child in page["children"]]
+    assert len(set(paths)) == 12
+    assert all(child["type"] == "card" for page in pages for child in page["children"])
+
+    whole = processor.get_subtree(cards_path, depth=1, limit=50)
+    assert [child["path"] for child in whole["children"]] == paths
+    assert whole["next_cursor"] is None
+
+
+def test_cursor_applies_to_the_requested_level_only(processor):
+    path = chance_path(processor)
+    item = processor.get_subtree(path, depth=3, cursor=0, limit=4)
+    cards = next(child for child in item["children"] if child["type"] == "cards")
+    # The nested card group starts at its first card and reports where the next page begins
+    assert len(cards["children"]) == 4
+    assert cards["next_cursor"] == 4
+    assert all("children" in card for card in cards["children"] if card["has_children"])
+
+
+def test_node_id_and_path_give_the_same_item(processor):
+    path = chance_path(processor)
+    node_id = processor.find_node_by_path(path)
+    assert processor.get_subtree("", depth=2, node_id=node_id) == processor.get_subtree(path, depth=2)
+    with pytest.raises(ValueError):
+        processor.get_subtree("", node_id=processor.store.node_count)
+    with pytest.raises(ValueError):
+        processor.get_subtree("/childrens/NOPE")
+
+
+def test_subtree_endpoint(client, session_id):
+    body = client.get(f"/api/subtree/{session_id}?path=&depth=1&limit=1").get_json()
+    assert len(body["children"]) == 1
+    assert body["next_cursor"] == 1
+    assert body["total_children"] > 1
+
+    second = client.get(f"/api/subtree/{session_id}?path=&depth=1&limit=1&cursor=1").get_json()
+    assert second["children"][0]["path"] != body["children"][0]["path"]
+
+    assert client.get(f"/api/subtree/{session_id}?path=/childrens/NOPE").status_code == 404
+    assert client.get("/api/subtree/unknown?path=").status_code == 404
+    assert client.get(f"/api/tree/{session_id}").status_code == 404
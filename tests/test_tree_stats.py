@@ -0,0 +1,111 @@
+import json
+
+import numpy as np
+import pytest
+
+from generate_tree import TreeGenerator
+from tree_processor import GameTreeProcessor
+from tree_stats import range_reach
+
+
+@pytest.fixture(scope="module")
+def processor(tree_file):
+    return GameTreeProcessor(tree_file)
+
+
+@pytest.fixture(scope="module")
+def two_street_processor(tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp("trees") / "turn.json")
+    TreeGenerator(dealcards=2, combos=30, streets=2, seed=7).write(file_path)
+    return GameTreeProcessor(file_path)
+
+
+def brute_force_frequencies(store, node_id):
+    """Walk up from the node to find its range reach, then average its strategy with those weights"""
+    strategy = store.strategy(node_id)
+    reach = range_reach(store, node_id, int(store.player[node_id])).astype(np.float64) * strategy.mask
+    if reach.sum() > 0:
+        weights = reach / reach.sum()
+    else:
+        weights = strategy.mask / strategy.mask.sum()
+    width = min(len(strategy.actions), strategy.probabilities.shape[1])
+    return reach.sum(), (weights @ strategy.probabilities.astype(np.float64))[:width]
+
+
+@pytest.mark.parametrize("tree", ["processor", "two_street_processor"])
+def test_weighted_frequencies_match_a_brute_force_walk(tree, request):
+    processor = request.getfixturevalue(tree)
+    store, stats = processor.store, processor.stats
+
+    checked = 0
+    for node_id in range(store.node_count):
+        strategy = store.strategy(node_id)
+        if strategy is None or not strategy.actions or strategy.probabilities is None:
+            continue
+        index = int(store.strategy_index[node_id])
+        reach, expected = brute_force_frequencies(store, node_id)
+        assert stats.reach_combos[index] == pytest.approx(reach, rel=1e-4, abs=1e-4)
+        np.testing.assert_allclose(stats.frequencies(store, index)[:len(expected)], expected, atol=1e-5)
+        checked += 1
+    assert checked > 10
+
+
+def test_summary_counts_of_the_generated_tree(processor):
+    summary = processor.tree_summary
+    assert summary["node_count"] == 71
+    assert summary["decision_points"] == 66
+    assert summary["chance_nodes"] == 5
+    assert summary["terminal_nodes"] == 0
+    assert summary["terminal_actions"] == 94
+    assert summary["max_depth"] == 6
+    assert summary["streets"]["flop"] == {"decision": 6, "chance": 5, "terminal": 0, "terminal_actions": 4}
+    assert summary["branching"] == {"1": 4, "2": 15, "3": 12}
+    assert summary["strategy_entries"] == 6160
+
+
+def test_terminal_nodes_and_terminal_actions_are_counted_apart(tmp_path):
+    actions = ["CHECK", "BET 5", "FOLD"]
+    leaf = {"node_type": "terminal_node"}
+    tree = {"node_type": "action_node", "player": 0, "actions": actions,
+            "strategy": {"actions": actions, "strategy": {"AhAs": [0.5, 0.25, 0.25]}},
+            "childrens": {"CHECK": {"node_type": "action_node", "player": 1, "actions": ["CHECK"]},
+                          "BET 5": leaf}}
+    file_path = tmp_path / "tree.json"
+    file_path.write_text(json.dumps(tree))
+    summary = GameTreeProcessor(str(file_path)).tree_summary
+
+    assert summary["node_count"] == 3
+    assert summary["decision_points"] + summary["chance_nodes"] + summary["terminal_nodes"] == summary["node_count"]
+    assert summary["terminal_nodes"] == 1
+    # FOLD has no child node, nor does the inner CHECK
+    assert summary["terminal_actions"] == 2
+
+
+def test_stats_endpoint(client, session_id, processor):
+    stats = client.get(f"/api/stats/{session_id}").get_json()
+    assert stats["node_count"] == processor.tree_summary["node_count"]
+    assert "subtree" not in stats
+
+    stats = client.get(f"/api/stats/{session_id}?node=1").get_json()
+    assert stats["subtree"]["node_id"] == 1
+    assert stats["subtree"]["node_count"] == processor.stats.subtree(1)["node_count"]
+    assert client.get(f"/api/stats/{session_id}?node=100000").status_code == 404
+
+
+def test_summary_endpoint(client, session_id, processor):
+    summary = client.get(f"/api/summary/{session_id}?path=").get_json()
+    assert summary["node_id"] == 0
+    assert summary["street"] == "flop"
+    assert summary["subtree"]["node_count"] == 71
+    assert sum(summary["action_frequencies"].values()) == pytest.approx(100, abs=0.1)
+    assert summary["range_combos"] == 40.0
+
+
+def test_old_saved_summaries_are_recounted(processor, tmp_path):
+    file_path = str(tmp_path / "tree.gtree")
+    processor.save_session(file_path)
+    summary = dict(processor.tree_summary)
+    del summary["terminal_actions"]
+    reopened = GameTreeProcessor.open_session(file_path)
+    reopened._setup(reopened.store, reopened.session_id, reopened.stats, summary)
+    assert reopened.tree_summary == processor.tree_summary
@@ -0,0 +1,148 @@
+import heapq
+import itertools
+
+import numpy as np
+
+from combos import COMBO_COUNT
+from node_store import EDGE_CARD, STRATEGY_ACTIONS, STRATEGY_HANDS
+from tree_stats import depth_levels
+
+
+# Nodes whose strategies are stacked into one array at a time
+DIFF_CHUNK_SIZE = 256
+
+# Tie-breaker so heap entries never compare their payloads
+_sequence = itertools.count()
+
+
+def align_trees(store_a, store_b):
+    """
+    Map every node of tree a to the node of tree b reached by the same actions
+    and dealt cards from the root (as get_node_by_action_sequence follows them),
+    or -1. Works a depth level at a time with vectorized edge lookups.
+    """
+    # Translate a's interned labels into b's ids
+    label_map = np.array([store_b.strings.lookup(s) for s in store_a.strings.strings] or [-1], dtype=np.int64)
+
+    mapping = np.full(store_a.node_count, -1, dtype=np.int32)
+    if store_a.node_count and store_b.node_count:
+        mapping[0] = 0
+
+    incoming = store_a.incoming_edges()
+    for level in depth_levels(store_a.depth)[1:]:
+        parents = mapping[store_a.parent[level]]
+        edges = incoming[level]
+        labels = label_map[store_a.edge_label[edges]]
+        valid = (parents >= 0) & (labels >= 0)
+        cards = store_a.edge_kind[edges[valid]] == EDGE_CARD
+        mapping[level[valid]] = store_b.children_of(parents[valid], labels[valid], cards)
+    return mapping
+
+
+def _strategy_labels(store, node_id):
+    index = store.strategy_index[node_id]
+    start = store.strategy_action_start[index]
+    return tuple(store.strings[label] for label in store.strategy_actions[start:start + store.strategy_action_count[index]])
+
+
+def _comparable(store, node_ids):
+    """Mask of nodes with an action list and per-combo probabilities"""
+    index = store.strategy_index[node_ids]
+    flags = np.where(index >= 0, store.strategy_flags[np.maximum(index, 0)], 0)
+    return (flags & STRATEGY_ACTIONS).astype(bool) & (flags & STRATEGY_HANDS).astype(bool)
+
+
+def _stack(store, node_ids, columns, width):
+    """Stack the strategies of nodes into (nodes, 1326, width), placing each action at its union column"""
+    probabilities = np.zeros((len(node_ids), COMBO_COUNT, width), dtype=np.float32)
+    for i, node_id in enumerate(node_ids):
+        block = store.strategy_blocks[store.strategy_index[node_id]]
+        probabilities[i][:, columns[:block.shape[1]]] = block[:, :len(columns)]
+    bits = store.strategy_mask_bits[store.strategy_index[node_ids]]
+    masks = np.unpackbits(bits, axis=1, count=COMBO_COUNT).view(bool)
+    return probabilities, masks
+
+
+def diff_trees(store_a, store_b, span_a, span_b, top_k=20):
+    """
+    Compare the strategies of the nodes aligned between two trees, within the
+    pre-order id ranges span_a and span_b (a subtree, or the whole tree). The per-combo
+    divergence is the total variation distance between the two action
+    distributions over the union of their action labels (an action missing on one
+    side counts as never taken). Nodes sharing the same action labels are stacked
+    and compared in one array operation. Returns the totals, the top_k most
+    divergent nodes as (divergence, max combo divergence, common combos, a id, b id, actions)
+    and the top_k most divergent combos as (divergence, a id, b id, combo, actions, probs a, probs b).
+    """
+    mapping = align_trees(store_a, store_b)
+    node_ids = np.arange(*span_a, dtype=np.int32)
+    matched = node_ids[mapping[node_ids] >= 0]
+    compared = matched[_comparable(store_a, matched) & _comparable(store_b, mapping[matched])]
+
+    # Group nodes by their action labels on each side so each group shares one column layout
+    groups = {}
+    for node_id in compared:
+        key = (_strategy_labels(store_a, node_id), _strategy_labels(store_b, mapping[node_id]))
+        groups.setdefault(key, []).append(node_id)
+
+    top_nodes, top_combos = [], []
+    divergence_sum = combo_count = 0.0
+    for (labels_a, labels_b), members in groups.items():
+        actions = list(labels_a) + [label for label in labels_b if label not in labels_a]
+        columns_a = np.array([actions.index(label) for label in labels_a], dtype=np.int64)
+        columns_b = np.array([actions.index(label) for label in labels_b], dtype=np.int64)
+
+        members = np.array(members, dtype=np.int32)
+        for start in range(0, len(members), DIFF_CHUNK_SIZE):
+            ids_a = members[start:start + DIFF_CHUNK_SIZE]
+            ids_b = mapping[ids_a]
+            probabilities_a, masks_a = _stack(store_a, ids_a, columns_a, len(actions))
+            probabilities_b, masks_b = _stack(store_b, ids_b, columns_b, len(actions))
+
+            common = masks_a & masks_b
+            distance = 0.5 * np.abs(probabilities_a - probabilities_b).sum(axis=2) * common
+            counts = common.sum(axis=1)
+            sums = distance.sum(axis=1, dtype=np.float64)
+            divergence_sum += sums.sum()
+            combo_count += counts.sum()
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = np.where(counts > 0, sums / counts, 0)
+            maxima = distance.max(axis=1)
+            for i in np.flatnonzero(counts > 0):
+                item = (float(means[i]), float(maxima[i]), int(counts[i]), int(ids_a[i]), int(ids_b[i]), actions)
+                _push(top_nodes, item, top_k)
+
+            # Only the top_k largest of this chunk can enter the overall top_k
+            flat = distance.ravel()
+            best = np.argpartition(flat, -min(top_k, len(flat)))[-top_k:] if len(flat) else []
+            for position in best:
+                if flat[position] <= 0:
+                    continue
+                i, combo = divmod(int(position), COMBO_COUNT)
+                item = (float(flat[position]), int(ids_a[i]), int(ids_b[i]), combo, actions,
+                        probabilities_a[i, combo], probabilities_b[i, combo])
+                _push(top_combos, item, top_k)
+
+    return {
+        "aligned": int(len(matched)),
+        "compared": int(len(compared)),
+        "only_in_a": int(len(node_ids) - len(matched)),
+        "only_in_b": int(span_b[1] - span_b[0] - len(matched)),
+        "mean_divergence": divergence_sum / combo_count if combo_count else 0.0,
+        "nodes": _largest(top_nodes),
+        "combos": _largest(top_combos),
+    }
+
+
+def _push(heap, item, size):
+    """Keep the size largest items (by their first field) in a min-heap"""
+    entry = (item[0], next(_sequence), item)
+    if len(heap) < size:
+        heapq.heappush(heap, entry)
+    elif entry[0] > heap[0][0]:
+        heapq.heapreplace(heap, entry)
+
+
+def _largest(heap):
+    return [entry[2] for entry in sorted(heap, key=lambda entry: entry[0], reverse=True)]
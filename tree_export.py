@@ -0,0 +1,340 @@
+"""
+Export every decision node's strategy as a long table with one row per
+(node, combo, action): node_id, history, street, player, combo, action, frequency.
+
+    python tree_export.py solve.json.gz strategies.parquet
+    python tree_export.py session.gtree strategies.npz --batch-rows 2000000
+
+The tree is walked in node order in batches of about batch_rows rows, so
+memory stays bounded by the batch size however large the tree is. Each batch
+becomes one Parquet row group; NPZ and CSV output is written as it is produced.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import zipfile
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from combos import COMBO_COUNT, COMBO_NAMES
+from node_store import STRATEGY_ACTIONS, STRATEGY_HANDS
+from tree_stats import STREETS
+
+
+EXPORT_COLUMNS = ("node_id", "history", "street", "player", "combo", "action", "frequency")
+
+# Rows per batch (one Parquet row group)
+DEFAULT_BATCH_ROWS = 1 << 20
+
+# Strategies whose masks are unpacked at once when counting rows
+_PLAN_CHUNK = 65536
+
+
+class _Sink:
+    """Write-only file object collecting output until it is taken"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+class StrategyExport:
+    """
+    Long-table view of every strategy in a tree, produced batch by batch.
+    Only nodes with both an action list and per-combo probabilities are
+    exported; each reports one row per action for every combo it lists.
+    """
+
+    def __init__(self, store, stats, batch_rows=DEFAULT_BATCH_ROWS):
+        self.store = store
+        self.stats = stats
+
+        flags = store.strategy_flags
+        usable = (flags & STRATEGY_ACTIONS).astype(bool) & (flags & STRATEGY_HANDS).astype(bool)
+        widths = np.minimum(store.strategy_action_count, store.strategy_sizes() // COMBO_COUNT)
+        nodes = np.flatnonzero(store.strategy_index >= 0)
+        strategy_ids = store.strategy_index[nodes]
+        keep = usable[strategy_ids] & (widths[strategy_ids] > 0)
+
+        self.nodes = nodes[keep].astype(np.int32)
+        self.strategy_ids = strategy_ids[keep].astype(np.int64)
+        self.widths = widths[self.strategy_ids].astype(np.int64)
+        hands = np.zeros(len(self.nodes), dtype=np.int64)
+        for start in range(0, len(self.nodes), _PLAN_CHUNK):
+            bits = store.strategy_mask_bits[self.strategy_ids[start:start + _PLAN_CHUNK]]
+            hands[start:start + _PLAN_CHUNK] = np.unpackbits(bits, axis=1, count=COMBO_COUNT).sum(axis=1)
+        self.row_counts = hands * self.widths
+        self.row_count = int(self.row_counts.sum())
+
+        # Action labels offered by any strategy; the action column indexes this table
+        labels, self.action_codes = np.unique(store.strategy_actions, return_inverse=True)
+        self.action_codes = self.action_codes.astype(np.int32)
+        self.actions = [store.strings[int(label)] for label in labels]
+
+        # Split into runs of whole nodes of about batch_rows rows each
+        ends = np.cumsum(self.row_counts)
+        cuts = np.searchsorted(ends, np.arange(batch_rows, self.row_count, batch_rows), side="right")
+        self.bounds = np.unique(np.concatenate(([0], cuts, [len(self.nodes)]))).tolist()
+
+    def batches(self, columns=EXPORT_COLUMNS):
+        """
+        Yield the requested columns batch by batch. Text columns come as codes:
+        combo indexes COMBO_NAMES, action indexes self.actions, street indexes
+        STREETS and history indexes the batch's "histories" list.
+        """
+        for start, end in zip(self.bounds[:-1], self.bounds[1:]):
+            yield self._batch(start, end, columns)
+
+    def _batch(self, start, end, columns):
+        store = self.store
+        nodes = self.nodes[start:end]
+        strategy_ids = self.strategy_ids[start:end]
+        widths = self.widths[start:end]
+        row_counts = self.row_counts[start:end]
+        batch = {}
+
+        if "node_id" in columns:
+            batch["node_id"] = np.repeat(nodes, row_counts)
+        if "street" in columns:
+            batch["street"] = np.repeat(self.stats.street[nodes].astype(np.int8), row_counts)
+        if "player" in columns:
+            batch["player"] = np.repeat(store.player[nodes].astype(np.int8), row_counts)
+        if "history" in columns:
+            batch["history"] = np.repeat(np.arange(len(nodes), dtype=np.int32), row_counts)
+            batch["histories"] = self.histories(nodes)
+        if not {"combo", "action", "frequency"} & set(columns):
+            return batch
+
+        # One (strategy, combo) pair per listed combo, then one row per action of the pair
+        masks = np.unpackbits(store.strategy_mask_bits[strategy_ids], axis=1, count=COMBO_COUNT).view(bool)
+        pair_strategy, pair_combo = np.nonzero(masks)
+        pair_width = widths[pair_strategy]
+        row_pair = np.repeat(np.arange(len(pair_combo)), pair_width)
+        pair_first_row = np.cumsum(pair_width) - pair_width
+        within = np.arange(len(row_pair)) - pair_first_row[row_pair]
+        row_strategy = strategy_ids[pair_strategy][row_pair]
+
+        if "combo" in columns:
+            batch["combo"] = pair_combo[row_pair].astype(np.int16)
+        if "action" in columns:
+            batch["action"] = self.action_codes[store.strategy_action_start[row_strategy] + within]
+        if "frequency" in columns:
+            batch["frequency"] = self._frequencies(strategy_ids, widths, masks, row_strategy,
+                                                  pair_combo[row_pair], within)
+        return batch
+
+    def _frequencies(self, strategy_ids, widths, masks, row_strategy, row_combo, within):
+        blocks = self.store.strategy_blocks
+        if hasattr(blocks, "offsets"):
+            # Memory-mapped blocks: gather every row straight from the flat buffer
+            full_width = (blocks.offsets[row_strategy + 1] - blocks.offsets[row_strategy]) // COMBO_COUNT
+            return blocks.data[blocks.offsets[row_strategy] + row_combo * full_width + within].astype(np.float32)
+
+        parts = [blocks[int(s)][mask, :int(width)].ravel() for s, mask, width in zip(strategy_ids, masks, widths)]
+        return np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, dtype=np.float32)
+
+    def histories(self, nodes):
+        """Return the labels leading from the root to each node, joined by commas"""
+        store = self.store
+        incoming = store.incoming_edges()
+        # Histories of the ancestors met so far; batches cover nearby nodes, so most are shared
+        known = {0: ""}
+        result = []
+        for node_id in nodes.tolist():
+            chain = []
+            while node_id not in known:
+                chain.append(node_id)
+                node_id = int(store.parent[node_id])
+            history = known[node_id]
+            for child in reversed(chain):
+                label = store.strings[store.edge_label[incoming[child]]]
+                history = f"{history},{label}" if history else label
+                known[child] = history
+            result.append(history)
+        return result
+
+
+def iter_csv(export):
+    """Yield the export as CSV text, encoded, one batch at a time"""
+    combos = np.array(COMBO_NAMES, dtype=object)
+    actions = np.array(export.actions, dtype=object)
+    streets = np.array(STREETS, dtype=object)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in export.batches():
+        histories = np.array(batch["histories"], dtype=object)
+        writer.writerows(zip(batch["node_id"].tolist(), histories[batch["history"]], streets[batch["street"]],
+                             batch["player"].tolist(), combos[batch["combo"]], actions[batch["action"]],
+                             np.round(batch["frequency"].astype(np.float64), 6).tolist()))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_parquet(export):
+    """Yield the export as a Parquet file with one row group per batch; text columns are dictionary encoded"""
+    if pa is None:
+        raise ValueError("Parquet export requires the pyarrow package")
+
+    schema = pa.schema([
+        ("node_id", pa.int32()),
+        ("history", pa.dictionary(pa.int32(), pa.string())),
+        ("street", pa.dictionary(pa.int8(), pa.string())),
+        ("player", pa.int8()),
+        ("combo", pa.dictionary(pa.int16(), pa.string())),
+        ("action", pa.dictionary(pa.int32(), pa.string())),
+        ("frequency", pa.float32()),
+    ])
+    combos, actions, streets = pa.array(COMBO_NAMES), pa.array(export.actions), pa.array(STREETS)
+
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        yield sink.take()
+        for batch in export.batches():
+            table = pa.Table.from_arrays([
+                pa.array(batch["node_id"]),
+                pa.DictionaryArray.from_arrays(batch["history"], pa.array(batch["histories"])),
+                pa.DictionaryArray.from_arrays(batch["street"], streets),
+                pa.array(batch["player"]),
+                pa.DictionaryArray.from_arrays(batch["combo"], combos),
+                pa.DictionaryArray.from_arrays(batch["action"], actions),
+                pa.array(batch["frequency"]),
+            ], schema=schema)
+            writer.write_table(table)
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def _npy_header(dtype, length):
+    header = io.BytesIO()
+    np.lib.format.write_array_header_2_0(header, {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                                                  "fortran_order": False, "shape": (length,)})
+    return header.getvalue()
+
+
+def iter_npz(export):
+    """
+    Yield the export as an NPZ archive, written column by column as each is
+    produced. Row columns: node_id, street, player, combo, action, frequency;
+    text columns index the streets, combos and actions tables. Histories are
+    per node: history[i] belongs to nodes[i].
+    """
+    sink = _Sink()
+    archive = zipfile.ZipFile(sink, "w")
+
+    def member(name, dtype, length, chunks):
+        with archive.open(f"{name}.npy", "w", force_zip64=True) as f:
+            f.write(_npy_header(dtype, length))
+            for chunk in chunks:
+                f.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+                yield sink.take()
+        yield sink.take()
+
+    def table(name, values):
+        values = np.array(values, dtype=str)
+        return member(name, values.dtype, len(values), [values])
+
+    yield from table("streets", STREETS)
+    yield from table("combos", COMBO_NAMES)
+    yield from table("actions", export.actions)
+    yield from member("nodes", np.int32, len(export.nodes), [export.nodes])
+
+    # Fixed-width strings need the longest history first
+    width = max((max(map(len, batch["histories"]), default=0) for batch in export.batches(("history",))), default=0)
+    yield from member("history", f"<U{max(width, 1)}", len(export.nodes),
+                      (np.array(batch["histories"], dtype=f"<U{max(width, 1)}")
+                       for batch in export.batches(("history",))))
+
+    for name, dtype in (("node_id", np.int32), ("street", np.int8), ("player", np.int8),
+                        ("combo", np.int16), ("action", np.int32), ("frequency", np.float32)):
+        yield from member(name, dtype, export.row_count, (batch[name] for batch in export.batches((name,))))
+
+    archive.close()
+    yield sink.take()
+
+
+# Format -> (writer, file extension, mimetype)
+EXPORT_FORMATS = {
+    "parquet": (iter_parquet, "parquet", "application/vnd.apache.parquet"),
+    "npz": (iter_npz, "npz", "application/octet-stream"),
+    "csv": (iter_csv, "csv", "text/csv"),
+}
+
+
+def export_strategies(store, stats, export_format, batch_rows=DEFAULT_BATCH_ROWS):
+    """Return a generator of the bytes of a tree's strategies in export_format"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format} (expected one of {', '.join(EXPORT_FORMATS)})")
+    return EXPORT_FORMATS[export_format][0](StrategyExport(store, stats, batch_rows))
+
+
+def main():
+    from tree_processor import GameTreeProcessor
+
+    parser = argparse.ArgumentParser(description="Export every strategy of a solver tree as a long table")
+    parser.add_argument("input", help="solver JSON file (optionally gzip, xz or zstd compressed) or .gtree session file")
+    parser.add_argument("output", help="file to write")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS),
+                        help="output format; defaults to the output file's extension")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS, help="rows per batch and Parquet row group")
+    args = parser.parse_args()
+
+    export_format = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if export_format not in EXPORT_FORMATS:
+        parser.error(f"cannot tell the format of {args.output}; pass --format")
+
+    start = time.perf_counter()
+    if args.input.endswith(".gtree"):
+        processor = GameTreeProcessor.open_session(args.input)
+    else:
+        processor = GameTreeProcessor(args.input)
+    loaded = time.perf_counter()
+
+    export = StrategyExport(processor.store, processor.stats, args.batch_rows)
+    with open(args.output, "wb") as f:
+        for chunk in EXPORT_FORMATS[export_format][0](export):
+            f.write(chunk)
+    finished = time.perf_counter()
+    print(f"Exported {export.row_count} rows from {len(export.nodes)} nodes to {args.output} "
+          f"({os.path.getsize(args.output)} bytes) in {finished - loaded:.1f}s after {loaded - start:.1f}s loading",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,35 @@
-import json
+import base64
+import logging
+import os
+import threading
 import uuid
+from collections import OrderedDict
+
 import numpy as np
-from collections import defaultdict
+
+from combos import (CELL_COUNT, CELL_HANDS, CELL_TYPES, COMBO_CELLS, COMBO_COUNT, COMBO_NAMES, COMBO_OFFSUIT, COMBO_PAIR,
+                    COMBO_SUITED, COMBO_TYPES, MATRIX_RANKS, cell_averages, cell_combos, cell_weighted_averages,
+                    hand_cell)
+from compressed_input import open_input
+from json_stream import JsonStreamReader
+from metrics import timed
+from node_store import (NodeStoreBuilder, EDGE_ACTION, EDGE_CARD, FLAG_ACTIONS, FLAG_DEALCARDS, NO_CHILD,
+                        STRATEGY_ACTIONS, STRATEGY_HANDS)
+from payload_format import encode_hand_details, encode_hand_matrix
+from session_format import load_store, save_store
+from tree_diff import diff_trees
+from tree_export import DEFAULT_BATCH_ROWS, export_strategies
+from tree_query import QueryIndex, run_query
+from tree_stats import STREETS, TreeStats, compute_tree_stats, range_reach, summarize_tree
+
+
+logger = logging.getLogger(__name__)
+
+# Resolved paths remembered per processor
+NODE_CACHE_SIZE = 4096
+
+# Views that get_bundle can compute for a node
+BUNDLE_VIEWS = ("node", "strategy", "hand_matrix", "hand_matrix_packed", "ev_analysis", "summary")
 
 
 class GameTreeProcessor:
@@ -10,16 +38,75 @@ class GameTreeProcessor:
     Handles tree parsing, navigation, and data extraction.
     """
 
-    def __init__(self, file_path):
-        """Initialize with a game tree JSON file"""
-        with open(file_path, 'r') as f:
-            self.game_tree = json.load(f)
-
-        # Generate a unique session ID
-        self.session_id = str(uuid.uuid4())
-
-        # Memoization for performance
-        self.node_cache = {}
+    def __init__(self, file_path, progress_callback=None):
+        """Initialize with a game tree JSON file, optionally gzip, xz or zstd compressed, streamed in without loading it whole"""
+        with open(file_path, 'rb') as f:
+            self._parse(f, os.path.getsize(file_path), progress_callback)
+
+    @classmethod
+    def from_stream(cls, fp, total_size=None, progress_callback=None):
+        """Parse a game tree from a binary file object as it is read, such as an upload still arriving"""
+        processor = cls.__new__(cls)
+        processor._parse(fp, total_size, progress_callback)
+        return processor
+
+    def _parse(self, fp, total_size, progress_callback):
+        if progress_callback is None:
+            progress_callback = self._log_progress
+        # Compressed input is inflated as it is parsed; progress counts the bytes read from fp
+        text, counter = open_input(fp)
+        reader = JsonStreamReader(text, total_size=total_size,
+                                  progress_callback=lambda _, total: progress_callback(counter.bytes_read, total))
+        self._setup(NodeStoreBuilder().build(reader), str(uuid.uuid4()))
+
+    @classmethod
+    @timed("session_open")
+    def open_session(cls, file_path):
+        """Reopen a tree previously written by save_session, memory-mapping its arrays"""
+        store, metadata, extra = load_store(file_path)
+        processor = cls.__new__(cls)
+        processor._setup(store, metadata.get("session_id") or str(uuid.uuid4()), TreeStats.from_arrays(extra),
+                         metadata.get("tree_summary"))
+        return processor
+
+    def _setup(self, store, session_id, stats=None, summary=None):
+        self.store = store
+        self.session_id = session_id
+
+        # Subtree and range-weighted aggregates, computed once unless the session file had them
+        self.stats = stats if stats is not None else compute_tree_stats(store)
+
+        # Whole-tree counts, likewise computed once at ingest and saved with the session.
+        # Summaries saved before terminal actions were counted apart from terminal nodes are recounted.
+        self.tree_summary = (summary if summary is not None and "terminal_actions" in summary
+                             else summarize_tree(store, self.stats))
+
+        # Inverted indexes for tree-wide queries
+        self.query_index = QueryIndex(store, self.stats)
+
+        # Memoization for performance, least recently used first
+        self.node_cache = OrderedDict()
+        # Shared by request threads and the prefetch workers
+        self.node_cache_lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the tree, its aggregates and its indexes"""
+        return self.store.nbytes + self.stats.nbytes + self.query_index.nbytes
+
+    def save_session(self, file_path):
+        """Write the tree to a binary session file that open_session can map back in"""
+        save_store(self.store, file_path, metadata={"session_id": self.session_id, "tree_summary": self.tree_summary},
+                   extra_arrays=self.stats.arrays())
+
+    def _log_progress(self, bytes_read, total_size):
+        """Default progress reporter: log roughly every 10% of the input"""
+        if not total_size:
+            return
+        step = max(total_size // 10, 1)
+        if bytes_read // step != getattr(self, "_last_progress_step", -1):
+            self._last_progress_step = bytes_read // step
+            logger.info("Loaded %d of %d bytes (%.0f%%)", bytes_read, total_size, bytes_read * 100 / total_size)
 
     def get_session_id(self):
         """Return the session ID for this processor"""
@@ -27,34 +114,35 @@ class GameTreeProcessor:
 
     def get_game_info(self):
         """Extract and return basic game information"""
+        store = self.store
         info = {
             "game_type": "No Limit Hold'em",
             "position": "In Position" if self.get_player_at_root() == 0 else "Out of Position"
         }
 
         # Try to extract more info
-        if "player" in self.game_tree:
-            info["starting_player"] = self.game_tree["player"]
+        if store.player[0] >= 0:
+            info["starting_player"] = int(store.player[0])
 
-        if "pot" in self.game_tree:
-            info["starting_pot"] = round(self.game_tree["pot"], 2)
-        elif "potSize" in self.game_tree:
-            info["starting_pot"] = round(self.game_tree["potSize"], 2)
+        if not np.isnan(store.pot[0]):
+            info["starting_pot"] = round(float(store.pot[0]), 2)
 
-        if "board" in self.game_tree:
-            info["board"] = self.format_board(self.game_tree["board"])
+        if store.board[0] >= 0:
+            info["board"] = self.format_board(store.string(store.board[0]))
         else:
             info["board"] = "None (Preflop)"
 
-        # Count decision points
+        # Counts gathered at ingest
         info["decision_points"] = self.count_decision_points()
+        info["node_count"] = self.tree_summary["node_count"]
+        info["max_depth"] = self.tree_summary["max_depth"]
 
         return info
 
     def get_player_at_root(self):
         """Determine which player is active at the root node"""
-        if "player" in self.game_tree:
-            return self.game_tree["player"]
+        if self.store.player[0] >= 0:
+            return int(self.store.player[0])
         return 0  # Default to player 0
 
     def format_board(self, board):
@@ -77,465 +165,607 @@ class GameTreeProcessor:
         return symbols.get(suit, suit)
 
     def count_decision_points(self):
-        """Estimate the number of decision points in the tree"""
-        def count_nodes(node, visited=None):
-            if visited is None:
-                visited = set()
-
-            if not isinstance(node, dict):
-                return 0
-
-            node_id = id(node)
-            if node_id in visited:
-                return 0
-
-            visited.add(node_id)
-            count = 1 if "actions" in node else 0
-
-            # Count children from actions
-            if "childrens" in node and "actions" in node:
-                for action in node["actions"]:
-                    if action in node["childrens"]:
-                        count += count_nodes(node["childrens"][action], visited)
-
-            # Count children from dealcards
-            if "dealcards" in node:
-                for card, child in node["dealcards"].items():
-                    count += count_nodes(child, visited)
+        """Count the nodes that offer actions"""
+        return self.tree_summary["decision_points"]
+
+    def get_tree_stats(self, path="", node_id=None):
+        """Return the whole-tree counts gathered at ingest, plus the subtree of a node if one is given"""
+        stats = dict(self.tree_summary)
+        if path or node_id is not None:
+            resolved = self.resolve_node(path, node_id)
+            if resolved is None:
+                raise ValueError(f"Node not found: {node_id}" if node_id is not None else f"Node not found at path: {path}")
+            stats["subtree"] = dict(self.stats.subtree(resolved), node_id=resolved)
+        return stats
+
+    def _walk(self, steps):
+        """Follow (label, is_card) edges from the root, returning the node id reached or None"""
+        node_id = 0
+        for label, card in steps:
+            node_id = self.store.child(node_id, label, card)
+            if node_id is None:
+                return None
+        return node_id
 
-            return count
+    def get_node_by_action_sequence(self, actions):
+        """Find a node id by following a sequence of actions from the root"""
+        return self._walk((action, False) for action in actions)
+
+    @timed("subtree")
+    def get_subtree(self, path, depth=2, cursor=0, limit=50, node_id=None):
+        """
+        Return the tree item at path (or node_id) with only `depth` levels of children below it.
+        Children are paginated: each level holds at most `limit` items, starting at
+        `cursor` for the requested level, and a `next_cursor` is returned when more remain.
+        """
+        if node_id is not None:
+            if self.resolve_node(node_id=node_id) is None:
+                raise ValueError(f"Node not found: {node_id}")
+            path = self.node_path(node_id)
+        else:
+            node_id = self.find_node_by_path(path)
 
-        return count_nodes(self.game_tree)
+        if node_id is not None:
+            item = self._tree_item(node_id, path)
+            return self._expand_tree_item(item, node_id, depth, cursor, limit)
 
-    def get_node_by_action_sequence(self, actions):
-        """Find a node by following a sequence of actions from the root"""
-        if not actions:
-            return self.game_tree
-
-        node = self.game_tree
-        for action in actions:
-            if "childrens" in node and action in node["childrens"]:
-                node = node["childrens"][action]
-            elif "actions" in node and action in node["actions"]:
-                # If we have the action but not the child node, try to guess the structure
-                for key in node:
-                    if isinstance(node[key], dict) and not key.startswith("_"):
-                        if "actions" in node[key] and action in node[key]["actions"]:
-                            node = node[key]
-                            break
+        parts = [p for p in path.split('/') if p]
+        if parts and parts[-1] == "dealcards" and self.is_container_path(path):
+            owner_id = self.find_node_by_path("/".join(parts[:-1]))
+            item = self._cards_item(owner_id, path)
+            return self._expand_tree_item(item, owner_id, depth, cursor, limit)
+
+        raise ValueError(f"Node not found at path: {path}")
+
+    def _tree_item(self, node_id, path, name=None, item_type=None):
+        """Describe a single node for the tree view"""
+        store = self.store
+        item = {"name": name, "path": path, "node_id": node_id}
+        if item_type:
+            item["type"] = item_type
+        if item_type == "card":
+            item["name"] = f"{name[0]}{self.get_suit_symbol(name[1])}" if len(name) == 2 else name
+            item["suit"] = name[1] if len(name) == 2 else None
+
+        if store.node_type[node_id] >= 0:
+            item["node_type"] = store.string(store.node_type[node_id])
+        if store.player[node_id] >= 0:
+            item["player"] = int(store.player[node_id])
+
+        item["has_children"] = bool(store.flags[node_id] & FLAG_DEALCARDS) or any(
+            store.edge_kind[e] != EDGE_CARD and store.edge_child[e] != NO_CHILD for e in store.edges(node_id))
+        return item
+
+    def _cards_item(self, node_id, path):
+        """Describe the group of dealt cards below a chance node"""
+        return {"name": "Cards", "path": path, "type": "cards", "has_children": True}
+
+    def _tree_children(self, item, node_id):
+        """List (kind, node id, path, label) entries for the children of a tree item"""
+        store = self.store
+        path = item["path"]
+
+        if item.get("type") == "cards":
+            return [("card", child_id, f"{path}/{card}", card) for card, child_id in store.dealcards(node_id)]
+
+        children = []
+        for e in store.edges(node_id):
+            if store.edge_kind[e] == EDGE_ACTION:
+                action = store.strings[store.edge_label[e]]
+                action_path = f"{path}/childrens/{action}" if path else f"/childrens/{action}"
+                children.append(("action", int(store.edge_child[e]), action_path, action))
+
+        if store.flags[node_id] & FLAG_DEALCARDS:
+            children.append(("cards", node_id, f"{path}/dealcards", None))
+        return children
+
+    def _expand_tree_item(self, item, node_id, depth, cursor=0, limit=50):
+        """Attach up to `depth` levels of paginated children to a tree item"""
+        if depth <= 0 or not item["has_children"]:
+            return item
+
+        children = self._tree_children(item, node_id)
+        item["children"] = []
+        for kind, child_id, path, label in children[cursor:cursor + limit]:
+            if kind == "cards":
+                child = self._cards_item(child_id, path)
+            elif child_id == NO_CHILD:
+                child = {"name": label, "path": path, "type": kind, "has_children": False}
             else:
-                return None
+                child = self._tree_item(child_id, path, label, kind)
+            item["children"].append(self._expand_tree_item(child, child_id, depth - 1, 0, limit))
 
-        return node
-
-    def get_tree_structure(self):
-        """Generate a simplified tree structure for the frontend"""
-        def build_tree(node, path="", depth=0, max_depth=15):
-            # Prevent too deep recursion
-            if depth > max_depth:
-                return {"name": "... (max depth reached)", "path": path}
-
-            result = {}
-
-            # Node info
-            if "node_type" in node:
-                result["node_type"] = node["node_type"]
-            if "player" in node:
-                result["player"] = node["player"]
-
-            # Add path for navigation
-            result["path"] = path
-
-            # Children (actions)
-            children = []
-
-            if "actions" in node:
-                for action in node["actions"]:
-                    action_path = f"{path}/childrens/{action}" if path else f"/childrens/{action}"
-                    child = {
-                        "name": action,
-                        "path": action_path,
-                        "type": "action"
-                    }
-
-                    # Only recurse if this action has children and we're not too deep
-                    if "childrens" in node and action in node["childrens"] and depth < max_depth - 1:
-                        child["children"] = [build_tree(node["childrens"][action], action_path, depth+1, max_depth)]
-
-                    children.append(child)
-
-            # Children (dealcards)
-            if "dealcards" in node:
-                cards_path = f"{path}/dealcards"
-                cards_node = {
-                    "name": "Cards",
-                    "path": cards_path,
-                    "type": "cards",
-                    "children": []
-                }
-
-                # Only add a few cards as examples if there are many
-                card_items = list(node["dealcards"].items())
-                if len(card_items) > 10:
-                    # Just show a few examples
-                    card_items = card_items[:10]
-                    has_more = True
-                else:
-                    has_more = False
-
-                for card, card_node in card_items:
-                    card_path = f"{cards_path}/{card}"
-                    formatted_card = f"{card[0]}{self.get_suit_symbol(card[1])}" if len(card) == 2 else card
-                    card_child = {
-                        "name": formatted_card,
-                        "path": card_path,
-                        "type": "card",
-                        "suit": card[1] if len(card) == 2 else None
-                    }
-
-                    # Only recurse if we're not too deep
-                    if depth < max_depth - 1:
-                        card_child["children"] = [build_tree(card_node, card_path, depth+1, max_depth)]
-
-                    cards_node["children"].append(card_child)
-
-                if has_more:
-                    cards_node["children"].append({
-                        "name": "... more cards",
-                        "path": cards_path,
-                        "type": "more_cards"
-                    })
-
-                children.append(cards_node)
-
-            result["children"] = children
-            return result
-
-        return build_tree(self.game_tree)
+        item["total_children"] = len(children)
+        item["next_cursor"] = cursor + limit if cursor + limit < len(children) else None
+        return item
 
+    @timed("resolve")
     def find_node_by_path(self, path):
-        """Find a node in the game tree by its path - improved version"""
+        """Find a node id in the game tree by its path"""
         # Check cache first
-        if path in self.node_cache:
-            return self.node_cache[path]
-
-        if not path or path == '/':
-            return self.game_tree
+        with self.node_cache_lock:
+            node_id = self.node_cache.get(path)
+            if node_id is not None:
+                self.node_cache.move_to_end(path)
+                return node_id
 
         parts = [p for p in path.split('/') if p]
-        node = self.game_tree
-
-        i = 0
-        while i < len(parts):
-            part = parts[i]
-
-            if part == "childrens" and i+1 < len(parts):
-                # Next part is the action
-                action = parts[i+1]
-                if "childrens" in node and action in node["childrens"]:
-                    node = node["childrens"][action]
-                    i += 2  # Skip both "childrens" and the action name
-                else:
-                    # Try to navigate using actions directly if childrens doesn't exist
-                    if "actions" in node and action in node["actions"]:
-                        if isinstance(node["actions"], list) and action in node["actions"]:
-                            # Try to find the action in a different structure
-                            for child_key in node:
-                                if isinstance(node[child_key], dict) and child_key != "childrens":
-                                    child = node[child_key]
-                                    if "node_type" in child and child.get("actions", []) == action:
-                                        node = child
-                                        i += 2
-                                        break
-                        i += 2  # Skip anyway to try to continue
-                    else:
-                        return None
-            elif part == "dealcards" and i+1 < len(parts):
-                # Next part is the card
-                card = parts[i+1]
-                if "dealcards" in node and card in node["dealcards"]:
-                    node = node["dealcards"][card]
-                    i += 2  # Skip both "dealcards" and the card name
-                else:
-                    # Try alternate paths
-                    if "cards" in node and card in node["cards"]:
-                        node = node["cards"][card]
-                        i += 2
-                    else:
-                        return None
-            elif part in node:
-                node = node[part]
-                i += 1
-            else:
-                # Special case: sometimes the path structure is flattened
-                potential_match = False
-                for key in node:
-                    if isinstance(node[key], dict) and "node_type" in node[key]:
-                        # Check if this could be our target
-                        if key == part or (key == "childrens" and part in node[key]):
-                            node = node[key] if key == part else node[key][part]
-                            potential_match = True
-                            i += 1
-                            break
-
-                if not potential_match:
-                    return None
+        if len(parts) % 2 or any(c not in ("childrens", "dealcards", "cards") for c in parts[::2]):
+            return None
+
+        node_id = self._walk((label, container != "childrens") for container, label in zip(parts[::2], parts[1::2]))
+        if node_id is None:
+            return None
 
         # Store in cache
-        self.node_cache[path] = node
-        return node
+        with self.node_cache_lock:
+            self.node_cache[path] = node_id
+            if len(self.node_cache) > NODE_CACHE_SIZE:
+                self.node_cache.popitem(last=False)
+        return node_id
+
+    def resolve_node(self, path="", node_id=None):
+        """Return the node id given directly, or the one found at path; None if neither exists"""
+        if node_id is None:
+            return self.find_node_by_path(path)
+        if 0 <= node_id < self.store.node_count:
+            return int(node_id)
+        return None
+
+    def node_path(self, node_id):
+        """Rebuild the path of a node by walking up to the root"""
+        store = self.store
+        parts = []
+        while node_id > 0:
+            e = store.incoming_edge(node_id)
+            container = "dealcards" if store.edge_kind[e] == EDGE_CARD else "childrens"
+            parts.append(f"/{container}/{store.strings[store.edge_label[e]]}")
+            node_id = int(store.parent[node_id])
+        return "".join(reversed(parts))
+
+    def is_container_path(self, path):
+        """Check whether a path points at a childrens/dealcards container rather than a node"""
+        parts = [p for p in path.split('/') if p]
+        return (len(parts) % 2 == 1 and parts[-1] in ("childrens", "dealcards")
+                and self.find_node_by_path("/".join(parts[:-1])) is not None)
 
-    def get_node_info(self, path):
+    def get_node_info(self, path, node_id=None):
         """Get detailed information about a node"""
-        node = self.find_node_by_path(path)
-        if not node:
+        if node_id is not None:
+            if self.resolve_node(node_id=node_id) is None:
+                raise ValueError(f"Node not found: {node_id}")
+        else:
+            node_id = self.find_node_by_path(path)
+
+        if node_id is None:
+            if self.is_container_path(path):
+                # The container itself is not a node; it has nothing to show
+                return {"has_strategy": False, "path": path}
             raise ValueError(f"Node not found at path: {path}")
 
+        return self.node_info(node_id, path or self.node_path(node_id))
+
+    @timed("node_info")
+    def node_info(self, node_id, path=""):
+        """Get detailed information about a node by id"""
+        store = self.store
         info = {}
 
         # Basic node info
-        if "node_type" in node:
-            info["node_type"] = node["node_type"]
+        if store.node_type[node_id] >= 0:
+            info["node_type"] = store.string(store.node_type[node_id])
 
-        if "player" in node:
-            info["player"] = node["player"]
+        if store.player[node_id] >= 0:
+            info["player"] = int(store.player[node_id])
 
-        if "board" in node:
-            info["board"] = self.format_board(node["board"])
+        if store.board[node_id] >= 0:
+            info["board"] = self.format_board(store.string(store.board[node_id]))
 
-        if "pot" in node:
-            info["pot"] = round(node["pot"], 2)
-        elif "potSize" in node:
-            info["pot"] = round(node["potSize"], 2)
+        if not np.isnan(store.pot[node_id]):
+            info["pot"] = round(float(store.pot[node_id]), 2)
 
-        if "deal_number" in node:
-            info["deal_number"] = node["deal_number"]
+        if store.deal_number[node_id] >= 0:
+            info["deal_number"] = int(store.deal_number[node_id])
 
         # Available actions
-        if "actions" in node:
-            info["actions"] = node["actions"]
+        if store.flags[node_id] & FLAG_ACTIONS:
+            info["actions"] = store.actions(node_id)
 
         # Dealcards info
-        if "dealcards" in node:
-            info["dealcards_count"] = len(node["dealcards"])
+        if store.flags[node_id] & FLAG_DEALCARDS:
+            cards = [card for card, _ in store.dealcards(node_id)]
+            info["dealcards_count"] = len(cards)
 
             # Just include the card keys, not all the children
-            info["dealcards"] = list(node["dealcards"].keys())
+            info["dealcards"] = cards
 
         # Has strategy?
-        info["has_strategy"] = "strategy" in node
+        info["has_strategy"] = bool(store.strategy_index[node_id] >= 0)
+
+        # Precomputed subtree stats
+        info["street"] = STREETS[self.stats.street[node_id]]
+        info["subtree"] = self.stats.subtree(node_id)
 
         # Add path for reference
         info["path"] = path
 
         return info
 
-    def get_strategy_info(self, path):
+    def _find_strategy(self, path, node_id=None):
+        """Return the Strategy of the node at path (or node_id), or None"""
+        node_id = self.resolve_node(path, node_id)
+        if node_id is None:
+            return None
+        return self.store.strategy(node_id)
+
+    def get_strategy_info(self, path, node_id=None):
         """Get strategy information for a node"""
-        node = self.find_node_by_path(path)
-        if not node:
+        node_id = self.resolve_node(path, node_id)
+        if node_id is None:
             raise ValueError(f"Node not found at path: {path}")
 
-        if "strategy" not in node:
+        return self._strategy_info(node_id, self.store.strategy(node_id))
+
+    @timed("strategy")
+    def _strategy_info(self, node_id, strategy):
+        """Summarize a node's strategy: action frequencies, hand composition and board"""
+        store = self.store
+        if strategy is None:
             return {"has_strategy": False}
 
-        strategy = node["strategy"]
+        board = store.string(store.board[node_id])
 
         # Basic strategy info
         result = {
             "has_strategy": True,
-            "node_type": node.get("node_type", "unknown"),
-            "player": node.get("player", "unknown"),
-            "board": self.format_board(node.get("board", ""))
+            "node_type": store.string(store.node_type[node_id]) or "unknown",
+            "player": int(store.player[node_id]) if store.player[node_id] >= 0 else "unknown",
+            "board": self.format_board(board or "")
         }
 
-        if "actions" not in strategy:
+        if strategy.actions is None:
             return result
 
         # Add actions
-        result["actions"] = strategy["actions"]
+        result["actions"] = strategy.actions
 
         # Add aggregated strategy stats if available
-        if "strategy" in strategy:
-            hand_strategies = strategy["strategy"]
-
-            # Calculate action frequencies
-            action_totals = defaultdict(float)
-            action_counts = defaultdict(int)
-
-            for _, probs in hand_strategies.items():
-                for i, prob in enumerate(probs):
-                    if i < len(strategy["actions"]):
-                        action = strategy["actions"][i]
-                        action_totals[action] += float(prob)
-                        action_counts[action] += 1
-
-            action_frequencies = {}
-            for action in strategy["actions"]:
-                if action_counts[action] > 0:
-                    action_frequencies[action] = round(action_totals[action] / action_counts[action] * 100, 2)
-                else:
-                    action_frequencies[action] = 0
-
-            result["action_frequencies"] = action_frequencies
+        if strategy.probabilities is not None:
+            mask = strategy.mask
+            valid_count = int(np.count_nonzero(mask))
+
+            # Action frequencies weighted by the combos that reach the node, precomputed at load
+            index = store.strategy_index[node_id]
+            if valid_count:
+                frequencies = [round(float(f) * 100, 2) for f in self.stats.frequencies(store, index)]
+            else:
+                frequencies = [0] * len(strategy.actions)
+            result["action_frequencies"] = dict(zip(strategy.actions, frequencies))
+            result["range_combos"] = round(float(self.stats.reach_combos[index]), 1)
 
             # Count hand types
-            pairs_count = 0
-            suited_count = 0
-            offsuit_count = 0
-
-            for hand_key in hand_strategies.keys():
-                if len(hand_key) == 4:
-                    rank1, suit1, rank2, suit2 = hand_key[0], hand_key[1], hand_key[2], hand_key[3]
-                    if rank1 == rank2:
-                        pairs_count += 1
-                    elif suit1 == suit2:
-                        suited_count += 1
-                    else:
-                        offsuit_count += 1
-
-            total_hands = pairs_count + suited_count + offsuit_count
+            type_counts = np.bincount(COMBO_TYPES[mask], minlength=3)
             result["hand_composition"] = {
-                "pairs": pairs_count,
-                "suited": suited_count,
-                "offsuit": offsuit_count,
-                "total": total_hands
+                "pairs": int(type_counts[COMBO_PAIR]),
+                "suited": int(type_counts[COMBO_SUITED]),
+                "offsuit": int(type_counts[COMBO_OFFSUIT]),
+                "total": valid_count
             }
 
             # Only return aggregated stats to keep response size manageable
             result["has_hand_strategies"] = True
 
             # Board analysis if applicable
-            if "board" in node:
-                result["board_analysis"] = self.analyze_board_texture(node["board"])
+            if board is not None:
+                result["board_analysis"] = self.analyze_board_texture(board)
+
+        return result
+
+    def get_node_summary(self, path, node_id=None):
+        """Get the precomputed summary of a node: street, subtree stats and weighted frequencies"""
+        resolved = self.resolve_node(path, node_id)
+        if resolved is None:
+            raise ValueError(f"Node not found: {node_id}" if node_id is not None else f"Node not found at path: {path}")
+        return self.node_summary(resolved)
+
+    @timed("summary")
+    def node_summary(self, node_id):
+        """Look up the precomputed aggregates of a node by id"""
+        store = self.store
+        summary = {
+            "node_id": node_id,
+            "street": STREETS[self.stats.street[node_id]],
+            "subtree": self.stats.subtree(node_id)
+        }
+
+        index = store.strategy_index[node_id]
+        if index >= 0 and store.strategy_flags[index] & STRATEGY_ACTIONS and store.strategy_flags[index] & STRATEGY_HANDS:
+            start = store.strategy_action_start[index]
+            labels = store.strategy_actions[start:start + store.strategy_action_count[index]]
+            frequencies = self.stats.frequencies(store, index)
+            summary["action_frequencies"] = {store.strings[label]: round(float(f) * 100, 2)
+                                             for label, f in zip(labels, frequencies)}
+            summary["range_combos"] = round(float(self.stats.reach_combos[index]), 1)
+        return summary
+
+    def export_strategies(self, export_format, batch_rows=DEFAULT_BATCH_ROWS):
+        """
+        Return a generator of the bytes of every strategy in the tree as a long
+        table in export_format (see tree_export.EXPORT_FORMATS), produced in batches.
+        """
+        return export_strategies(self.store, self.stats, export_format, batch_rows)
+
+    def query_nodes(self, criteria, limit=500):
+        """
+        Yield a short description of every node matching the query criteria (see
+        tree_query.QUERY_FIELDS) as it is found, up to limit matches.
+        """
+        store = self.store
+        for node_id, frequency in run_query(self.query_index, criteria, limit):
+            match = {
+                "node_id": node_id,
+                "path": self.node_path(node_id),
+                "street": STREETS[self.stats.street[node_id]]
+            }
+            if store.player[node_id] >= 0:
+                match["player"] = int(store.player[node_id])
+            if not np.isnan(store.pot[node_id]):
+                match["pot"] = round(float(store.pot[node_id]), 2)
+            if self.query_index.dominant[node_id] >= 0:
+                match["dominant_action"] = store.strings[self.query_index.dominant[node_id]]
+            if frequency is not None:
+                match["frequency"] = frequency
+            yield match
+
+    @timed("diff")
+    def diff_with(self, other, path="", node_id=None, top_k=20):
+        """
+        Compare this tree's strategies with another processor's tree, node by node,
+        below the node at path (or node_id; the whole tree by default). Nodes are
+        aligned by the action sequence leading to them. Divergences are total
+        variation distances in percent: 0 for identical strategies, 100 for disjoint ones.
+        """
+        resolved = self.resolve_node(path, node_id)
+        if resolved is None:
+            raise ValueError(f"Node not found: {node_id}" if node_id is not None else f"Node not found at path: {path}")
+        path = path or self.node_path(resolved)
+        other_root = other.find_node_by_path(path)
+        if other_root is None:
+            raise ValueError(f"Node not found in the other tree at path: {path}")
+
+        span = (resolved, resolved + self.stats.subtree(resolved)["node_count"])
+        other_span = (other_root, other_root + other.stats.subtree(other_root)["node_count"])
+        diff = diff_trees(self.store, other.store, span, other_span, top_k)
+
+        def frequencies(processor, node_id):
+            store = processor.store
+            index = store.strategy_index[node_id]
+            start = store.strategy_action_start[index]
+            labels = store.strategy_actions[start:start + store.strategy_action_count[index]]
+            return {store.strings[label]: float(f) for label, f in zip(labels, processor.stats.frequencies(store, index))}
+
+        nodes = []
+        for divergence, max_divergence, combos, id_a, id_b, actions in diff["nodes"]:
+            frequencies_a, frequencies_b = frequencies(self, id_a), frequencies(other, id_b)
+            nodes.append({
+                "path": self.node_path(id_a),
+                "node_id": id_a,
+                "other_node_id": id_b,
+                "actions": actions,
+                "divergence": round(divergence * 100, 2),
+                "max_combo_divergence": round(max_divergence * 100, 2),
+                "combos": combos,
+                # Change in range-weighted frequency from this tree to the other
+                "frequency_delta": {action: round((frequencies_b.get(action, 0) - frequencies_a.get(action, 0)) * 100, 2)
+                                    for action in actions}
+            })
+
+        combos = []
+        for divergence, id_a, id_b, combo, actions, probabilities_a, probabilities_b in diff["combos"]:
+            combos.append({
+                "path": self.node_path(id_a),
+                "node_id": id_a,
+                "other_node_id": id_b,
+                "combo": self.format_specific_hand(COMBO_NAMES[combo]),
+                "hand": CELL_HANDS[COMBO_CELLS[combo]],
+                "actions": actions,
+                "divergence": round(divergence * 100, 2),
+                "probabilities": [round(float(p) * 100, 1) for p in probabilities_a],
+                "other_probabilities": [round(float(p) * 100, 1) for p in probabilities_b]
+            })
+
+        return {
+            "path": path,
+            "aligned_nodes": diff["aligned"],
+            "compared_nodes": diff["compared"],
+            "only_in_this": diff["only_in_a"],
+            "only_in_other": diff["only_in_b"],
+            "mean_divergence": round(diff["mean_divergence"] * 100, 2),
+            "nodes": nodes,
+            "combos": combos
+        }
+
+    @timed("runout")
+    def get_runout_report(self, path, node_id=None, heatmap=False):
+        """
+        Compare the strategies of every dealt card below a chance node. All card
+        children are stacked into one (cards, 1326, actions) array, so the per-card
+        action frequencies and the optional per-hand heatmap are single reductions.
+        Combos are weighted by how often the acting player's range reaches the node.
+        """
+        store = self.store
+        resolved = self.resolve_node(path, node_id)
+        if resolved is None:
+            raise ValueError(f"Node not found: {node_id}" if node_id is not None else f"Node not found at path: {path}")
+        if not store.flags[resolved] & FLAG_DEALCARDS:
+            raise ValueError(f"Node {resolved} has no dealt cards")
+
+        # Line up every child's strategy on the union of their action labels
+        cards, strategies, actions = [], [], []
+        for card, child_id in store.dealcards(resolved):
+            strategy = store.strategy(child_id) if child_id != NO_CHILD else None
+            if strategy is None or strategy.actions is None or strategy.probabilities is None:
+                strategy = None
+            else:
+                actions.extend(a for a in strategy.actions if a not in actions)
+            cards.append((card, child_id))
+            strategies.append(strategy)
+
+        probabilities = np.zeros((len(cards), COMBO_COUNT, len(actions)), dtype=np.float32)
+        weights = np.zeros((len(cards), COMBO_COUNT), dtype=np.float32)
+        reaches = {}
+        for i, ((card, child_id), strategy) in enumerate(zip(cards, strategies)):
+            if strategy is None:
+                continue
+            columns = [actions.index(a) for a in strategy.actions[:strategy.probabilities.shape[1]]]
+            probabilities[i][:, columns] = strategy.probabilities[:, :len(columns)]
+            player = int(store.player[child_id])
+            if player not in reaches:
+                reaches[player] = range_reach(store, resolved, player)
+            weights[i] = reaches[player] * strategy.mask
+
+        # Per-card frequencies: one weighted contraction over combos
+        totals = weights.sum(axis=1, dtype=np.float64)
+        sums = np.einsum("nc,nca->na", weights, probabilities, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frequencies = sums / totals[:, None]
+            overall = sums.sum(axis=0) / totals.sum()
+
+        result = {
+            "node_id": resolved,
+            "path": path or self.node_path(resolved),
+            "actions": actions,
+            "average_frequencies": [round(float(f) * 100, 2) for f in np.nan_to_num(overall)],
+            "cards": []
+        }
+        for i, (card, child_id) in enumerate(cards):
+            row = {"card": card, "node_id": child_id if child_id != NO_CHILD else None,
+                   "has_strategy": strategies[i] is not None}
+            if strategies[i] is not None:
+                row["range_combos"] = round(float(totals[i]), 1)
+                row["frequencies"] = [round(float(f) * 100, 2) for f in np.nan_to_num(frequencies[i])]
+            result["cards"].append(row)
+
+        if heatmap:
+            averages, cell_totals = cell_weighted_averages(probabilities, weights)
+            values = np.round(np.nan_to_num(averages) * 100, 1).tolist()
+            result["heatmap"] = {
+                "ranks": list(MATRIX_RANKS),
+                "hands": list(CELL_HANDS),
+                # [card][cell] -> action percentages, or None where no combo of the hand reaches that card
+                "frequencies": [[cell if total > 0 else None for cell, total in zip(card_values, card_totals)]
+                                for card_values, card_totals in zip(values, cell_totals)]
+            }
 
         return result
 
-    def get_hand_matrix_data(self, path):
+    def get_hand_matrix_data(self, path, node_id=None):
         """Generate data for the hand matrix visualization"""
-        node = self.find_node_by_path(path)
-        if not node or "strategy" not in node:
+        return self._hand_matrix(self._find_strategy(path, node_id))
+
+    def get_hand_matrix_packed(self, path, node_id=None, quantize=False):
+        """Return the hand matrix in the compact binary payload format, or None without a strategy"""
+        return self._hand_matrix_packed(self._find_strategy(path, node_id), quantize)
+
+    @timed("hand_matrix_packed")
+    def _hand_matrix_packed(self, strategy, quantize=False):
+        if strategy is None or strategy.actions is None or strategy.probabilities is None:
+            return None
+        averages, counts = cell_averages(strategy.probabilities, strategy.mask)
+        return encode_hand_matrix(strategy.actions, list(MATRIX_RANKS), counts, averages, quantize)
+
+    @timed("hand_matrix")
+    def _hand_matrix(self, strategy):
+        """Build the 13x13 matrix cells of a strategy"""
+        if strategy is None:
             return {"has_strategy": False}
 
-        strategy = node["strategy"]
-        if "actions" not in strategy or "strategy" not in strategy:
+        actions = strategy.actions
+        if actions is None or strategy.probabilities is None:
             return {"has_strategy": False}
 
-        actions = strategy["actions"]
-        hand_strategies = strategy["strategy"]
-
-        # Define the hand rankings for the grid
-        ranks = ['A', 'K', 'Q', 'J', 'T', '9', '8', '7', '6', '5', '4', '3', '2']
-
         matrix_data = {
             "has_strategy": True,
             "actions": actions,
-            "ranks": ranks,
+            "ranks": list(MATRIX_RANKS),
             "cells": []
         }
 
-        # Generate all possible hand combinations
-        for i, rank1 in enumerate(ranks):
-            for j, rank2 in enumerate(ranks):
-                hand_text = ""
-                solver_hands = []
-
-                if i == j:  # Pairs (AA, KK, etc.)
-                    hand_text = f"{rank1}{rank1}"
-                    hand_type = "pair"
-                    for s1 in ['c', 'd', 'h', 's']:
-                        for s2 in ['c', 'd', 'h', 's']:
-                            if s1 < s2:  # Avoid duplicates (AcAd = AdAc)
-                                solver_hands.append(f"{rank1}{s1}{rank1}{s2}")
-
-                elif i < j:  # Suited hands (AKs, AQs, etc.)
-                    hand_text = f"{rank1}{rank2}s"
-                    hand_type = "suited"
-                    for suit in ['c', 'd', 'h', 's']:
-                        solver_hands.append(f"{rank1}{suit}{rank2}{suit}")
-
-                else:  # Offsuit hands (AKo, AQo, etc.)
-                    hand_text = f"{rank1}{rank2}o"
-                    hand_type = "offsuit"
-                    for s1 in ['c', 'd', 'h', 's']:
-                        for s2 in ['c', 'd', 'h', 's']:
-                            if s1 != s2:
-                                solver_hands.append(f"{rank1}{s1}{rank2}{s2}")
-
-                # Find matching hands in the strategy
-                matching_hands = []
-                for solver_hand in solver_hands:
-                    for hand_key in hand_strategies.keys():
-                        if self.match_hands(solver_hand, hand_key):
-                            matching_hands.append((hand_key, hand_strategies[hand_key]))
-                            break  # Found a match for this solver hand
-
-                if matching_hands:
-                    # Calculate average probabilities
-                    total_probs = np.zeros(len(actions))
-                    for _, probs in matching_hands:
-                        total_probs += np.array(probs)
-                    avg_probs = total_probs / len(matching_hands)
-
-                    # Find the dominant action
-                    max_idx = np.argmax(avg_probs)
-                    max_prob = float(avg_probs[max_idx])
-                    max_action = actions[max_idx]
-
-                    # Format for client
-                    cell = {
-                        "row": i,
-                        "col": j,
-                        "hand": hand_text,
-                        "type": hand_type,
-                        "action": max_action,
-                        "probability": round(max_prob * 100, 1),
-                        "probabilities": [round(float(p) * 100, 1) for p in avg_probs]
-                    }
-                else:
-                    # No strategy data for this hand
-                    cell = {
-                        "row": i,
-                        "col": j,
-                        "hand": hand_text,
-                        "type": hand_type,
-                        "action": "none",
-                        "probability": 0,
-                        "probabilities": []
-                    }
-
-                matrix_data["cells"].append(cell)
+        # Average the reported combos of every cell at once
+        averages, counts = cell_averages(strategy.probabilities, strategy.mask)
+        best = averages.argmax(axis=1) if len(actions) else np.zeros(CELL_COUNT, dtype=int)
+
+        for cell, (hand_text, hand_type) in enumerate(zip(CELL_HANDS, CELL_TYPES)):
+            cell_data = {
+                "row": cell // 13,
+                "col": cell % 13,
+                "hand": hand_text,
+                "type": hand_type,
+            }
+
+            if counts[cell] and len(actions):
+                avg_probs = averages[cell].tolist()
+                max_idx = int(best[cell])
+
+                # Dominant action for the client
+                cell_data["action"] = actions[max_idx]
+                cell_data["probability"] = round(avg_probs[max_idx] * 100, 1)
+                cell_data["probabilities"] = [round(p * 100, 1) for p in avg_probs]
+            else:
+                # No strategy data for this hand
+                cell_data["action"] = "none"
+                cell_data["probability"] = 0
+                cell_data["probabilities"] = []
+
+            matrix_data["cells"].append(cell_data)
 
         return matrix_data
 
-    def get_hand_details(self, path, hand_text):
-        """Get detailed information about a specific hand"""
-        node = self.find_node_by_path(path)
-        if not node or "strategy" not in node:
+    def _hand_combos(self, strategy, hand_text):
+        """Return (cell, combo indices, probabilities) of a hand, or an error dict"""
+        if strategy is None:
             return {"error": "No strategy data available"}
 
-        strategy = node["strategy"]
-        if "actions" not in strategy or "strategy" not in strategy:
+        if strategy.actions is None or strategy.probabilities is None:
             return {"error": "No detailed strategy data available"}
 
-        actions = strategy["actions"]
-        hand_strategies = strategy["strategy"]
-
-        # Parse the hand text to get solver hands
-        solver_hands = self.get_solver_hands_for_hand_text(hand_text)
-        if not solver_hands:
+        # Look up the matrix cell of the hand text
+        cell = hand_cell(hand_text)
+        if cell < 0:
             return {"error": f"Invalid hand format: {hand_text}"}
 
-        # Find matching hands in the strategy
-        matching_hands = []
-        for solver_hand in solver_hands:
-            for hand_key in hand_strategies.keys():
-                if self.match_hands(solver_hand, hand_key):
-                    matching_hands.append((hand_key, hand_strategies[hand_key]))
-
-        if not matching_hands:
+        # Keep the combos of this cell that the strategy reports
+        combos = cell_combos(cell)
+        combos = combos[strategy.mask[combos]]
+        if not len(combos):
             return {"error": f"No strategy data found for hand: {hand_text}"}
 
+        return cell, combos, strategy.probabilities[combos]
+
+    @timed("hand_details")
+    def get_hand_details_packed(self, path, hand_text, node_id=None, quantize=False):
+        """Return hand details in the compact binary payload format, or an error dict"""
+        strategy = self._find_strategy(path, node_id)
+        found = self._hand_combos(strategy, hand_text)
+        if isinstance(found, dict):
+            return found
+
+        cell, combos, probabilities = found
+        names = [self.format_specific_hand(COMBO_NAMES[index]) for index in combos]
+        return encode_hand_details(hand_text, strategy.actions, names, probabilities,
+                                   len(cell_combos(cell)), quantize)
+
+    @timed("hand_details")
+    def get_hand_details(self, path, hand_text, node_id=None):
+        """Get detailed information about a specific hand"""
+        strategy = self._find_strategy(path, node_id)
+        found = self._hand_combos(strategy, hand_text)
+        if isinstance(found, dict):
+            return found
+
+        cell, combos, probabilities = found
+        actions = strategy.actions
+
         # Format the result
         result = {
             "hand": hand_text,
@@ -544,8 +774,8 @@ class GameTreeProcessor:
         }
 
         # Add details for each specific hand combination
-        for hand_key, probs in matching_hands:
-            formatted_hand = self.format_specific_hand(hand_key)
+        for index, probs in zip(combos, probabilities):
+            formatted_hand = self.format_specific_hand(COMBO_NAMES[index])
             combo = {
                 "hand": formatted_hand,
                 "probabilities": [round(float(p) * 100, 1) for p in probs]
@@ -553,53 +783,14 @@ class GameTreeProcessor:
             result["combinations"].append(combo)
 
         # Calculate average probabilities
-        total_probs = np.zeros(len(actions))
-        for _, probs in matching_hands:
-            total_probs += np.array(probs)
-        avg_probs = total_probs / len(matching_hands)
+        avg_probs = probabilities.mean(axis=0, dtype=np.float64)
         result["average_probabilities"] = [round(float(p) * 100, 1) for p in avg_probs]
 
         # Calculate expected combos
-        if 's' in hand_text:
-            result["expected_combos"] = 4
-        elif 'o' in hand_text:
-            result["expected_combos"] = 12
-        else:  # Pair
-            result["expected_combos"] = 6
+        result["expected_combos"] = len(cell_combos(cell))
 
         return result
 
-    def get_solver_hands_for_hand_text(self, hand_text):
-        """Convert a hand text like 'AKs' to a list of specific solver hands"""
-        solver_hands = []
-
-        if len(hand_text) < 2:
-            return []
-
-        # Check if it's a pair (AA, KK, etc.)
-        if len(hand_text) == 2 and hand_text[0] == hand_text[1]:
-            rank = hand_text[0]
-            for s1 in ['c', 'd', 'h', 's']:
-                for s2 in ['c', 'd', 'h', 's']:
-                    if s1 < s2:  # Avoid duplicates (AcAd = AdAc)
-                        solver_hands.append(f"{rank}{s1}{rank}{s2}")
-
-        # Check if it's a suited hand (AKs, AQs, etc.)
-        elif len(hand_text) == 3 and hand_text[2] == 's':
-            rank1, rank2 = hand_text[0], hand_text[1]
-            for suit in ['c', 'd', 'h', 's']:
-                solver_hands.append(f"{rank1}{suit}{rank2}{suit}")
-
-        # Check if it's an offsuit hand (AKo, AQo, etc.)
-        elif len(hand_text) == 3 and hand_text[2] == 'o':
-            rank1, rank2 = hand_text[0], hand_text[1]
-            for s1 in ['c', 'd', 'h', 's']:
-                for s2 in ['c', 'd', 'h', 's']:
-                    if s1 != s2:
-                        solver_hands.append(f"{rank1}{s1}{rank2}{s2}")
-
-        return solver_hands
-
     def format_specific_hand(self, hand_key):
         """Format a specific hand combination for display"""
         if len(hand_key) != 4:
@@ -610,14 +801,18 @@ class GameTreeProcessor:
 
         return f"{rank1}{suit_symbols.get(suit1, suit1)}{rank2}{suit_symbols.get(suit2, suit2)}"
 
-    def get_ev_analysis(self, path):
+    def get_ev_analysis(self, path, node_id=None):
         """Generate data for EV analysis visualization"""
-        node = self.find_node_by_path(path)
-        if not node or "strategy" not in node:
+        node_id = self.resolve_node(path, node_id)
+        if node_id is None:
             return {"has_strategy": False}
 
         # Get base strategy info to avoid duplication
-        strategy_info = self.get_strategy_info(path)
+        return self._ev_analysis(self._strategy_info(node_id, self.store.strategy(node_id)))
+
+    @timed("ev_analysis")
+    def _ev_analysis(self, strategy_info):
+        """Derive EV tips from an already computed strategy summary"""
         if not strategy_info["has_strategy"]:
             return {"has_strategy": False}
 
@@ -659,6 +854,57 @@ class GameTreeProcessor:
 
         return result
 
+    def resolve_bundle_target(self, path="", node_id=None, actions=None):
+        """
+        Resolve a bundle request to (node id, path). Falls back to an action
+        sequence when the path is not found, for clients that only know the actions.
+        Returns (None, path) when there is no such node.
+        """
+        resolved = self.resolve_node(path, node_id)
+        if resolved is None and node_id is None and actions:
+            resolved = self.get_node_by_action_sequence(actions)
+            path = ""
+
+        if resolved is None:
+            return None, path
+        return resolved, path or self.node_path(resolved)
+
+    def bundle_view(self, view, node_id, path, shared=None):
+        """Compute one bundle view of a resolved node; shared memoizes the strategy across views"""
+        if view == "node":
+            return self.node_info(node_id, path)
+        if view == "summary":
+            return self.node_summary(node_id)
+
+        shared = {} if shared is None else shared
+        if "strategy" not in shared:
+            shared["strategy"] = self.store.strategy(node_id)
+        if view == "hand_matrix":
+            return self._hand_matrix(shared["strategy"])
+        if view == "hand_matrix_packed":
+            packed = self._hand_matrix_packed(shared["strategy"])
+            if packed is None:
+                return {"has_strategy": False}
+            return {"has_strategy": True, "encoding": "GTHM", "data": base64.b64encode(packed).decode("ascii")}
+
+        if "strategy_info" not in shared:
+            shared["strategy_info"] = self._strategy_info(node_id, shared["strategy"])
+        if view == "strategy":
+            return shared["strategy_info"]
+        return self._ev_analysis(shared["strategy_info"])
+
+    def child_paths(self, node_id, path):
+        """List (child id, path) for the action and dealt card children of a node"""
+        store = self.store
+        children = []
+        for e in store.edges(node_id):
+            child_id = int(store.edge_child[e])
+            if child_id == NO_CHILD:
+                continue
+            container = "dealcards" if store.edge_kind[e] == EDGE_CARD else "childrens"
+            children.append((child_id, f"{path}/{container}/{store.strings[store.edge_label[e]]}"))
+        return children
+
     def analyze_board_texture(self, board):
         """Analyze the board texture and return analysis"""
         if not board or len(board) < 2:
@@ -736,43 +982,3 @@ class GameTreeProcessor:
             analysis.append("Dry board texture")
 
         return analysis
-
-    def match_hands(self, solver_hand, hand_key):
-        """Check if two hand representations match"""
-        if len(solver_hand) != 4 or len(hand_key) != 4:
-            return False
-
-        rank1, suit1, rank2, suit2 = solver_hand[0], solver_hand[1], solver_hand[2], solver_hand[3]
-        kr1, ks1, kr2, ks2 = hand_key[0], hand_key[1], hand_key[2], hand_key[3]
-
-        # Quick exact check
-        if solver_hand == hand_key:
-            return True
-
-        # Rank matching ignoring order
-        ranks_match = (
-            (rank1 == kr1 and rank2 == kr2) or
-            (rank1 == kr2 and rank2 == kr1)
-        )
-        if not ranks_match:
-            return False
-
-        # Pair check
-        if rank1 == rank2 and kr1 == kr2:
-            # same pair, check suit combos
-            if (suit1 == ks1 and suit2 == ks2) or (suit1 == ks2 and suit2 == ks1):
-                return True
-            return False
-
-        # suited check
-        if suit1 == suit2 and ks1 == ks2:
-            return True
-
-        # offsuit check
-        if suit1 != suit2 and ks1 != ks2:
-            # same pattern of suits?
-            return (
-                (suit1 == ks1 and suit2 == ks2) or
-                (suit1 == ks2 and suit2 == ks1)
-            )
-        return False
@@ -0,0 +1,214 @@
+import numpy as np
+
+from combos import cell_combos, hand_cell, hand_index
+from node_store import EDGE_ACTION, NO_CHILD, STRATEGY_ACTIONS, STRATEGY_HANDS
+from tree_stats import STREETS
+
+
+# Query fields: node attributes answered by the indexes, then strategy thresholds checked per node
+QUERY_FIELDS = ("player", "street", "pot_min", "pot_max", "action", "dominant", "history",
+                "hand", "frequency_action", "min_frequency", "max_frequency")
+
+
+def _usable(flags):
+    """Mask of strategies that have both an action list and per-combo probabilities"""
+    return (flags & STRATEGY_ACTIONS).astype(bool) & (flags & STRATEGY_HANDS).astype(bool)
+
+
+class Postings:
+    """Inverted index: for every key, the sorted ids of the nodes carrying it"""
+
+    def __init__(self, keys, node_ids):
+        order = np.lexsort((node_ids, keys))
+        keys = np.asarray(keys)[order]
+        self.node_ids = np.asarray(node_ids, dtype=np.int32)[order]
+        self.keys, self.starts = np.unique(keys, return_index=True)
+        self.ends = np.append(self.starts[1:], len(keys))
+
+    def get(self, key):
+        """Return the sorted node ids of one key"""
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return np.zeros(0, dtype=np.int32)
+        return self.node_ids[self.starts[i]:self.ends[i]]
+
+    def get_any(self, keys):
+        """Return the sorted node ids carrying at least one of the keys"""
+        return np.unique(np.concatenate([self.get(key) for key in keys] or [np.zeros(0, dtype=np.int32)]))
+
+    @property
+    def nbytes(self):
+        return self.node_ids.nbytes + self.keys.nbytes + self.starts.nbytes + self.ends.nbytes
+
+
+class QueryIndex:
+    """
+    Indexes over a loaded tree for tree-wide queries, built once when it is opened:
+    listed action label, dominant action, street and player to node ids, plus
+    the label of the edge leading into every node for matching action histories.
+    """
+
+    def __init__(self, store, stats):
+        self.store = store
+        self.stats = stats
+        n = store.node_count
+
+        # Owner node of every edge: edge ranges are contiguous, in edge_start order
+        order = np.argsort(store.edge_start, kind="stable")
+        owners = np.repeat(order, store.edge_count[order]).astype(np.int32)
+        listed = store.edge_kind == EDGE_ACTION
+        self.by_action = Postings(store.edge_label[listed], owners[listed])
+
+        self.incoming_label = np.full(n, -1, dtype=np.int32)
+        has_child = store.edge_child != NO_CHILD
+        self.incoming_label[store.edge_child[has_child]] = store.edge_label[has_child]
+
+        # Dominant action of each strategy: the first entry of each segment sorted by descending frequency
+        self.dominant = np.full(n, -1, dtype=np.int32)
+        counts = store.strategy_action_count
+        usable = _usable(store.strategy_flags) & (counts > 0)
+        segments = np.repeat(np.arange(len(counts)), counts)
+        ranked = np.lexsort((-stats.weighted_frequencies, segments))
+        first = ranked[np.searchsorted(segments[ranked], np.flatnonzero(usable))]
+        nodes = np.flatnonzero(store.strategy_index >= 0)
+        strategy_nodes = np.full(len(counts), -1, dtype=np.int64)
+        strategy_nodes[store.strategy_index[nodes]] = nodes
+        self.dominant[strategy_nodes[usable]] = store.strategy_actions[first]
+        with_dominant = np.flatnonzero(self.dominant >= 0)
+        self.by_dominant = Postings(self.dominant[with_dominant], with_dominant)
+
+        self.by_street = Postings(stats.street, np.arange(n))
+        self.by_player = Postings(store.player, np.arange(n))
+
+    @property
+    def nbytes(self):
+        return (self.by_action.nbytes + self.by_dominant.nbytes + self.by_street.nbytes + self.by_player.nbytes
+                + self.incoming_label.nbytes + self.dominant.nbytes)
+
+    def matching_labels(self, pattern):
+        """Return the ids of interned labels starting with pattern, ignoring case"""
+        pattern = pattern.strip().upper()
+        return [i for i, label in enumerate(self.store.strings.strings) if label.upper().startswith(pattern)]
+
+    def candidates(self, criteria):
+        """Return the sorted node ids matching every attribute criterion"""
+        store = self.store
+        sets = []
+
+        if criteria.get("player") is not None:
+            sets.append(self.by_player.get(int(criteria["player"])))
+        if criteria.get("street") is not None:
+            if criteria["street"] not in STREETS:
+                raise ValueError(f"Unknown street: {criteria['street']} (expected one of {', '.join(STREETS)})")
+            sets.append(self.by_street.get(STREETS.index(criteria["street"])))
+        if criteria.get("action"):
+            sets.append(self.by_action.get_any(self.matching_labels(criteria["action"])))
+        if criteria.get("dominant"):
+            sets.append(self.by_dominant.get_any(self.matching_labels(criteria["dominant"])))
+
+        # Smallest posting list first keeps the intersections cheap
+        if sets:
+            sets.sort(key=len)
+            node_ids = sets[0]
+            for other in sets[1:]:
+                node_ids = np.intersect1d(node_ids, other, assume_unique=True)
+        else:
+            node_ids = np.arange(store.node_count, dtype=np.int32)
+
+        if criteria.get("pot_min") is not None:
+            node_ids = node_ids[store.pot[node_ids] >= float(criteria["pot_min"])]
+        if criteria.get("pot_max") is not None:
+            node_ids = node_ids[store.pot[node_ids] <= float(criteria["pot_max"])]
+
+        # History: the last actions leading into the node, oldest first, each matched by prefix
+        if criteria.get("history"):
+            current = node_ids
+            keep = np.ones(len(node_ids), dtype=bool)
+            for pattern in reversed(criteria["history"]):
+                labels = np.asarray(self.matching_labels(pattern), dtype=np.int32)
+                keep &= (current > 0) & np.isin(self.incoming_label[current], labels)
+                current = np.where(current > 0, store.parent[current], 0)
+            node_ids = node_ids[keep]
+
+        return node_ids
+
+
+def _action_columns(store, strategy_index, labels):
+    """Return the strategy columns whose action label is one of labels"""
+    start = int(store.strategy_action_start[strategy_index])
+    actions = store.strategy_actions[start:start + int(store.strategy_action_count[strategy_index])]
+    return np.flatnonzero(np.isin(actions, labels))
+
+
+def _hand_rows(hand):
+    """Return the combo indices of a hand class like 'AKs' or a single combo like 'AcKd'"""
+    cell = hand_cell(hand)
+    if cell >= 0:
+        return cell_combos(cell)
+    index = hand_index(hand)
+    if index >= 0:
+        return np.array([index])
+    raise ValueError(f"Invalid hand format: {hand}")
+
+
+def run_query(index, criteria, limit):
+    """
+    Yield (node id, frequency) for every node matching the criteria, in node id
+    order, stopping after limit matches. The frequency is the percentage of the
+    hand (or of the node's whole range) taking frequency_action, or None when no
+    threshold is asked for.
+    """
+    store, stats = index.store, index.stats
+    node_ids = index.candidates(criteria)
+
+    threshold = any(criteria.get(f) is not None for f in ("frequency_action", "min_frequency", "max_frequency"))
+    if criteria.get("hand") and not criteria.get("frequency_action"):
+        raise ValueError("frequency_action is required with hand")
+    if not threshold:
+        for node_id in node_ids[:limit]:
+            yield int(node_id), None
+        return
+    if not criteria.get("frequency_action"):
+        raise ValueError("frequency_action is required with min_frequency or max_frequency")
+
+    labels = np.asarray(index.matching_labels(criteria["frequency_action"]), dtype=np.int32)
+    low = float(criteria["min_frequency"]) if criteria.get("min_frequency") is not None else -np.inf
+    high = float(criteria["max_frequency"]) if criteria.get("max_frequency") is not None else np.inf
+    rows = _hand_rows(criteria["hand"]) if criteria.get("hand") else None
+
+    # Nodes that do not offer any matching action cannot pass a threshold
+    matching = np.isin(store.strategy_actions, labels)
+    starts, ends = store.strategy_action_start, store.strategy_action_start + store.strategy_action_count
+    offered = np.concatenate(([0], np.cumsum(matching)))
+    offers_action = offered[ends] > offered[starts]
+
+    # Whole-range frequencies of the matching actions for every strategy at once
+    if rows is None:
+        totals = np.concatenate(([0], np.cumsum(np.where(matching, stats.weighted_frequencies, 0), dtype=np.float64)))
+        range_frequency = (totals[ends] - totals[starts]) * 100
+
+    # Only nodes with an action list, per-combo probabilities and a matching action can pass
+    strategy_ids = store.strategy_index[node_ids]
+    has_strategy = strategy_ids >= 0
+    node_ids, strategy_ids = node_ids[has_strategy], strategy_ids[has_strategy]
+    usable = _usable(store.strategy_flags[strategy_ids]) & offers_action[strategy_ids]
+    node_ids, strategy_ids = node_ids[usable], strategy_ids[usable]
+
+    found = 0
+    for node_id, strategy_id in zip(node_ids, strategy_ids):
+        if rows is None:
+            frequency = float(range_frequency[strategy_id])
+        else:
+            strategy = store.strategy(int(node_id))
+            reported = rows[strategy.mask[rows]]
+            columns = _action_columns(store, strategy_id, labels)
+            columns = columns[columns < strategy.probabilities.shape[1]]
+            if not len(reported):
+                continue
+            frequency = float(strategy.probabilities[np.ix_(reported, columns)].sum(axis=1).mean()) * 100
+
+        if low <= frequency <= high:
+            yield int(node_id), round(frequency, 2)
+            found += 1
+            if found >= limit:
+                return
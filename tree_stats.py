@@ -0,0 +1,326 @@
+import numpy as np
+
+from combos import COMBO_COUNT
+from node_store import EDGE_CARD, FLAG_ACTIONS, FLAG_DEALCARDS, NO_CHILD, STRATEGY_ACTIONS, STRATEGY_HANDS
+
+
+STREETS = ("preflop", "flop", "turn", "river")
+
+# Node kinds counted per street. Terminals are folds and showdowns: actions the
+# solver lists without a child node, plus any node with neither actions nor cards
+NODE_KINDS = ("decision", "chance", "terminal")
+
+# Strategies whose weighted frequencies are computed together, bounding the weights held at once
+STRATEGY_BATCH = 4096
+
+# Bytes set per 8 combos in a strategy's mask
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _street_of(cards):
+    """Map a number of board cards to a street index"""
+    return np.clip(np.asarray(cards) - 2, 0, len(STREETS) - 1)
+
+
+def depth_levels(depth):
+    """Group node ids by depth, shallowest first"""
+    order = np.argsort(depth, kind="stable")
+    bounds = np.flatnonzero(np.diff(depth[order])) + 1
+    return np.split(order, bounds)
+
+
+class TreeStats:
+    """
+    Aggregates materialized once per tree so that any node's summary is a lookup:
+    the street of every node, node/decision counts, height, street breakdown and
+    approximate size of every subtree, and range-weighted action frequencies of
+    every strategy.
+    """
+
+    ARRAYS = ("street", "street_counts", "subtree_decisions", "subtree_height", "subtree_bytes",
+              "reach_combos", "weighted_frequencies")
+
+    def __init__(self, arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild stats saved with arrays(), or return None if any are missing"""
+        if not all(name in arrays for name in cls.ARRAYS):
+            return None
+        return cls(arrays)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def subtree(self, node_id):
+        """Return the size, height and street breakdown of the subtree rooted at a node"""
+        counts = self.street_counts[node_id]
+        return {
+            "node_count": int(counts.sum()),
+            "decision_nodes": int(self.subtree_decisions[node_id]),
+            "depth": int(self.subtree_height[node_id]),
+            "nbytes": int(self.subtree_bytes[node_id]),
+            "streets": {street: int(count) for street, count in zip(STREETS, counts) if count}
+        }
+
+    def frequencies(self, store, strategy_index):
+        """Return the range-weighted action frequencies of a strategy, in its action order"""
+        start = int(store.strategy_action_start[strategy_index])
+        return self.weighted_frequencies[start:start + int(store.strategy_action_count[strategy_index])]
+
+
+def compute_tree_stats(store):
+    """Compute TreeStats for a NodeStore in one top-down and one bottom-up pass over its levels"""
+    n = store.node_count
+    levels = depth_levels(store.depth)
+
+    # How each node was reached from its parent
+    edges = np.flatnonzero(store.edge_child != NO_CHILD)
+    children = store.edge_child[edges]
+    incoming = np.full(n, -1, dtype=np.int64)
+    incoming[children] = edges
+    dealt = np.zeros(n, dtype=bool)
+    dealt[children] = store.edge_kind[edges] == EDGE_CARD
+
+    # Street: from the node's own board when it has one, else its parent's plus any dealt card
+    board_cards = np.array([len(s) // 2 for s in store.strings.strings], dtype=np.int32)
+    has_board = store.board >= 0
+    street = np.zeros(n, dtype=np.int8)
+    street[has_board] = _street_of(board_cards[store.board[has_board]])
+    for level in levels[1:]:
+        inherited = np.minimum(street[store.parent[level]] + dealt[level], len(STREETS) - 1)
+        street[level] = np.where(has_board[level], street[level], inherited)
+
+    # Post-order accumulation, deepest level first, so every child is folded in before its parent
+    street_counts = np.zeros((n, len(STREETS)), dtype=np.int32)
+    street_counts[np.arange(n), street] = 1
+    decisions = (store.flags & FLAG_ACTIONS).astype(bool).astype(np.int32)
+    height = np.zeros(n, dtype=np.int32)
+    nbytes = _node_bytes(store)
+    for level in reversed(levels[1:]):
+        parents = store.parent[level]
+        np.add.at(street_counts, parents, street_counts[level])
+        np.add.at(decisions, parents, decisions[level])
+        np.maximum.at(height, parents, height[level] + 1)
+        np.add.at(nbytes, parents, nbytes[level])
+
+    reach_combos, frequencies = _weighted_frequencies(store, incoming, levels)
+    return TreeStats({
+        "street": street,
+        "street_counts": street_counts,
+        "subtree_decisions": decisions,
+        "subtree_height": height,
+        "subtree_bytes": nbytes,
+        "reach_combos": reach_combos,
+        "weighted_frequencies": frequencies,
+    })
+
+
+def _node_bytes(store):
+    """Approximate bytes each node takes in the store: its columns, its edges and its strategy"""
+    columns = (store.parent, store.depth, store.flags, store.node_type, store.player, store.pot, store.board,
+               store.deal_number, store.edge_start, store.edge_count, store.strategy_index)
+    nbytes = np.full(store.node_count, sum(column.itemsize for column in columns), dtype=np.int64)
+    edge_bytes = store.edge_kind.itemsize + store.edge_label.itemsize + store.edge_child.itemsize
+    nbytes += store.edge_count.astype(np.int64) * edge_bytes
+
+    # float32 probabilities, the combo mask and the action labels
+    strategy_bytes = (store.strategy_sizes() * 4 + store.strategy_mask_bits.shape[1]
+                      + store.strategy_action_count.astype(np.int64) * store.strategy_actions.itemsize)
+    has_strategy = store.strategy_index >= 0
+    nbytes[has_strategy] += strategy_bytes[store.strategy_index[has_strategy]]
+    return nbytes
+
+
+def summarize_tree(store, stats):
+    """
+    Count the whole tree once: node kinds per street, depth, branching factors,
+    strategy entries and size. Vectorized over the node columns, so it runs in
+    linear time without recursion however deep the tree is. Terminal nodes are
+    leaves present in the tree; terminal actions are the actions a solver lists
+    without a child node (folds and showdowns), which are not nodes at all.
+    """
+    n = store.node_count
+    kind = np.full(n, NODE_KINDS.index("terminal"), dtype=np.int8)
+    kind[(store.flags & FLAG_DEALCARDS).astype(bool)] = NODE_KINDS.index("chance")
+    kind[(store.flags & FLAG_ACTIONS).astype(bool)] = NODE_KINDS.index("decision")
+    by_street = np.bincount(stats.street.astype(np.int64) * len(NODE_KINDS) + kind,
+                            minlength=len(STREETS) * len(NODE_KINDS)).reshape(len(STREETS), len(NODE_KINDS))
+
+    # Each node's edges are contiguous, so ordering nodes by their first edge lists every edge's owner
+    order = np.argsort(store.edge_start, kind="stable")
+    owner = np.repeat(order, store.edge_count[order])
+    unexplored = (store.edge_child == NO_CHILD) & (store.edge_kind != EDGE_CARD)
+    terminal_actions = np.bincount(stats.street[owner[unexplored]], minlength=len(STREETS))
+    totals = by_street.sum(axis=0)
+
+    # Children actually present, for every node that has any
+    children = np.bincount(store.parent[1:], minlength=n) if n else np.zeros(0, dtype=np.int64)
+    branching = np.bincount(children[children > 0])
+
+    hands = (_POPCOUNT[store.strategy_mask_bits].sum(axis=1, dtype=np.int64)
+             if len(store.strategy_mask_bits) else np.zeros(0, dtype=np.int64))
+    widths = store.strategy_sizes() // COMBO_COUNT
+
+    return {
+        "node_count": int(n),
+        "decision_points": int(totals[NODE_KINDS.index("decision")]),
+        "chance_nodes": int(totals[NODE_KINDS.index("chance")]),
+        "terminal_nodes": int(totals[NODE_KINDS.index("terminal")]),
+        "terminal_actions": int(terminal_actions.sum()),
+        "max_depth": int(store.depth.max()) if n else 0,
+        "streets": {street: dict(zip(NODE_KINDS, map(int, counts)), terminal_actions=int(actions))
+                    for street, counts, actions in zip(STREETS, by_street, terminal_actions)
+                    if counts.any() or actions},
+        "branching": {str(count): int(nodes) for count, nodes in enumerate(branching) if nodes},
+        "mean_branching": round(float(children[children > 0].mean()), 3) if children.any() else 0.0,
+        "strategy_nodes": int(len(hands)),
+        "strategy_hands": int(hands.sum()),
+        "strategy_entries": int((hands * widths).sum()),
+        "nbytes": int(stats.subtree_bytes[0]) if n else 0
+    }
+
+
+def _weighted_frequencies(store, incoming, levels):
+    """
+    Weight each strategy's combos by how often the acting player's own earlier
+    actions lead them to this node, then average the action probabilities with
+    those weights. Dealt cards need no adjustment: combos blocked by the board
+    are simply not reported. Nodes nobody reaches fall back to the unweighted mean.
+    """
+    reach_combos = np.zeros(len(store.strategy_flags), dtype=np.float32)
+    frequencies = np.zeros(len(store.strategy_actions), dtype=np.float32)
+    usable = ((store.strategy_flags & STRATEGY_ACTIONS).astype(bool)
+              & (store.strategy_flags & STRATEGY_HANDS).astype(bool))
+    has_strategy = store.strategy_index >= 0
+    node_usable = np.zeros(store.node_count, dtype=bool)
+    node_usable[has_strategy] = usable[store.strategy_index[has_strategy]]
+    if not node_usable.any():
+        return reach_combos, frequencies
+
+    widths = store.strategy_sizes() // COMBO_COUNT
+    players, player_slot = np.unique(store.player, return_inverse=True)
+    column = _action_columns(store, incoming, node_usable, widths)
+
+    # Every node holds one row of the reach table per player; row 0 starts as the uniform range
+    table = np.ones((1, COMBO_COUNT), dtype=np.float32)
+    rows = np.zeros((1, len(players)), dtype=np.int64)
+    slot = np.zeros(store.node_count, dtype=np.int64)
+    for depth, level in enumerate(levels):
+        # Only nodes with a strategy or with children need a reach
+        level = level[node_usable[level] | (store.edge_count[level] > 0)]
+        if depth:
+            parents = store.parent[level]
+            rows = rows[slot[parents]]
+
+            # Children of an action get a new row: the acting player's reach scaled by that action's column
+            acted = np.flatnonzero(column[level] >= 0)
+            acted_parents = parents[acted]
+            acting = player_slot[acted_parents]
+            sources = rows[acted, acting]
+            rows[acted, acting] = len(table) + np.arange(len(acted))
+
+            # Keep only the rows this level still refers to, followed by the new ones
+            kept = np.unique(rows)
+            kept_old = kept[kept < len(table)]
+            level_table = np.empty((len(kept_old) + len(acted), COMBO_COUNT), dtype=np.float32)
+            np.take(table, kept_old, axis=0, out=level_table[:len(kept_old)])
+            scaled = level_table[len(kept_old):]
+
+            # A parent's children are adjacent within its level, so each parent's block is gathered once
+            starts = np.flatnonzero(np.diff(acted_parents, prepend=-1))
+            acted_columns = column[level[acted]]
+            for start, end in zip(starts.tolist(), [*starts[1:].tolist(), len(acted)]):
+                block = store.strategy_blocks[int(store.strategy_index[acted_parents[start]])]
+                np.multiply(table[sources[start:end]], block[:, acted_columns[start:end]].T, out=scaled[start:end])
+            table = level_table
+            rows = np.searchsorted(kept, rows)
+        slot[level] = np.arange(len(level))
+
+        deciding = np.flatnonzero(node_usable[level])
+        for batch in range(0, len(deciding), STRATEGY_BATCH):
+            nodes = deciding[batch:batch + STRATEGY_BATCH]
+            _average_strategies(store, widths, store.strategy_index[level[nodes]],
+                                table[rows[nodes, player_slot[level[nodes]]]], reach_combos, frequencies)
+
+    return reach_combos, frequencies
+
+
+def _average_strategies(store, widths, indexes, weights, reach_combos, frequencies):
+    """Fill in the reach and weighted frequencies of a batch of strategies, given their players' reach"""
+    masks = np.unpackbits(store.strategy_mask_bits[indexes], axis=1, count=COMBO_COUNT).view(bool)
+    weights *= masks
+    totals = weights.sum(axis=1, dtype=np.float64)
+    reach_combos[indexes] = totals
+
+    unreached = np.flatnonzero(totals <= 0)
+    if len(unreached):
+        weights[unreached] = masks[unreached]
+        totals[unreached] = np.count_nonzero(masks[unreached], axis=1)
+
+    # Normalize the weights up front, leaving one product with its block per strategy
+    weights /= np.maximum(totals, 1e-30)[:, None].astype(np.float32)
+    counts = np.minimum(store.strategy_action_count[indexes], widths[indexes])
+    averaged = np.flatnonzero((totals > 0) & (counts > 0))
+    for row, index, start, width in zip(averaged.tolist(), indexes[averaged].tolist(),
+                                        store.strategy_action_start[indexes[averaged]].tolist(),
+                                        counts[averaged].tolist()):
+        frequencies[start:start + width] = (weights[row] @ store.strategy_blocks[index])[:width]
+
+
+def _action_columns(store, incoming, node_usable, widths):
+    """
+    Return, per node, the column of its parent's strategy block holding the
+    action that leads to it, or -1 when it was dealt, its parent has no usable
+    strategy, or the action is not in the block.
+    """
+    column = np.full(store.node_count, -1, dtype=np.int64)
+    nodes = np.flatnonzero(incoming >= 0)
+    edges = incoming[nodes]
+    parents = store.parent[nodes]
+    candidate = (store.edge_kind[edges] != EDGE_CARD) & node_usable[parents]
+    nodes, edges, parents = nodes[candidate], edges[candidate], parents[candidate]
+    if not len(nodes) or not len(store.strategy_actions):
+        return column
+
+    # Sort every strategy's (index, action) slots; a stable sort keeps the first of duplicate actions first
+    owner = np.repeat(np.arange(len(store.strategy_flags), dtype=np.int64), store.strategy_action_count)
+    position = np.arange(len(store.strategy_actions)) - store.strategy_action_start[owner]
+    string_count = max(len(store.strings), int(store.edge_label.max(initial=0)) + 1)
+    keys = owner * string_count + store.strategy_actions
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+
+    indexes = store.strategy_index[parents].astype(np.int64)
+    wanted = indexes * string_count + store.edge_label[edges]
+    found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    match = keys[found] == wanted
+    columns = position[order[found]]
+    match &= columns < widths[indexes]
+    column[nodes[match]] = columns[match]
+    return column
+
+
+def range_reach(store, node_id, player):
+    """
+    Return how often each combo of a player reaches a node through the player's
+    own actions on the way down, as a (1326,) float32 array.
+    """
+    reach = np.ones(COMBO_COUNT, dtype=np.float32)
+    while node_id > 0:
+        parent_id = int(store.parent[node_id])
+        edge = store.incoming_edge(node_id)
+        if store.edge_kind[edge] != EDGE_CARD and int(store.player[parent_id]) == player:
+            strategy = store.strategy(parent_id)
+            if strategy is not None and strategy.actions is not None and strategy.probabilities is not None:
+                label = store.strings[store.edge_label[edge]]
+                if label in strategy.actions and strategy.actions.index(label) < strategy.probabilities.shape[1]:
+                    reach = reach * strategy.probabilities[:, strategy.actions.index(label)]
+        node_id = parent_id
+    return reach